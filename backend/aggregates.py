@@ -0,0 +1,144 @@
+# Incrementally maintained analytics aggregates for Analytics.db
+import re
+from datetime import datetime
+
+# Schema step registered in analytics.MIGRATIONS
+AGGREGATES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agg_product_recommendations (
+    product_id TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS agg_session_days (
+    session_id TEXT,
+    day TEXT,
+    start TEXT,
+    end TEXT,
+    PRIMARY KEY (session_id, day)
+);
+CREATE TABLE IF NOT EXISTS agg_daily_durations (
+    day TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    total_us INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS agg_product_conversions (
+    product_id TEXT PRIMARY KEY,
+    score INTEGER NOT NULL DEFAULT 0,
+    first_rowid INTEGER NOT NULL
+);
+INSERT OR REPLACE INTO analytics_state (key, value) VALUES ('aggregates_watermark', 0)
+"""
+
+# Conversations folded per call when the writer helps a lagging catch-up
+CATCHUP_ROWS = 500
+
+
+def _duration_us(start, end):
+    delta = datetime.fromisoformat(end) - datetime.fromisoformat(start)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def ordered_product(cur, session_id, rowid, user_message):
+    """
+    (product_id, name) a 'pack up ...' message refers to: the first product shown
+    in the same session up to this turn whose name contains the ordered text.
+    """
+    query = (user_message or "").lower()
+    if "pack up" not in query:
+        return None
+    match = re.search(r"pack up (.+)", query)
+    if not match:
+        return None
+    ordered_name = match.group(1).strip().lower()
+    return cur.execute("""
+        SELECT cp.product_id, p.name
+        FROM conversations c
+        JOIN conversation_products cp ON cp.conversation_id = c.rowid
+        JOIN products p ON p.product_id = cp.product_id
+        WHERE c.session_id IS ? AND c.rowid <= ? AND instr(lower(p.name), ?) > 0
+        ORDER BY c.rowid, cp.rank
+        LIMIT 1
+    """, (session_id, rowid, ordered_name)).fetchone()
+
+
+def _fold_row(cur, rowid, session_id, user_message, interest_score, timestamp):
+    # Recommendation counts
+    cur.execute("""
+        INSERT INTO agg_product_recommendations (product_id, count)
+        SELECT product_id, COUNT(*) FROM conversation_products WHERE conversation_id = ? GROUP BY product_id
+        ON CONFLICT(product_id) DO UPDATE SET count = count + excluded.count
+    """, (rowid,))
+
+    # Session start/end per day and the per-day duration totals
+    if timestamp is not None:
+        text = str(timestamp)
+        day = text[:10]
+        try:
+            row = cur.execute(
+                "SELECT start, end FROM agg_session_days WHERE session_id IS ? AND day = ?", (session_id, day)
+            ).fetchone()
+            if row is None:
+                cur.execute("INSERT INTO agg_session_days (session_id, day, start, end) VALUES (?, ?, ?, ?)",
+                            (session_id, day, text, text))
+                new_session, delta = 1, 0
+            else:
+                start, end = min(row[0], text), max(row[1], text)
+                delta = _duration_us(start, end) - _duration_us(row[0], row[1])
+                cur.execute("UPDATE agg_session_days SET start = ?, end = ? WHERE session_id IS ? AND day = ?",
+                            (start, end, session_id, day))
+                new_session = 0
+            cur.execute("""
+                INSERT INTO agg_daily_durations (day, sessions, total_us) VALUES (?, ?, ?)
+                ON CONFLICT(day) DO UPDATE SET sessions = sessions + excluded.sessions, total_us = total_us + excluded.total_us
+            """, (day, new_session, delta))
+        except ValueError:
+            # Unparseable timestamp: it cannot contribute to durations
+            pass
+
+    # Conversion score for 'pack up ...' orders
+    product = ordered_product(cur, session_id, rowid, user_message)
+    if product and interest_score is not None:
+        cur.execute("""
+            INSERT INTO agg_product_conversions (product_id, score, first_rowid) VALUES (?, ?, ?)
+            ON CONFLICT(product_id) DO UPDATE SET score = score + excluded.score
+        """, (product[0], interest_score, rowid))
+
+
+def fold_pending(cur, limit):
+    """
+    Fold up to `limit` conversations past the aggregates watermark into the
+    agg_* tables and advance the watermark. The caller must hold the write
+    transaction. Rows still waiting for the product backfill are not folded yet.
+    Returns the number of conversations folded.
+    """
+    state = dict(cur.execute("SELECT key, value FROM analytics_state").fetchall())
+    watermark = state.get("aggregates_watermark", 0)
+    done, upto = state.get("products_backfill_done", 0), state.get("products_backfill_upto", 0)
+    bound = done if done < upto else None
+    rows = cur.execute(f"""
+        SELECT rowid, session_id, user_message, interest_score, timestamp
+        FROM conversations
+        WHERE rowid > ? {"AND rowid <= ?" if bound is not None else ""}
+        ORDER BY rowid
+        LIMIT ?
+    """, (watermark, bound, limit) if bound is not None else (watermark, limit)).fetchall()
+    for row in rows:
+        _fold_row(cur, *row)
+    if rows:
+        cur.execute("UPDATE analytics_state SET value = ? WHERE key = 'aggregates_watermark'", (rows[-1][0],))
+    return len(rows)
+
+
+def refresh_aggregates(conn, batch_size=5000):
+    """Catch-up job: fold everything past the watermark in batches. Returns rows folded."""
+    folded = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = fold_pending(conn.cursor(), batch_size)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        folded += count
+        if count < batch_size:
+            return folded
@@ -1,15 +1,20 @@
 import pandas as pd
-import sqlite3, os, json, ast, re
-from datetime import datetime
+import os, json, ast, atexit, threading
+from datetime import datetime, time, timedelta, timezone
+from .log_writer import ConversationLogWriter
+from .db import get_connection
+from .metrics import timed
+from .migrations import apply_migrations
+from .log_analytics import explode_products
+from .aggregates import AGGREGATES_SCHEMA, CATCHUP_ROWS, fold_pending, refresh_aggregates, ordered_product
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 db_path = os.path.join(PROJECT_ROOT, "data", "Analytics.db")
 db_path = os.path.abspath(db_path)
 
-# Initialize the database and create the conversations table if it doesn't exist
-def init_db():
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("""
+# Schema versions for Analytics.db, applied in order by init_db (tracked in PRAGMA user_version)
+MIGRATIONS = [
+    # 1: original conversations table
+    (1, """
     CREATE TABLE IF NOT EXISTS conversations (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         session_id TEXT,
@@ -20,160 +25,465 @@ def init_db():
         products TEXT,
         timestamp DATETIME
     )
-    """)
-    conn.commit()
-    conn.close()
+    """),
+    # 2: sortable numeric timestamp (seconds since 1970-01-01 on the same wall clock as `timestamp`;
+    #    rewritten as UTC epoch seconds by 6)
+    (2, """
+    ALTER TABLE conversations ADD COLUMN ts REAL;
+    UPDATE conversations SET ts = (julianday(timestamp) - 2440587.5) * 86400.0
+    """),
+    # 3: per-session and global time indexes
+    (3, """
+    CREATE INDEX IF NOT EXISTS idx_conversations_session_ts ON conversations(session_id, ts);
+    CREATE INDEX IF NOT EXISTS idx_conversations_ts ON conversations(ts)
+    """),
+    # 4: normalized products shown per turn; rows logged before this version are
+    #    picked up by backfill_conversation_products()
+    (4, """
+    CREATE TABLE IF NOT EXISTS products (
+        product_id TEXT PRIMARY KEY,
+        name TEXT
+    );
+    CREATE TABLE IF NOT EXISTS conversation_products (
+        conversation_id INTEGER NOT NULL,
+        product_id TEXT NOT NULL,
+        rank INTEGER NOT NULL,
+        PRIMARY KEY (conversation_id, rank)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_conversation_products_product ON conversation_products(product_id);
+    CREATE TABLE IF NOT EXISTS analytics_state (
+        key TEXT PRIMARY KEY,
+        value
+    );
+    INSERT OR REPLACE INTO analytics_state (key, value) VALUES
+        ('products_backfill_upto', (SELECT COALESCE(MAX(rowid), 0) FROM conversations)),
+        ('products_backfill_done', 0)
+    """),
+    # 5: materialized dashboard aggregates, folded incrementally past a watermark
+    (5, AGGREGATES_SCHEMA),
+    # 6: ts as UTC epoch seconds, so it stays monotonic across DST changes
+    (6, lambda conn: _backfill_utc_ts(conn)),
+]
+
+_EPOCH = datetime(1970, 1, 1)
+def _naive(dt):
+    """Aware datetimes as naive local wall-clock time, the form turns are logged in."""
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo is not None else dt
+
+def to_ts(dt):
+    """UTC epoch seconds of a datetime; naive ones are taken as local wall-clock time."""
+    return dt.timestamp()
+
+# Migration 6: ts held seconds since 1970-01-01 on the local wall clock; turn
+# them into UTC epoch seconds. Turns logged in the repeated hour when DST ends
+# cannot be told apart and get its first occurrence, as datetime.timestamp() does.
+def _backfill_utc_ts(conn, batch_size=5000):
+    last = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, ts FROM conversations WHERE rowid > ? AND ts IS NOT NULL ORDER BY rowid LIMIT ?",
+            (last, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE conversations SET ts = ? WHERE rowid = ?",
+            [(to_ts(_EPOCH + timedelta(seconds=ts)), rowid) for rowid, ts in rows]
+        )
+        last = rows[-1][0]
+
+# Initialize the database and bring the schema up to the latest version
+_migrated = set()
+def init_db():
+    conn = get_connection(db_path)
+    apply_migrations(conn, MIGRATIONS)
+    _migrated.add(db_path)
+
+# Pooled connection to an up-to-date Analytics.db
+def _connection():
+    if db_path not in _migrated:
+        init_db()
+    return get_connection(db_path)
+
+# Decode a stored products blob (JSON, or a Python literal in very old rows)
+def parse_products(blob):
+    if not blob:
+        return []
+    try:
+        products = json.loads(blob)
+    except Exception:
+        try:
+            products = ast.literal_eval(blob)
+        except Exception:
+            return []
+    return products if isinstance(products, list) else []
+
+# (product_id, name) pairs in display order, skipping malformed entries
+def product_links(products):
+    return [
+        (p["product_id"], p.get("name"))
+        for p in products
+        if isinstance(p, dict) and p.get("product_id") is not None
+    ]
+
+# Write the normalized product rows of one logged turn
+def _link_products(cur, conversation_id, links, refresh_names=True):
+    conflict = "DO UPDATE SET name=excluded.name" if refresh_names else "DO NOTHING"
+    cur.executemany(
+        f"INSERT INTO products (product_id, name) VALUES (?, ?) ON CONFLICT(product_id) {conflict}",
+        links
+    )
+    cur.executemany(
+        "INSERT OR REPLACE INTO conversation_products (conversation_id, product_id, rank) VALUES (?, ?, ?)",
+        [(conversation_id, pid, rank) for rank, (pid, _) in enumerate(links)]
+    )
+
+# Insert a batch of logged turns inside the writer's transaction
+@timed("log_write_batch")
+def _write_conversation_batch(conn, records):
+    cur = conn.cursor()
+    for record in records:
+        cur.execute("""
+            INSERT INTO conversations (session_id, user_message, bot_reply, interest_score, filters, products, timestamp, ts)
+            VALUES (:session_id, :user_message, :bot_reply, :interest_score, :filters, :products, :timestamp, :ts)
+        """, record)
+        if record["product_links"]:
+            _link_products(cur, cur.lastrowid, record["product_links"])
+    # Fold the new turns (and a slice of any backlog) into the dashboard aggregates
+    fold_pending(cur, len(records) + CATCHUP_ROWS)
+
+# One-time job: normalize the products of turns logged before the link table existed
+def backfill_conversation_products(batch_size=5000):
+    """
+    Resumable: progress is kept in analytics_state, so it can be interrupted
+    and re-run. Returns the number of conversations processed.
+    """
+    conn = _connection()
+    state = dict(conn.execute("SELECT key, value FROM analytics_state WHERE key LIKE 'products_backfill_%'"))
+    done, upto = state.get("products_backfill_done", 0), state.get("products_backfill_upto", 0)
+    processed = 0
+    while done < upto:
+        chunk = pd.read_sql_query(
+            "SELECT rowid AS conversation_id, products FROM conversations WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?",
+            conn, params=(done, upto, batch_size)
+        )
+        if chunk.empty:
+            done = upto
+        else:
+            done = int(chunk["conversation_id"].iloc[-1])
+        shown = explode_products(chunk).dropna(subset=["product_id"])
+        with conn:
+            conn.executemany(
+                "INSERT INTO products (product_id, name) VALUES (?, ?) ON CONFLICT(product_id) DO NOTHING",
+                list(zip(shown["product_id"], shown["name"]))
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO conversation_products (conversation_id, product_id, rank) VALUES (?, ?, ?)",
+                list(zip(shown["conversation_id"].tolist(), shown["product_id"], shown["rank"].tolist()))
+            )
+            conn.execute("UPDATE analytics_state SET value=? WHERE key='products_backfill_done'", (done,))
+        processed += len(chunk)
+    return processed
+
+# Catch-up job: normalize old turns, then fold everything past the aggregates watermark
+def catch_up():
+    backfilled = backfill_conversation_products()
+    folded = refresh_aggregates(_connection())
+    return backfilled, folded
+
+def start_catch_up():
+    """Run catch_up() in a daemon thread (called at app startup)."""
+    thread = threading.Thread(target=catch_up, name="analytics-catch-up", daemon=True)
+    thread.start()
+    return thread
+
+# Background writer: turns are queued on the request path and flushed in batches
+_log_writer = None
+def get_log_writer():
+    global _log_writer
+    if _log_writer is None or _log_writer.path != db_path:
+        if _log_writer is not None:
+            _log_writer.stop()
+        _log_writer = ConversationLogWriter(db_path, _write_conversation_batch, setup=init_db)
+    return _log_writer
+
+def start_log_writer():
+    """Create the schema once and start the background writer (called at app startup)."""
+    get_log_writer().start()
+
+def stop_log_writer():
+    """Flush queued turns and stop the writer (called at app shutdown)."""
+    if _log_writer is not None:
+        _log_writer.stop()
+
+atexit.register(stop_log_writer)
 
 # Log a conversation entry
+@timed()
 def log_conversation(session_id, user_message, bot_reply, interest_score, filters, products):
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    init_db()
-    cur.execute("""
-        INSERT INTO conversations (session_id, user_message, bot_reply, interest_score, filters, products, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        session_id,
-        user_message,
-        bot_reply,
-        interest_score,
-        json.dumps(filters),
-        json.dumps(products),
-        datetime.now()
-    ))
-    conn.commit()
-    conn.close()
+    writer = get_log_writer()
+    if not writer.running:
+        writer.start()
+    # Aware local time: the wall clock goes into `timestamp`, the exact instant into ts
+    now = datetime.now(timezone.utc).astimezone()
+    writer.submit({
+        "session_id": session_id,
+        "user_message": user_message,
+        "bot_reply": bot_reply,
+        "interest_score": interest_score,
+        "filters": json.dumps(filters),
+        "products": json.dumps(products),
+        "product_links": product_links(products),
+        "timestamp": now.replace(tzinfo=None),
+        "ts": to_ts(now)
+    })
 
 # Analytics functions
+# Time windows and pages are applied in SQL: every *_page query takes optional
+# start/end datetimes (start <= t < end), a row limit (top-k for rankings) and
+# `after`, the sort key of the last row of the previous page (keyset pagination).
+# Each returns (rows, next_key), next_key being None on the last page.
+
+# Drop-off points returned when no limit is given
+DROP_OFF_LIMIT = 5
+
+# SQL condition (and params) for start <= column < end on the numeric ts column
+def _time_window(column, start, end):
+    clauses, params = ["1"], []
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(to_ts(start))
+    if end is not None:
+        clauses.append(f"{column} < ?")
+        params.append(to_ts(end))
+    return " AND ".join(clauses), params
+
+def _keyset(order, after):
+    """
+    SQL condition (and params) for rows strictly after the sort key `after` in
+    the ordering `order` = [(column, descending), ...]. The leading column also
+    gets a plain range bound, so SQLite can seek its index instead of skipping
+    the earlier pages row by row.
+    """
+    if after is None:
+        return "1", []
+    if len(after) != len(order):
+        raise ValueError("Cursor does not match this query")
+    first, first_descending = order[0]
+    bound, params = f"{first} {'<=' if first_descending else '>='} ?", [after[0]]
+    alternatives = []
+    for i, (column, descending) in enumerate(order):
+        equal = [f"{c} = ?" for c, _ in order[:i]]
+        alternatives.append(" AND ".join(equal + [f"{column} {'<' if descending else '>'} ?"]))
+        params += [*after[:i], after[i]]
+    return f"{bound} AND ({' OR '.join(alternatives)})", params
+
+def _order_by(order):
+    return ", ".join(f"{column} DESC" if descending else column for column, descending in order)
+
+# Rows are fetched as (public columns..., sort key columns...), limit + 1 of them
+def _split_page(rows, limit, key_size):
+    more = limit is not None and len(rows) > limit
+    if more:
+        rows = rows[:limit]
+    next_key = tuple(rows[-1][-key_size:]) if more else None
+    return [tuple(row[:-key_size]) for row in rows], next_key
+
+def _sql_limit(limit):
+    return -1 if limit is None else limit + 1
+
+# Interest score of each turn of a session, in time order
+@timed()
+def interest_progression_page(session_id, start=None, end=None, limit=None, after=None):
+    order = [("ts", False), ("rowid", False)]
+    window, window_params = _time_window("ts", start, end)
+    keyset, keyset_params = _keyset(order, after)
+    rows = _connection().execute(f"""
+        SELECT timestamp, interest_score, ts, rowid
+        FROM conversations
+        WHERE session_id = ? AND {window} AND {keyset}
+        ORDER BY {_order_by(order)}
+        LIMIT ?
+    """, (session_id, *window_params, *keyset_params, _sql_limit(limit))).fetchall()
+    return _split_page(rows, limit, len(order))
+
 def get_interest_progression(session_id):
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query(
-        "SELECT timestamp, interest_score FROM conversations WHERE session_id=? ORDER BY timestamp",
-        conn, params=(session_id,)
-    )
-    conn.close()
-    return df
+    rows, _ = interest_progression_page(session_id)
+    return pd.DataFrame(rows, columns=["timestamp", "interest_score"])
+
+# Average conversation duration per day
+def _format_duration(seconds):
+    return f"{int(seconds//3600)}h {int((seconds%3600)//60)}m"
+
+@timed()
+def average_duration_page(start=None, end=None, limit=None, after=None):
+    """(day, "Xh Ym") rows; durations are kept per day, so the window selects the days it overlaps."""
+    order = [("day", False)]
+    clauses, params = ["sessions > 0"], []
+    if start is not None:
+        clauses.append("day >= ?")
+        params.append(_naive(start).date().isoformat())
+    if end is not None:
+        end = _naive(end)
+        last_day = end.date() if end.time() != time.min else end.date() - timedelta(days=1)
+        clauses.append("day <= ?")
+        params.append(last_day.isoformat())
+    keyset, keyset_params = _keyset(order, after)
+    rows = _connection().execute(f"""
+        SELECT day, sessions, total_us, day
+        FROM agg_daily_durations
+        WHERE {' AND '.join(clauses)} AND {keyset}
+        ORDER BY {_order_by(order)}
+        LIMIT ?
+    """, (*params, *keyset_params, _sql_limit(limit))).fetchall()
+    rows, next_key = _split_page(rows, limit, len(order))
+    return [(day, _format_duration(total_us / sessions / 1_000_000)) for day, sessions, total_us in rows], next_key
 
-# Average duration of conversations
 def get_average_duration():
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("""
-        SELECT 
-            session_id, 
-            DATE(timestamp) as day, 
-            MIN(timestamp) as start, 
-            MAX(timestamp) as end
-        FROM conversations
-        GROUP BY session_id, day
-    """, conn)
-    conn.close()
-    df["duration"] = pd.to_datetime(df["end"]) - pd.to_datetime(df["start"])
-    avg_per_day = df.groupby("day")["duration"].mean()
-    result = {
-        day: f"{int(val.total_seconds()//3600)}h {int((val.total_seconds()%3600)//60)}m"
-        for day, val in avg_per_day.items()
-    }
-    return result
+    rows, _ = average_duration_page()
+    return dict(rows)
 
 # Most recommended products
+@timed()
+def most_recommended_page(start=None, end=None, limit=None, after=None):
+    """
+    (name, count) rows by descending count. Without a window the materialized
+    counts are used; with one, the product links of the turns in the window
+    are counted (an index range scan on conversations.ts).
+    """
+    order = [("count", True), ("name", False)]
+    if start is None and end is None:
+        counts, params = """
+            SELECT p.name AS name, SUM(a.count) AS count
+            FROM agg_product_recommendations a
+            JOIN products p ON p.product_id = a.product_id
+            GROUP BY p.name
+        """, []
+    else:
+        window, params = _time_window("c.ts", start, end)
+        counts = f"""
+            SELECT p.name AS name, COUNT(*) AS count
+            FROM conversations c
+            JOIN conversation_products cp ON cp.conversation_id = c.rowid
+            JOIN products p ON p.product_id = cp.product_id
+            WHERE {window}
+            GROUP BY p.name
+        """
+    keyset, keyset_params = _keyset(order, after)
+    rows = _connection().execute(f"""
+        SELECT name, count, count, name
+        FROM ({counts})
+        WHERE count > 0 AND {keyset}
+        ORDER BY {_order_by(order)}
+        LIMIT ?
+    """, (*params, *keyset_params, _sql_limit(limit))).fetchall()
+    return _split_page(rows, limit, len(order))
+
 def get_most_recommended_products():
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("SELECT products FROM conversations", conn)
-    conn.close()
-    all_products = []
-    for row in df["products"]:
-        try:
-            all_products.extend([p["name"] for p in json.loads(row)])
-        except:
-            pass
-    return pd.Series(all_products).value_counts()
+    rows, _ = most_recommended_page()
+    return pd.Series([count for _, count in rows], index=[name for name, _ in rows], name="count")
 
 # Drop-off points (based on product ids)
-def get_drop_off_points():
+@timed()
+def drop_off_points_page(start=None, end=None, limit=DROP_OFF_LIMIT, after=None):
     """
-    Returns the last five drop-off points with both product_id and product name.
-    Drop-off = products shown but interest_score == 0.
+    (product_id, name) of products shown in turns with interest_score == 0,
+    newest turn first.
     """
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql(
-        "SELECT rowid, timestamp, interest_score, products FROM conversations ORDER BY timestamp DESC",
-        conn
-    )
-    conn.close()
-    drop_off_products = []
-    for _, row in df.iterrows():
-        products = []
-        if row["products"]:
-            try:
-                products = ast.literal_eval(row["products"])
-            except Exception:
-                try:
-                    products = json.loads(row["products"])
-                except Exception:
-                    products = []
-        if products and row["interest_score"] == 0:
-            for product in products:
-                drop_off_products.append((product["product_id"], product["name"]))
-    return drop_off_products[:5]
+    order = [("c.ts", True), ("c.rowid", True), ("cp.rank", False)]
+    window, window_params = _time_window("c.ts", start, end)
+    keyset, keyset_params = _keyset(order, after)
+    # CROSS JOIN pins conversations as the outer loop: walking idx_conversations_ts backwards
+    # yields rows already in page order, so LIMIT stops the scan early instead of sorting every link
+    rows = _connection().execute(f"""
+        SELECT cp.product_id, p.name, c.ts, c.rowid, cp.rank
+        FROM conversations c
+        CROSS JOIN conversation_products cp ON cp.conversation_id = c.rowid
+        JOIN products p ON p.product_id = cp.product_id
+        WHERE c.interest_score = 0 AND {window} AND {keyset}
+        ORDER BY {_order_by(order)}
+        LIMIT ?
+    """, (*window_params, *keyset_params, _sql_limit(limit))).fetchall()
+    return _split_page(rows, limit, len(order))
+
+def get_drop_off_points():
+    """Returns the last five drop-off points with both product_id and product name."""
+    rows, _ = drop_off_points_page()
+    return rows
 
 # Highest converting products (products from sessions with high interest_score)
-def get_highest_converting_products():
+@timed()
+def highest_converting_page(start=None, end=None, limit=None, after=None):
     """
-    Returns products sorted by total interest_score.
-    Automatically maps 'pack up ...' queries back to product_id and product_name.
+    (product_id, name, score) rows sorted by total interest_score (capped at 100
+    in the output). 'pack up ...' queries are mapped back to product_id and
+    product_name when the turn is folded into agg_product_conversions (see
+    aggregates.py); with a window, only the 'pack up' turns inside it are
+    read and mapped here.
     """
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql(
-        "SELECT session_id, user_message, products, interest_score FROM conversations",
-        conn
-    )
-    conn.close()
-    product_scores = {}
-    session_products = {}
-    for _, row in df.iterrows():
-        session_id = row["session_id"]
-        query = row["user_message"].lower()
-        score = row["interest_score"]
-        products = []
-        if row["products"]:
-            try:
-                products = ast.literal_eval(row["products"])
-            except Exception:
-                try:
-                    products = json.loads(row["products"])
-                except Exception:
-                    products = []
-        if products:
-            if session_id not in session_products:
-                session_products[session_id] = []
-            session_products[session_id].extend(products)
-        if "pack up" in query:
-            match = re.search(r"pack up (.+)", query)
-            if match:
-                ordered_name = match.group(1).strip().lower()
-                for product in session_products.get(session_id, []):
-                    if ordered_name in product["name"].lower():
-                        pid = product["product_id"]
-                        pname = product["name"]
-                        key = (pid, pname)
-                        product_scores[key] = product_scores.get(key, 0) + score
-                        break
-    sorted_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)
-    return [(pid, pname, min(score, 100)) for (pid, pname), score in sorted_products]
+    conn = _connection()
+    if start is None and end is None:
+        order = [("a.score", True), ("a.first_rowid", False)]
+        keyset, keyset_params = _keyset(order, after)
+        rows = conn.execute(f"""
+            SELECT a.product_id, p.name, a.score, a.score, a.first_rowid
+            FROM agg_product_conversions a
+            JOIN products p ON p.product_id = a.product_id
+            WHERE {keyset}
+            ORDER BY {_order_by(order)}
+            LIMIT ?
+        """, (*keyset_params, _sql_limit(limit))).fetchall()
+    else:
+        window, params = _time_window("ts", start, end)
+        orders = conn.execute(f"""
+            SELECT rowid, session_id, user_message, interest_score
+            FROM conversations
+            WHERE {window} AND interest_score IS NOT NULL AND instr(lower(user_message), 'pack up') > 0
+            ORDER BY rowid
+        """, params).fetchall()
+        totals, cur = {}, conn.cursor()
+        for rowid, session_id, user_message, interest_score in orders:
+            product = ordered_product(cur, session_id, rowid, user_message)
+            if product:
+                entry = totals.setdefault(product[0], [product[1], 0, rowid])
+                entry[1] += interest_score
+        rows = sorted(((pid, name, score, score, first) for pid, (name, score, first) in totals.items()),
+                      key=lambda row: (-row[3], row[4]))
+        if after is not None:
+            if len(after) != 2:
+                raise ValueError("Cursor does not match this query")
+            rows = [row for row in rows if (-row[3], row[4]) > (-after[0], after[1])]
+        if limit is not None:
+            rows = rows[:limit + 1]
+    rows, next_key = _split_page(rows, limit, 2)
+    return [(pid, name, min(score, 100)) for pid, name, score in rows], next_key
+
+def get_highest_converting_products():
+    rows, _ = highest_converting_page()
+    return rows
 
 
 # Get the last interest score for a session
+@timed()
 def get_last_interest_score(session_id: str) -> int:
-    conn = sqlite3.connect(db_path)
+    if _log_writer is not None:
+        pending = _log_writer.pending_interest_score(session_id)
+        if pending is not None:
+            return pending
+    conn = _connection()
     row = conn.execute(
         """
         SELECT interest_score
         FROM conversations
         WHERE session_id=?
-        ORDER BY timestamp DESC
+        ORDER BY ts DESC, rowid DESC
         LIMIT 1
         """,
         (session_id,)
     ).fetchone()
-    conn.close()
-    return row[0] if row else 0
\ No newline at end of file
+    return row[0] if row else 0
+
+if __name__ == "__main__":
+    # python -m backend.analytics  -> run the product backfill and aggregates catch-up
+    backfilled, folded = catch_up()
+    print(f"Backfilled {backfilled} conversations, folded {folded} into aggregates")
\ No newline at end of file
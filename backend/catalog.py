@@ -0,0 +1,433 @@
+# In-memory catalog engine for the fastfood table
+import sqlite3, os, json, re, bisect, threading
+from collections import OrderedDict
+from .db import get_connection
+from .catalog_loader import catalog_revision
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+db_path = os.path.join(BASE_DIR, "../data/FoodData.db")
+db_path = os.path.abspath(db_path)
+
+# JSON-encoded list columns that get an inverted index (token -> row positions)
+TAG_COLUMNS = ("mood_tags", "dietary_tags", "ingredients", "allergens")
+# Numeric columns kept as sorted arrays for range lookups
+RANGE_COLUMNS = ("price", "calories", "spice_level", "popularity_score")
+# Integer flag columns matched by equality
+FLAG_COLUMNS = ("chef_special", "limited_time")
+# Filters whose term lists are order-insensitive (every term must / must not match)
+TERM_FILTERS = ("mood_tags", "dietary_tags", "allergens_exclude", "ingredients_include")
+# Filters compared against numeric columns
+NUMBER_FILTERS = ("max_price", "calories", "min_spice", "max_spice", "popularity")
+# Terms containing JSON punctuation or LIKE wildcards may match across token
+# boundaries, so they are resolved against the raw column text instead
+_RAW_ONLY_CHARS = set('"[],\\%_')
+
+
+def like_matcher(term):
+    """
+    Compile the SQLite predicate `LIKE '%term%'` into a Python matcher.
+    Keeps LIKE semantics: `%`/`_` wildcards and ASCII-only case folding.
+    """
+    parts = []
+    for ch in str(term):
+        if ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return re.compile("".join(parts), re.ASCII | re.IGNORECASE | re.DOTALL).search
+
+
+def _as_number(value):
+    """Coerce a filter bound the way SQLite's REAL/INTEGER affinity would."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        # SQLite orders every number before any text value
+        return float("inf")
+
+
+def _desc_key(value):
+    """Sort key reproducing SQLite's `ORDER BY ... DESC` (text sorts above numbers)."""
+    if isinstance(value, (int, float)):
+        return (1, -value)
+    return (0, 0)
+
+
+def _parse_tokens(raw):
+    """
+    Decode a JSON list column into its tokens.
+    Returns (tokens, regular) where regular is False when the stored text is not
+    the canonical json.dumps of a string list, i.e. token matching could differ
+    from a substring match on the raw text.
+    """
+    try:
+        parsed = json.loads(raw)
+    except (TypeError, ValueError):
+        return [t.strip() for t in str(raw).split(",")], False
+    if not isinstance(parsed, list) or not all(isinstance(t, str) for t in parsed):
+        return [str(parsed)], False
+    return parsed, "\\" not in raw and json.dumps(parsed) == raw
+
+
+def canonical_filters(**filters):
+    """
+    Hashable cache key for a filter combination, or None if it cannot be keyed.
+    Filters that do not restrict the result (None, empty strings/lists) are
+    dropped, term lists become sorted de-duplicated strings, numbers and flags
+    are coerced the way the query compares them. `count` and `debug` are not
+    part of the key: the full ordered result is cached and sliced per call.
+    """
+    key = []
+    for name, value in sorted(filters.items()):
+        if name in ("count", "debug") or value is None:
+            continue
+        if name in TERM_FILTERS:
+            if not value:
+                continue
+            value = tuple(sorted({str(term) for term in value}))
+        elif name in NUMBER_FILTERS:
+            value = _as_number(value)
+        elif name in FLAG_COLUMNS:
+            value = 1 if value else 0
+        elif not value:
+            continue
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        key.append((name, value))
+    return tuple(key)
+
+
+class QueryCache:
+    """
+    LRU of (canonical filters -> ordered row positions) for one catalog.
+    Entries belong to a single catalog version; the cache empties itself the
+    first time it sees a newer version.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            positions = self._entries.get(key)
+            if positions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return positions
+
+    def put(self, version, key, positions):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = positions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "invalidations": self.invalidations,
+            }
+
+
+class CatalogSnapshot:
+    """Immutable view of the fastfood table plus its indexes for one catalog version."""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.rows = rows
+        self.all = frozenset(range(len(rows)))
+        self.by_category = {}
+        self.raw = {col: [] for col in TAG_COLUMNS}
+        self.nulls = {col: set() for col in TAG_COLUMNS + RANGE_COLUMNS}
+        self.postings = {col: {} for col in TAG_COLUMNS}
+        self.irregular = {col: set() for col in TAG_COLUMNS}
+        self.flags = {col: {} for col in FLAG_COLUMNS}
+        self.sorted_values = {}
+        self.text_values = {}
+        self._term_cache = {}
+        self._vocabulary = None
+
+        numeric = {col: [] for col in RANGE_COLUMNS}
+        for pos, row in enumerate(rows):
+            self.by_category.setdefault(row.get("category"), set()).add(pos)
+            for col in TAG_COLUMNS:
+                raw = row.get(col)
+                self.raw[col].append(raw)
+                if raw is None:
+                    self.nulls[col].add(pos)
+                    continue
+                tokens, regular = _parse_tokens(raw)
+                if not regular:
+                    self.irregular[col].add(pos)
+                for token in tokens:
+                    self.postings[col].setdefault(token, set()).add(pos)
+            for col in FLAG_COLUMNS:
+                self.flags[col].setdefault(row.get(col), set()).add(pos)
+            for col in RANGE_COLUMNS:
+                value = row.get(col)
+                if value is None:
+                    self.nulls[col].add(pos)
+                elif isinstance(value, (int, float)):
+                    numeric[col].append((value, pos))
+                else:
+                    self.text_values.setdefault(col, set()).add(pos)
+        for col, pairs in numeric.items():
+            pairs.sort()
+            self.sorted_values[col] = ([v for v, _ in pairs], [p for _, p in pairs])
+
+    def rows_like(self, column, term):
+        """Row positions where `column LIKE '%term%'` holds."""
+        key = (column, str(term))
+        cached = self._term_cache.get(key)
+        if cached is not None:
+            return cached
+        match = like_matcher(term)
+        text = str(term)
+        raw = self.raw[column]
+        if _RAW_ONLY_CHARS & set(text) or not text.isascii() or not text.strip():
+            hits = {pos for pos, value in enumerate(raw) if value is not None and match(value)}
+        else:
+            hits = set()
+            for token, positions in self.postings[column].items():
+                if match(token):
+                    hits |= positions
+            irregular = self.irregular[column]
+            if irregular:
+                hits -= irregular
+                hits |= {pos for pos in irregular if match(raw[pos])}
+        hits = frozenset(hits)
+        self._term_cache[key] = hits
+        return hits
+
+    def rows_in_range(self, column, low=None, high=None):
+        """Row positions where low <= column <= high (bounds optional, NULLs excluded)."""
+        values, positions = self.sorted_values[column]
+        start = 0 if low is None else bisect.bisect_left(values, _as_number(low))
+        stop = len(values) if high is None else bisect.bisect_right(values, _as_number(high))
+        hits = set(positions[start:stop])
+        # Text values sort after every number in SQLite
+        if high is None:
+            hits |= self.text_values.get(column, set())
+        return hits
+
+    def rows_with_flag(self, column, value):
+        return self.flags[column].get(value, set())
+
+    def vocabulary(self):
+        """Distinct categories and tag tokens, computed once per catalog version."""
+        if self._vocabulary is None:
+            self._vocabulary = {
+                "categories": sorted(c for c in self.by_category if c),
+                "mood_tags": sorted(t for t in self.postings["mood_tags"] if t.strip()),
+                "dietary_tags": sorted(t for t in self.postings["dietary_tags"] if t.strip()),
+                "allergens": sorted(t for t in self.postings["allergens"] if t.strip()),
+                "ingredients": sorted(t for t in self.postings["ingredients"] if t.strip()),
+            }
+        return self._vocabulary
+
+
+class Catalog:
+    """
+    Loads the fastfood table once and answers filter queries from memory.
+    The snapshot is rebuilt whenever catalog_meta.revision changes, i.e. after
+    a catalog_loader run that changed the menu.
+    """
+
+    def __init__(self, path=db_path, cache_size=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        # QUERY_CACHE_SIZE=0 disables the filter cache
+        if cache_size is None:
+            cache_size = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+        self.cache = QueryCache(cache_size) if cache_size > 0 else None
+
+    def _load(self, version):
+        cursor = get_connection(self.path).cursor()
+        cursor.row_factory = sqlite3.Row
+        rows = [dict(row) for row in cursor.execute("SELECT * FROM fastfood ORDER BY rowid")]
+        cursor.close()
+        return CatalogSnapshot(rows, version)
+
+    def snapshot(self):
+        """Return the current snapshot, reloading it if the catalog revision changed."""
+        version = catalog_revision(self.path)
+        snap = self._snapshot
+        if snap is not None and snap.version == version:
+            return snap
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._load(version)
+            return self._snapshot
+
+    @property
+    def version(self):
+        return self.snapshot().version
+
+    def query(
+        self,
+        category=None,
+        max_price=None,
+        mood_tags=None,
+        dietary_tags=None,
+        allergens_exclude=None,
+        chef_special=None,
+        popularity=None,
+        ingredients_include=None,
+        calories=None,
+        limited_time=None,
+        min_spice=None,
+        max_spice=None,
+        count=None,
+        debug=None
+    ):
+        """
+        Same filter semantics as the original SQL in get_fastfood_by_filters,
+        evaluated as set intersections over the in-memory indexes.
+        Repeated filter combinations are answered from the query cache.
+        Returns a list of row dicts.
+        """
+        filters = dict(
+            category=category, max_price=max_price, mood_tags=mood_tags, dietary_tags=dietary_tags,
+            allergens_exclude=allergens_exclude, chef_special=chef_special, popularity=popularity,
+            ingredients_include=ingredients_include, calories=calories, limited_time=limited_time,
+            min_spice=min_spice, max_spice=max_spice
+        )
+        snap = self.snapshot()
+        key = canonical_filters(**filters) if self.cache is not None and not debug else None
+        positions = self.cache.get(snap.version, key) if key is not None else None
+        if positions is None:
+            positions = self._evaluate(snap, debug=debug, **filters)
+            if key is not None:
+                self.cache.put(snap.version, key, positions)
+
+        if count is not None:
+            limit = int(count)
+            if limit >= 0:
+                positions = positions[:limit]
+        return [dict(snap.rows[pos]) for pos in positions]
+
+    def _evaluate(
+        self,
+        snap,
+        category=None,
+        max_price=None,
+        mood_tags=None,
+        dietary_tags=None,
+        allergens_exclude=None,
+        chef_special=None,
+        popularity=None,
+        ingredients_include=None,
+        calories=None,
+        limited_time=None,
+        min_spice=None,
+        max_spice=None,
+        debug=None
+    ):
+        """Row positions matching the filters, in result order (uncached, no count limit)."""
+        candidates = set(snap.all)
+        plan = []
+
+        # Category
+        if category:
+            candidates &= snap.by_category.get(category, set())
+            plan.append(("category =", category))
+
+        # Price
+        if max_price is not None:
+            candidates &= snap.rows_in_range("price", high=max_price)
+            plan.append(("price <=", max_price))
+
+        # Mood / dietary tags and ingredients (all must match)
+        for column, terms in (("mood_tags", mood_tags), ("dietary_tags", dietary_tags), ("ingredients", ingredients_include)):
+            if terms:
+                for term in terms:
+                    candidates &= snap.rows_like(column, term)
+                    plan.append((f"{column} LIKE", term))
+
+        # Allergens (exclude foods containing certain allergens; NULL never passes NOT LIKE)
+        if allergens_exclude:
+            candidates -= snap.nulls["allergens"]
+            for allergen in allergens_exclude:
+                candidates -= snap.rows_like("allergens", allergen)
+                plan.append(("allergens NOT LIKE", allergen))
+
+        # Chef special / limited time
+        if chef_special is not None:
+            candidates &= snap.rows_with_flag("chef_special", 1 if chef_special else 0)
+            plan.append(("chef_special =", 1 if chef_special else 0))
+        if limited_time is not None:
+            candidates &= snap.rows_with_flag("limited_time", 1 if limited_time else 0)
+            plan.append(("limited_time =", 1 if limited_time else 0))
+
+        # Spice level
+        if min_spice is not None or max_spice is not None:
+            candidates &= snap.rows_in_range("spice_level", low=min_spice, high=max_spice)
+            plan.append(("spice_level between", (min_spice, max_spice)))
+
+        # Calories
+        if calories is not None:
+            candidates &= snap.rows_in_range("calories", high=calories)
+            plan.append(("calories <=", calories))
+
+        # Popularity
+        ordered = sorted(candidates)
+        if popularity is not None:
+            candidates &= snap.rows_in_range("popularity_score", low=popularity)
+            ordered = sorted(candidates, key=lambda pos: (_desc_key(snap.rows[pos]["popularity_score"]), pos))
+            plan.append(("popularity_score >=", popularity))
+
+        # Debugging
+        if debug:
+            print("DEBUG CATALOG VERSION:", snap.version)
+            print("DEBUG PLAN:", plan)
+
+        return tuple(ordered)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+# Shared catalog per database file
+def get_catalog(path=db_path):
+    path = os.path.abspath(path)
+    catalog = _catalogs.get(path)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.setdefault(path, Catalog(path))
+    return catalog
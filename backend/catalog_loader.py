@@ -0,0 +1,207 @@
+# Catalog ingestion: idempotent bulk upsert of FoodData.json / NDJSON menus into FoodData.db
+# Usage: python -m backend.catalog_loader [data/FoodData.json] [--prune] [--db data/FoodData.db]
+import os, json, time, argparse
+from datetime import datetime
+from .db import get_connection
+from .migrations import apply_migrations
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+db_path = os.path.join(PROJECT_ROOT, "data", "FoodData.db")
+db_path = os.path.abspath(db_path)
+json_path = os.path.join(PROJECT_ROOT, "data", "FoodData.json")
+json_path = os.path.abspath(json_path)
+
+# Column order of the fastfood table; list fields are stored as JSON strings, flags as 0/1
+COLUMNS = (
+    "product_id", "name", "category", "description", "ingredients", "price", "calories", "prep_time",
+    "dietary_tags", "mood_tags", "allergens", "popularity_score", "chef_special", "limited_time",
+    "spice_level", "image_prompt",
+)
+LIST_COLUMNS = ("ingredients", "dietary_tags", "mood_tags", "allergens")
+FLAG_COLUMNS = ("chef_special", "limited_time")
+# Rows per executemany call (all batches share one transaction)
+BATCH_SIZE = 1000
+# Characters read at a time when streaming a JSON array
+READ_CHUNK = 1 << 16
+
+# Schema versions for FoodData.db, applied in order (tracked in PRAGMA user_version)
+CATALOG_MIGRATIONS = [
+    (1, """
+    CREATE TABLE IF NOT EXISTS fastfood (
+      product_id TEXT PRIMARY KEY,
+      name TEXT,
+      category TEXT,
+      description TEXT,
+      ingredients TEXT,         -- Stored as JSON string
+      price REAL,
+      calories INTEGER,
+      prep_time TEXT,
+      dietary_tags TEXT,        -- Stored as JSON string
+      mood_tags TEXT,           -- Stored as JSON string
+      allergens TEXT,           -- Stored as JSON string
+      popularity_score INTEGER,
+      chef_special BOOLEAN,
+      limited_time BOOLEAN,
+      spice_level INTEGER,
+      image_prompt TEXT
+    )
+    """),
+    # revision counts the loads that changed the catalog; loaded_at/source describe the last one
+    (2, """
+    CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value);
+    INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('revision', 0)
+    """),
+]
+
+UPSERT_SQL = f"""
+    INSERT INTO fastfood ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})
+    ON CONFLICT(product_id) DO UPDATE SET {', '.join(f'{c}=excluded.{c}' for c in COLUMNS[1:])}
+"""
+
+# Stream the objects of a top-level JSON array without loading the whole file
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = "", 0, False, False
+    while True:
+        # Skip whitespace (and separators between items), reading more input as needed
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = chunk, 0
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of input: the product array is not closed")
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Expected a JSON array of products")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The item continues in the next chunk
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        yield item
+        pos = end
+
+# Products from a JSON array or NDJSON (one object per line) file
+def iter_products(source, fmt="auto"):
+    """fmt: "json", "ndjson" or "auto" (.ndjson/.jsonl files are NDJSON, anything else a JSON array)."""
+    if fmt == "auto":
+        fmt = "ndjson" if source.lower().endswith((".ndjson", ".jsonl")) else "json"
+    with open(source, encoding="utf-8") as f:
+        if fmt == "ndjson":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+# Convert one product object to a fastfood row tuple
+_encode_list = json.JSONEncoder().encode
+_KINDS = tuple((column, column in LIST_COLUMNS, column in FLAG_COLUMNS) for column in COLUMNS)
+def to_row(item):
+    if not item.get("product_id"):
+        raise ValueError(f"Product without product_id: {item.get('name')!r}")
+    row = []
+    for column, is_list, is_flag in _KINDS:
+        value = item.get(column)
+        if value is not None:
+            if is_list and not isinstance(value, str):
+                value = _encode_list(value if isinstance(value, list) else list(value))
+            elif is_flag:
+                value = int(bool(value))
+        row.append(value)
+    return tuple(row)
+
+# Persistent catalog revision, bumped by every load that changed something
+# (the in-memory catalog and the caches keyed on it reload when it moves)
+_migrated = set()
+def catalog_revision(path=db_path):
+    conn = get_connection(path)
+    if path not in _migrated:
+        apply_migrations(conn, CATALOG_MIGRATIONS)
+        _migrated.add(path)
+    return conn.execute("SELECT value FROM catalog_meta WHERE key='revision'").fetchone()[0]
+
+# Load products into FoodData.db
+def load_catalog(products, path=db_path, prune=False, batch_size=BATCH_SIZE, source=None):
+    """
+    Idempotent, delta-aware ingestion of an iterable of product dicts.
+    New products are inserted and changed ones updated (upsert, executemany
+    in batches); products identical to the stored row are not written at all.
+    With prune=True, stored products missing from the input are deleted.
+    Everything happens in one transaction, and the catalog revision is bumped
+    only if a row changed, so re-running the same load writes nothing and
+    keeps the in-memory catalog, query cache and response cache warm.
+    Returns counts of inserted/updated/unchanged/deleted products and the revision.
+    """
+    start = time.perf_counter()
+    conn = get_connection(path)
+    apply_migrations(conn, CATALOG_MIGRATIONS)
+    summary = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        stored = {row[0]: row for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM fastfood")}
+        seen, batch = set(), []
+        for item in products:
+            row = to_row(item)
+            product_id = row[0]
+            seen.add(product_id)
+            current = stored.get(product_id)
+            if current == row:
+                summary["unchanged"] += 1
+                continue
+            summary["inserted" if current is None else "updated"] += 1
+            stored[product_id] = row
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(UPSERT_SQL, batch)
+                batch = []
+        if batch:
+            conn.executemany(UPSERT_SQL, batch)
+        if prune:
+            missing = [(product_id,) for product_id in stored.keys() - seen]
+            conn.executemany("DELETE FROM fastfood WHERE product_id=?", missing)
+            summary["deleted"] = len(missing)
+
+        if summary["inserted"] or summary["updated"] or summary["deleted"]:
+            conn.execute("UPDATE catalog_meta SET value=value+1 WHERE key='revision'")
+            conn.executemany("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)", [
+                ("loaded_at", datetime.now().isoformat(timespec="seconds")),
+                ("source", source),
+            ])
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    summary["revision"] = conn.execute("SELECT value FROM catalog_meta WHERE key='revision'").fetchone()[0]
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+# Load a JSON/NDJSON file into FoodData.db
+def load_file(source=json_path, path=db_path, prune=False, batch_size=BATCH_SIZE, fmt="auto"):
+    return load_catalog(iter_products(source, fmt), path, prune, batch_size, source=os.path.abspath(source))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load (or re-load) the menu into FoodData.db")
+    parser.add_argument("source", nargs="?", default=json_path, help="JSON array or NDJSON file of products")
+    parser.add_argument("--db", default=db_path)
+    parser.add_argument("--format", choices=["auto", "json", "ndjson"], default="auto")
+    parser.add_argument("--prune", action="store_true", help="delete stored products missing from the source")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    print(json.dumps(load_file(args.source, os.path.abspath(args.db), args.prune, args.batch_size, args.format), indent=2))
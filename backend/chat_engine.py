@@ -1,105 +1,179 @@
 import os
+import re
 import json
+import time
+import asyncio
 from dotenv import load_dotenv
-from groq import Groq
-from .filter_functions import get_fastfood_by_filters, get_unique_values
+from .llm_providers import get_provider
+from .filter_functions import get_fastfood_by_filters, get_unique_values, get_catalog_version
 from .analytics import log_conversation, get_last_interest_score
+from .session_store import get_session_store
+from .response_cache import get_response_cache, response_key
+from .local_rules import RuleEngine
+from .metrics import stage, timed, record_stage
 
 
-# Initialize the Groq client using the API key from .env
+# Initialize the LLM provider from .env (Groq by default, LLM_PROVIDER=stub for offline runs)
 load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-conversation_memory = {}
-# Main function to analyze user message and generate response
-def analyze_message(user_message: str, session_id: str):
-    interest_score = get_last_interest_score(session_id)
+provider = get_provider()
+# Per-session message window and last interest score (SESSION_STORE=memory|sqlite)
+session_store = get_session_store()
+# Optional LLM response cache (LLM_CACHE=off|memory|sqlite)
+response_cache = get_response_cache()
+
+# Local scoring/filter rules: "off" (default) trusts the LLM as-is, "validate" clamps the LLM
+# output, "fast" also answers structured messages without the LLM
+LOCAL_RULES = os.getenv("LOCAL_RULES", "off").lower()
+
+# Batch chat: most turns in flight at once, and most messages accepted per batch
+BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_MESSAGES = int(os.getenv("CHAT_BATCH_MAX_MESSAGES", "1000"))
+
+# Attach the per-stage timing breakdown to every /chat response, not only to debug requests
+DEBUG_TIMINGS = os.getenv("CHAT_DEBUG_TIMINGS", "0").lower() in ("1", "true", "yes")
+
+# Bump whenever the system prompt text below changes, so cached responses are not reused
+PROMPT_VERSION = 1
+
+# Static part of the system prompt, rebuilt only when the catalog changes
+_system_prompt_cache = {}
+def get_system_prompt_parts():
     """
-    Analyze user's message, maintain memory of last 3 messages,
-    extract filters, calculate interest score, fetch fastfoods, 
-    and generate a friendly response.
+    Returns (head, tail) of the system prompt; the per-turn interest score goes between them.
+    Built from the catalog vocabulary once per catalog version.
     """
-    
-    results = get_unique_values()
-    if session_id not in conversation_memory:
-        conversation_memory[session_id] = []
-    conversation_memory[session_id].append({"role": "user", "content": user_message})
-    conversation_memory[session_id] = conversation_memory[session_id][-3:]
-
-    system_prompt = f"""
-    Your Name is FoodieGuru, an enthusiastic and helpful AI assistant for a fast food restaurant and suggest people dishes according to their cravings
-    After user says that he/she wants to order you should reply with order will arrive in 30 mins.
-    Your goal is to understand the customer's cravings, dietary needs, budget, and mood to recommend the perfect meal from the menu.
-    Always be polite, engaging, and excited about the food. boolean values should be True/False. 
+    version = get_catalog_version()
+    parts = _system_prompt_cache.get(version)
+    if parts is None:
+        results = get_unique_values()
+        head = f"""
+        Your Name is FoodieGuru, an enthusiastic and helpful AI assistant for a fast food restaurant and suggest people dishes according to their cravings
+        After user says that he/she wants to order you should reply with order will arrive in 30 mins.
+        Your goal is to understand the customer's cravings, dietary needs, budget, and mood to recommend the perfect meal from the menu.
+        Always be polite, engaging, and excited about the food. boolean values should be True/False. 
     
 
-    Last interest score = {interest_score}.
-    Rules:
-    - if Last interest score is already 100, then set to 0.
-    - Add +15 if user expresses specific preference (e.g. craving, delighted, favorite).
-    - Add +20 if user shows mood/emotion (happy, sad, hungry, excited).
-    - Add +10 if user asks a question.
-    - Add +25 if user uses enthusiasm words (amazing, delicious, awesome, thrilled).
-    - Add +25 if user mentions price or budget.
-    - Subtract -10 for hesitation (maybe).
-    - Subtract -15 for budget concern (too expensive).
-    - Subtract -20 for dietary conflict (allergic).
-    - Subtract -25 for rejection (no).
-    - Subtract -5 for delay (later).
-    - If user says "pack up" or "i will order" → set score to 100.
-    - Max score is 100, Min is -100
-
-    **CRITICAL INSTRUCTIONS:**
-    - Analyze the user's input and extract the following parameters for a database query:
-    * category (options=>, {', '.join(results['categories'])}) -> cant be empty, use only options
-    * max_price (numeric value if user mentions budget)
-    * mood_tags (e.g., {', '.join(results['mood_tags'])})
-    * dietary_tags (e.g., {', '.join(results['dietary_tags'])})
-    * allergens_exclude (e.g., {', '.join(results['allergens'])})
-    * chef_special (boolean if user wants special items)
-    * min_popularity (minimum numeric value threshold if user mentions popular or best-selling items)
-    * ingredients_include (e.g., {', '.join(results['ingredients'])})
-    * max_calories (numeric value if user mentions calorie limit → interpret as max calories)
-    * limited_time (boolean if user wants limited-time offers)
-    * min_spice (numeric if user requests spiciness, e.g. 5+)
-    * max_spice (numeric if user requests mildness, e.g. up to 3)
-    * interest_score (calculated according to the rules above)
-    * count (number of items to return, default to 3 if not specified)
-    * debug (boolean, set to True if user wants to see SQL query)
-
-    - Your response must be a JSON object with this exact structure from below example:
-    {{
-    "reply": "Your friendly response here...",
-    "filters": {{
-        "category": "Burgers",
-        "max_price": 10.0,
-        "mood_tags": ["adventurous", "comfort"],
-        "dietary_tags": ["spicy"],
-        "allergens_exclude": ["soy"],
-        "chef_special": False,
-        "min_popularity": 45,
-        "ingredients_include": ["beef patty"],
-        "max_calories": 700,
-        "limited_time": True,
-        "min_spice": 3,
-        "max_spice": 8,
-        "interest_score": 45
-        "count" : 3
-        "debug" : False
-    }}
-    }}
-    """
+        Last interest score = """
+        tail = f""".
+        Rules:
+        - if Last interest score is already 100, then set to 0.
+        - Add +15 if user expresses specific preference (e.g. craving, delighted, favorite).
+        - Add +20 if user shows mood/emotion (happy, sad, hungry, excited).
+        - Add +10 if user asks a question.
+        - Add +25 if user uses enthusiasm words (amazing, delicious, awesome, thrilled).
+        - Add +25 if user mentions price or budget.
+        - Subtract -10 for hesitation (maybe).
+        - Subtract -15 for budget concern (too expensive).
+        - Subtract -20 for dietary conflict (allergic).
+        - Subtract -25 for rejection (no).
+        - Subtract -5 for delay (later).
+        - If user says "pack up" or "i will order" → set score to 100.
+        - Max score is 100, Min is -100
 
-    messages = [{"role": "system", "content": system_prompt}] + conversation_memory[session_id]
+        **CRITICAL INSTRUCTIONS:**
+        - Analyze the user's input and extract the following parameters for a database query:
+        * category (options=>, {', '.join(results['categories'])}) -> cant be empty, use only options
+        * max_price (numeric value if user mentions budget)
+        * mood_tags (e.g., {', '.join(results['mood_tags'])})
+        * dietary_tags (e.g., {', '.join(results['dietary_tags'])})
+        * allergens_exclude (e.g., {', '.join(results['allergens'])})
+        * chef_special (boolean if user wants special items)
+        * min_popularity (minimum numeric value threshold if user mentions popular or best-selling items)
+        * ingredients_include (e.g., {', '.join(results['ingredients'])})
+        * max_calories (numeric value if user mentions calorie limit → interpret as max calories)
+        * limited_time (boolean if user wants limited-time offers)
+        * min_spice (numeric if user requests spiciness, e.g. 5+)
+        * max_spice (numeric if user requests mildness, e.g. up to 3)
+        * interest_score (calculated according to the rules above)
+        * count (number of items to return, default to 3 if not specified)
+        * debug (boolean, set to True if user wants to see SQL query)
 
-    chat_completion = client.chat.completions.create(
-        messages=messages,
-        model="qwen/qwen3-32b",
-        temperature=0.7,
-        response_format={"type": "json_object"}
-    )
+        - Your response must be a JSON object with this exact structure from below example:
+        {{
+        "reply": "Your friendly response here...",
+        "filters": {{
+            "category": "Burgers",
+            "max_price": 10.0,
+            "mood_tags": ["adventurous", "comfort"],
+            "dietary_tags": ["spicy"],
+            "allergens_exclude": ["soy"],
+            "chef_special": False,
+            "min_popularity": 45,
+            "ingredients_include": ["beef patty"],
+            "max_calories": 700,
+            "limited_time": True,
+            "min_spice": 3,
+            "max_spice": 8,
+            "interest_score": 45
+            "count" : 3
+            "debug" : False
+        }}
+        }}
+        """
+        parts = (head, tail)
+        _system_prompt_cache.clear()
+        _system_prompt_cache[version] = parts
+    return parts
+
+# Rule engine over the catalog vocabulary, rebuilt only when the catalog changes
+_rule_engine_cache = {}
+def get_rule_engine():
+    version = get_catalog_version()
+    engine = _rule_engine_cache.get(version)
+    if engine is None:
+        engine = RuleEngine(get_unique_values())
+        _rule_engine_cache.clear()
+        _rule_engine_cache[version] = engine
+    return engine
 
-    llm_response = json.loads(chat_completion.choices[0].message.content)
+# Last interest score from the session store, falling back to Analytics.db on a miss
+@timed()
+def last_interest_score(session_id: str) -> int:
+    interest_score = session_store.get_interest_score(session_id)
+    if interest_score is None:
+        interest_score = get_last_interest_score(session_id)
+        session_store.set_interest_score(session_id, interest_score)
+    return interest_score
+
+# Append the user message to the session window and build the LLM messages
+@timed()
+def build_messages(user_message: str, session_id: str, interest_score: int):
+    window = session_store.append_message(session_id, {"role": "user", "content": user_message})
+
+    head, tail = get_system_prompt_parts()
+    system_prompt = head + str(interest_score) + tail
+
+    return [{"role": "system", "content": system_prompt}] + window
+
+# Resolve the interest score and message window before the LLM call
+def prepare_turn(user_message: str, session_id: str):
+    interest_score = last_interest_score(session_id)
+    return interest_score, build_messages(user_message, session_id, interest_score)
+
+# Locally built LLM-style response when LOCAL_RULES=fast and the message is structured, else None
+@timed()
+def local_response(user_message: str, interest_score: int):
+    if LOCAL_RULES != "fast":
+        return None
+    response, structured = get_rule_engine().analyze(user_message, interest_score)
+    return json.dumps(response) if structured else None
+
+# Cache key and cached LLM response for this turn; (None, None) when LLM_CACHE is off
+@timed()
+def lookup_response(messages, interest_score):
+    if response_cache is None:
+        return None, None
+    key = response_key(provider.model, PROMPT_VERSION, get_catalog_version(), messages[1:], interest_score)
+    return key, response_cache.get(key)
+
+# Parse the LLM JSON, fetch matching fastfoods, log the turn and build the response
+@timed()
+def complete_turn(user_message: str, session_id: str, llm_content: str, last_score: int = 0):
+    llm_response = json.loads(llm_content)
     extracted_filters = llm_response.get("filters", {})
+    if LOCAL_RULES != "off":
+        with stage("rules_validate"):
+            extracted_filters = get_rule_engine().validate(extracted_filters, user_message, last_score)
 
     suggested_fastfoods = get_fastfood_by_filters(
         category=extracted_filters.get("category"),
@@ -121,6 +195,7 @@ def analyze_message(user_message: str, session_id: str):
     suggested_fastfoods = [dict(item) for item in suggested_fastfoods]
 
     interest_score = extracted_filters.get("interest_score", 30)
+    session_store.set_interest_score(session_id, interest_score)
     bot_reply = llm_response["reply"]
 
     log_conversation(
@@ -142,3 +217,177 @@ def analyze_message(user_message: str, session_id: str):
         "interest_score": interest_score,
         "session_id": session_id
     }
+
+# Main function to analyze user message and generate response
+def analyze_message(user_message: str, session_id: str):
+    """
+    Analyze user's message, maintain memory of last 3 messages,
+    extract filters, calculate interest score, fetch fastfoods, 
+    and generate a friendly response.
+    """
+    interest_score, messages = prepare_turn(user_message, session_id)
+
+    llm_content = local_response(user_message, interest_score)
+    if llm_content is not None:
+        return complete_turn(user_message, session_id, llm_content, interest_score)
+
+    key, llm_content = lookup_response(messages, interest_score)
+    if llm_content is not None:
+        return complete_turn(user_message, session_id, llm_content, interest_score)
+
+    start = time.perf_counter()
+    llm_content = provider.complete(messages)
+    latency = time.perf_counter() - start
+    record_stage("llm", latency)
+
+    result = complete_turn(user_message, session_id, llm_content, interest_score)
+    # Only responses that parsed and completed are worth reusing
+    if key is not None:
+        response_cache.put(key, llm_content, latency)
+    return result
+
+# Async variant used by the API: the LLM call goes through the provider's async path and
+# the SQLite work runs in the default executor, so the event loop never blocks
+async def analyze_message_async(user_message: str, session_id: str):
+    interest_score, messages = await asyncio.to_thread(prepare_turn, user_message, session_id)
+
+    if LOCAL_RULES == "fast":
+        llm_content = await asyncio.to_thread(local_response, user_message, interest_score)
+        if llm_content is not None:
+            return await asyncio.to_thread(complete_turn, user_message, session_id, llm_content, interest_score)
+
+    key, llm_content = None, None
+    if response_cache is not None:
+        key, llm_content = await asyncio.to_thread(lookup_response, messages, interest_score)
+        if llm_content is not None:
+            return await asyncio.to_thread(complete_turn, user_message, session_id, llm_content, interest_score)
+
+    start = time.perf_counter()
+    llm_content = await provider.acomplete(messages)
+    latency = time.perf_counter() - start
+    record_stage("llm", latency)
+
+    result = await asyncio.to_thread(complete_turn, user_message, session_id, llm_content, interest_score)
+    if key is not None:
+        await asyncio.to_thread(response_cache.put, key, llm_content, latency)
+    return result
+
+# Batch variant for /chat/batch and the replay tool: sessions run concurrently, each
+# session's messages in their original order, with at most `concurrency` turns in flight
+async def analyze_batch_async(items, concurrency: int = BATCH_CONCURRENCY):
+    """
+    items: list of (session_id, message) pairs.
+    Returns one dict per item, in input order: {"response": ...} or {"error": ...};
+    a failed turn does not stop the rest of its session.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = [None] * len(items)
+    sessions = {}
+    for index, (sid, _) in enumerate(items):
+        sessions.setdefault(sid, []).append(index)
+
+    async def run_session(indexes):
+        for index in indexes:
+            sid, user_message = items[index]
+            async with semaphore:
+                try:
+                    results[index] = {"response": await analyze_message_async(user_message, sid)}
+                except Exception as e:
+                    results[index] = {"error": str(e)}
+
+    await asyncio.gather(*(run_session(indexes) for indexes in sessions.values()))
+    return results
+
+# Incremental decoder for the "reply" string of a streamed LLM JSON response
+_REPLY_START = re.compile(r'"reply"\s*:\s*"')
+class ReplyStream:
+    """
+    feed() takes raw response pieces and returns the newly decoded part of the
+    top-level "reply" value (JSON escapes resolved); "" until the key shows up
+    and once the closing quote has been seen.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None
+        self.done = False
+
+    def feed(self, piece):
+        self.buffer += piece
+        if self.done:
+            return ""
+        if self.pos is None:
+            match = _REPLY_START.search(self.buffer)
+            if not match:
+                return ""
+            self.pos = match.end()
+        out, i, text = [], self.pos, self.buffer
+        try:
+            while i < len(text):
+                ch = text[i]
+                if ch == '"':
+                    self.done = True
+                    i += 1
+                    break
+                if ch != "\\":
+                    out.append(ch)
+                    i += 1
+                    continue
+                # Escape sequence: wait until it is complete (surrogate pairs take two \uXXXX)
+                if i + 1 >= len(text):
+                    break
+                size = 2
+                if text[i + 1] == "u":
+                    size = 6
+                    if i + 6 <= len(text) and 0xD800 <= int(text[i + 2:i + 6], 16) < 0xDC00:
+                        size = 12
+                if i + size > len(text):
+                    break
+                out.append(json.loads('"' + text[i:i + size] + '"'))
+                i += size
+        except ValueError:
+            # Malformed escape: stop streaming, the final event still carries the full reply
+            self.done = True
+        self.pos = i
+        return "".join(out)
+
+# Streaming variant for /chat/stream: yields ("token", text) pieces of the reply as the LLM
+# generates them, then ("result", response) once the filters are parsed and products fetched
+async def stream_message_async(user_message: str, session_id: str):
+    interest_score, messages = await asyncio.to_thread(prepare_turn, user_message, session_id)
+
+    llm_content, key, fresh = None, None, False
+    if LOCAL_RULES == "fast":
+        llm_content = await asyncio.to_thread(local_response, user_message, interest_score)
+    if llm_content is None and response_cache is not None:
+        key, llm_content = await asyncio.to_thread(lookup_response, messages, interest_score)
+
+    streamed = ""
+    if llm_content is None:
+        fresh = True
+        decoder, pieces = ReplyStream(), []
+        start = time.perf_counter()
+        async for piece in provider.astream(messages):
+            if not pieces:
+                record_stage("llm_first_token", time.perf_counter() - start)
+            pieces.append(piece)
+            text = decoder.feed(piece)
+            if text:
+                streamed += text
+                yield "token", text
+        llm_content = "".join(pieces)
+        latency = time.perf_counter() - start
+        record_stage("llm", latency)
+
+    result = await asyncio.to_thread(complete_turn, user_message, session_id, llm_content, interest_score)
+    if fresh and key is not None:
+        await asyncio.to_thread(response_cache.put, key, llm_content, latency)
+
+    # Whatever the client has not seen yet (the whole reply on a cache/local hit, the product pitch otherwise)
+    if result["reply"].startswith(streamed) and len(result["reply"]) > len(streamed):
+        yield "token", result["reply"][len(streamed):]
+    yield "result", result
+
+# LLM response cache counters ({} when LLM_CACHE is off)
+def get_llm_cache_stats():
+    return response_cache.stats() if response_cache is not None else {}
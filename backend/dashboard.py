@@ -0,0 +1,253 @@
+# Dashboard data service: TTL-cached analytics results with a background refresher
+import os, json, time, base64, logging, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from . import analytics
+from .metrics import inc
+
+logger = logging.getLogger(__name__)
+
+# Largest page (limit / top-k) the /analytics endpoints accept
+MAX_PAGE_SIZE = 1000
+
+
+class CursorError(ValueError):
+    """A page cursor that is malformed or was issued by a different query."""
+
+
+# Opaque page cursors: the query name plus the sort key to resume after
+def encode_cursor(name, key):
+    if key is None:
+        return None
+    raw = json.dumps([name, list(key)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(name, cursor):
+    if cursor is None:
+        return None
+    try:
+        issued_for, key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise CursorError("Malformed cursor")
+    if issued_for != name:
+        raise CursorError("Cursor was issued for a different query")
+    if not isinstance(key, list) or not all(isinstance(v, (str, int, float)) for v in key):
+        raise CursorError("Malformed cursor")
+    return tuple(key)
+
+def _page(name, page_fn, to_item, cursor, *args):
+    after = decode_cursor(name, cursor)
+    try:
+        rows, next_key = page_fn(*args, after=after)
+    except (ValueError, TypeError) as e:
+        if after is None:
+            raise
+        # Wrong key length or types for this query's ordering
+        raise CursorError(f"Cursor does not match this query: {e}") from e
+    return {"items": [to_item(*row) for row in rows], "next_cursor": encode_cursor(name, next_key)}
+
+# Dashboard queries, returning JSON-ready pages {"items": [...], "next_cursor": ...}
+# start/end bound the time window, limit is the page size (top-k for rankings)
+def most_recommended(start=None, end=None, limit=None, cursor=None):
+    return _page("most_recommended", analytics.most_recommended_page,
+                 lambda name, count: {"name": name, "count": int(count)}, cursor, start, end, limit)
+
+def drop_off_points(start=None, end=None, limit=None, cursor=None):
+    return _page("drop_off_points", analytics.drop_off_points_page,
+                 lambda pid, name: {"product_id": pid, "name": name}, cursor,
+                 start, end, limit or analytics.DROP_OFF_LIMIT)
+
+def average_duration(start=None, end=None, limit=None, cursor=None):
+    return _page("average_duration", analytics.average_duration_page,
+                 lambda day, duration: {"day": day, "duration": duration}, cursor, start, end, limit)
+
+def highest_converting(start=None, end=None, limit=None, cursor=None):
+    return _page("highest_converting", analytics.highest_converting_page,
+                 lambda pid, name, score: {"product_id": pid, "name": name, "score": score}, cursor, start, end, limit)
+
+def interest_progression(session_id, start=None, end=None, limit=None, cursor=None):
+    return _page("interest_progression", analytics.interest_progression_page,
+                 lambda ts, score: {"timestamp": ts, "interest_score": None if score is None else int(score)}, cursor,
+                 session_id, start, end, limit)
+
+# Whole-log queries the refresher keeps warm (their argument-less, first-page form)
+HOT_QUERIES = {
+    "most_recommended": most_recommended,
+    "drop_off_points": drop_off_points,
+    "average_duration": average_duration,
+    "highest_converting": highest_converting,
+}
+QUERIES = {
+    **HOT_QUERIES,
+    "interest_progression": interest_progression,
+}
+
+# Change token of Analytics.db: the newest logged turn and the aggregates watermark
+def data_version():
+    conn = analytics._connection()
+    last_rowid = conn.execute("SELECT MAX(rowid) FROM conversations").fetchone()[0]
+    watermark = conn.execute("SELECT value FROM analytics_state WHERE key='aggregates_watermark'").fetchone()
+    return last_rowid, watermark[0] if watermark else None
+
+
+class DashboardService:
+    """
+    get(name, *args) answers from a per-query TTL cache. The refresher thread
+    recomputes HOT_QUERIES every `refresh_interval` seconds, so dashboard
+    clicks are served from memory; when Analytics.db has not changed since the
+    last computation it only renews the entries instead of re-running them.
+    Parameterized results (a time window, a page, a session's progression)
+    are cached per argument tuple in a bounded LRU with their own (shorter) TTL.
+    """
+
+    def __init__(self, ttl=30.0, query_ttl=5.0, refresh_interval=15.0, max_query_entries=1024):
+        self.ttl = ttl
+        self.query_ttl = query_ttl
+        self.refresh_interval = refresh_interval
+        self.max_query_entries = max_query_entries
+        # (name, args) -> (value, computed_at, data_version)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, holders + waiters]; only keys with a computation in flight have an entry
+        self._key_locks = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def _is_hot(key):
+        return key[0] in HOT_QUERIES and not key[1]
+
+    def _ttl(self, key):
+        return self.ttl if self._is_hot(key) else self.query_ttl
+
+    def peek(self, name, *args):
+        """Cached value if it is still fresh, else None (never touches the database)."""
+        key = (name, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self._ttl(key):
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        inc("foodiebot_dashboard_cache_total", result="hit")
+        return entry[0]
+
+    def get(self, name, *args):
+        value = self.peek(name, *args)
+        if value is not None:
+            return value
+        key = (name, args)
+        # One computation per key; concurrent callers wait for it instead of repeating it
+        with self._key_lock(key):
+            value = self.peek(name, *args)
+            if value is not None:
+                return value
+            with self._lock:
+                self.misses += 1
+            inc("foodiebot_dashboard_cache_total", result="miss")
+            return self._compute(key)
+
+    def _compute(self, key, version=None):
+        name, args = key
+        query = QUERIES[name]
+        version = data_version() if version is None else version
+        value = query(*args)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic(), version)
+            self._entries.move_to_end(key)
+            self._trim()
+        return value
+
+    @contextmanager
+    def _key_lock(self, key):
+        """
+        Hold the per-key computation lock. The entry is dropped by the last
+        user, also when the computation raised, so the table only ever holds
+        keys with a computation in flight (not one per argument tuple seen).
+        """
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and self._key_locks.get(key) is entry:
+                    del self._key_locks[key]
+
+    def _trim(self):
+        query_keys = [key for key in self._entries if not self._is_hot(key)]
+        for key in query_keys[: max(0, len(query_keys) - self.max_query_entries)]:
+            del self._entries[key]
+
+    def refresh(self):
+        """Recompute (or, if Analytics.db is unchanged, just renew) every hot query."""
+        version = data_version()
+        for name in HOT_QUERIES:
+            key = (name, ())
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] == version:
+                    self._entries[key] = (entry[0], time.monotonic(), version)
+                    continue
+            with self._key_lock(key):
+                self._compute(key, version)
+            self.refreshes += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Dashboard refresh failed")
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        """Start the refresher thread (no-op when refresh_interval is 0)."""
+        if self.refresh_interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dashboard-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "size": len(self._entries),
+            }
+
+
+# Build the dashboard service from configuration (.env / environment)
+def get_dashboard_service():
+    """
+    DASHBOARD_TTL: seconds a dashboard result is served from cache
+    DASHBOARD_QUERY_TTL: seconds a parameterized result (time window, page, session progression) is cached
+    DASHBOARD_REFRESH_INTERVAL: seconds between background recomputations (0 disables the refresher)
+    """
+    return DashboardService(
+        ttl=float(os.getenv("DASHBOARD_TTL", "30")),
+        query_ttl=float(os.getenv("DASHBOARD_QUERY_TTL", "5")),
+        refresh_interval=float(os.getenv("DASHBOARD_REFRESH_INTERVAL", "15")),
+    )
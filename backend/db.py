@@ -0,0 +1,81 @@
+# Shared SQLite connection manager for FoodData.db and Analytics.db
+import sqlite3, threading, os
+from .metrics import count_query
+
+# Seconds a connection waits on a locked database before raising
+BUSY_TIMEOUT = 10.0
+# Compiled statements kept per connection (reused across calls on that thread)
+CACHED_STATEMENTS = 256
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=67108864",
+)
+
+_local = threading.local()
+_wal_enabled = set()
+_wal_lock = threading.Lock()
+
+def _enable_wal(conn, path):
+    """
+    Switch the database to WAL once per process (the mode persists in the file).
+    The committed data/*.db files already are in WAL mode (and at their latest
+    schema version), so opening them leaves the tracked files byte-for-byte unchanged.
+    """
+    if path in _wal_enabled:
+        return
+    with _wal_lock:
+        if path in _wal_enabled:
+            return
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            # Read-only location: keep the existing journal mode
+            pass
+        _wal_enabled.add(path)
+
+# Statement kinds counted as queries (transaction control and PRAGMAs are not)
+COUNTED_STATEMENTS = ("select", "insert", "update", "delete", "replace", "with")
+
+# Count each executed query in the metrics, labelled by database file and statement kind
+def _query_counter(path):
+    name = os.path.basename(path)
+    def trace(statement):
+        op = statement.lstrip()[:7].split(None, 1)[0].lower() if statement.strip() else ""
+        if op in COUNTED_STATEMENTS:
+            count_query(name, op)
+    return trace
+
+# Open a new tuned connection
+def connect(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS)
+    conn.set_trace_callback(_query_counter(path))
+    _enable_wal(conn, path)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+# Per-thread pooled connection for a database file
+def get_connection(path):
+    """
+    Returns this thread's connection to `path`, opening it on first use.
+    Executor and server threads are long-lived, so each keeps one warm
+    connection (and its statement cache) per database instead of
+    connecting and closing on every call.
+    """
+    path = os.path.abspath(path)
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = connect(path)
+    return conn
+
+# Close the calling thread's pooled connections
+def close_thread_connections():
+    connections = getattr(_local, "connections", None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
@@ -1,9 +1,12 @@
-import sqlite3, os
+import os
+from .catalog import get_catalog
+from .metrics import timed
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 db_path = os.path.join(BASE_DIR, "../data/FoodData.db")
 db_path = os.path.abspath(db_path)
 
 # Query fastfood with flexible filters
+@timed()
 def get_fastfood_by_filters(
     category=None,
     max_price=None,
@@ -21,134 +24,45 @@ def get_fastfood_by_filters(
     debug=None
 ):
     """
-    Query fastfood from the database based on flexible filters.
-    Returns a list of sqlite3.Row (dict-like).
+    Query fastfood based on flexible filters.
+    Served from the in-memory catalog index (see backend/catalog.py), which
+    reloads itself whenever the catalog revision changes. Repeated filter combinations
+    hit a normalized-filter LRU cache (QUERY_CACHE_SIZE entries).
+    Returns a list of dicts in the same order the SQL query used to.
     """
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    
-    query = "SELECT * FROM fastfood WHERE 1=1"
-    params = []
-
-    # Category
-    if category:
-        query += " AND category = ?"
-        params.append(category)
-
-    # Price
-    if max_price is not None:
-        query += " AND price <= ?"
-        params.append(max_price)
-
-    # Mood tags
-    if mood_tags:
-        for tag in mood_tags:
-            query += " AND mood_tags LIKE ?"
-            params.append(f"%{tag}%")
-
-    # Dietary tags
-    if dietary_tags:
-        for tag in dietary_tags:
-            query += " AND dietary_tags LIKE ?"
-            params.append(f"%{tag}%")
-    
-    # Ingredients (include foods containing certain ingredients)
-    if ingredients_include:
-        for ingredient in ingredients_include:
-            query += " AND ingredients LIKE ?"
-            params.append(f"%{ingredient}%")
-
-    # Allergens (exclude foods containing certain allergens)
-    if allergens_exclude:
-        for allergen in allergens_exclude:
-            query += " AND allergens NOT LIKE ?"
-            params.append(f"%{allergen}%")
-
-    # Chef special
-    if chef_special is not None:
-        query += " AND chef_special = ?"
-        params.append(1 if chef_special else 0)
-
-    # Limited time
-    if limited_time is not None:
-        query += " AND limited_time = ?"
-        params.append(1 if limited_time else 0)
-
-    # Spice level
-    if min_spice is not None:
-        query += " AND spice_level >= ?"
-        params.append(min_spice)
-    if max_spice is not None:
-        query += " AND spice_level <= ?"
-        params.append(max_spice)
-
-    # Calories
-    if calories is not None:
-        query += " AND calories <= ?"
-        params.append(calories)
-
-    # Popularity
-    if popularity is not None:
-        query += " AND popularity_score >= ?"
-        params.append(popularity)
-        query += " ORDER BY popularity_score DESC"
-    
-    if count is not None:
-        query += " LIMIT ?"
-        params.append(count)
-
-    # Debugging
-    if debug:
-        print("DEBUG SQL:", query)
-        print("DEBUG PARAMS:", params)
-
-    cursor = conn.execute(query, params)
-    fastfood = cursor.fetchall()
-    conn.close()
-    return fastfood
+    return get_catalog(db_path).query(
+        category=category,
+        max_price=max_price,
+        mood_tags=mood_tags,
+        dietary_tags=dietary_tags,
+        allergens_exclude=allergens_exclude,
+        chef_special=chef_special,
+        popularity=popularity,
+        ingredients_include=ingredients_include,
+        calories=calories,
+        limited_time=limited_time,
+        min_spice=min_spice,
+        max_spice=max_spice,
+        count=count,
+        debug=debug
+    )
 
 # Returns unique values for categorical fields
+@timed()
 def get_unique_values():
     """
     Extract unique values from categorical columns.
-    Handles comma-separated/JSON-style arrays as well.
+    The vocabulary is built from the parsed JSON arrays once per catalog
+    version and cached on the catalog snapshot.
     """
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = lambda cursor, row: row[0]  # return single column
-    
-    results = {}
-    results["categories"] = list(set(conn.execute("SELECT category FROM fastfood").fetchall()))
-    mood_rows = conn.execute("SELECT mood_tags FROM fastfood").fetchall()
-    mood_tags = set()
-    for row in mood_rows:
-        if row:  # row may be JSON or comma-separated
-            for tag in str(row).replace("[","").replace("]","").replace("'","").split(","):
-                mood_tags.add(tag.strip())
-    results["mood_tags"] = sorted(mood_tags)
-
-    diet_rows = conn.execute("SELECT dietary_tags FROM fastfood").fetchall()
-    dietary_tags = set()
-    for row in diet_rows:
-        if row:
-            for tag in str(row).replace("[","").replace("]","").replace("'","").split(","):
-                dietary_tags.add(tag.strip())
-    results["dietary_tags"] = sorted(dietary_tags)
-
-    allergen_rows = conn.execute("SELECT allergens FROM fastfood").fetchall()
-    allergens = set()
-    for row in allergen_rows:
-        if row:
-            for tag in str(row).replace("[","").replace("]","").replace("'","").split(","):
-                allergens.add(tag.strip())
-    results["allergens"] = sorted(allergens)
+    vocabulary = get_catalog(db_path).snapshot().vocabulary()
+    return {key: list(values) for key, values in vocabulary.items()}
 
-    ingredient_rows = conn.execute("SELECT ingredients FROM fastfood").fetchall()
-    ingredients = set()
-    for row in ingredient_rows:
-        if row:
-            for tag in str(row).replace("[","").replace("]","").replace("'","").split(","):
-                ingredients.add(tag.strip())
-    results["ingredients"] = sorted(ingredients)
+# Version token of the catalog (catalog_meta.revision, bumped by catalog_loader)
+def get_catalog_version():
+    return get_catalog(db_path).version
 
-    conn.close()
-    return results
\ No newline at end of file
+# Hit/miss counters of the normalized-filter query cache
+def get_query_cache_stats():
+    cache = get_catalog(db_path).cache
+    return cache.stats() if cache is not None else {}
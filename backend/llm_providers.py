@@ -0,0 +1,188 @@
+# LLM providers for the chat engine: Groq (default) and a local deterministic stub
+import os, re, json, time, asyncio
+from abc import ABC, abstractmethod
+from .metrics import count_llm_call
+
+DEFAULT_MODEL = "qwen/qwen3-32b"
+# Characters per piece when the stub simulates a streamed response
+STREAM_CHUNK = 8
+
+class LLMProvider(ABC):
+    """
+    Interface for chat-completion backends.
+    complete/acomplete take OpenAI-style messages and return the JSON string
+    the chat engine expects ({"reply": ..., "filters": {...}}).
+    """
+    name = "base"
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+
+    @abstractmethod
+    def complete(self, messages):
+        ...
+
+    def record_usage(self, usage=None):
+        """Count one completion and its token usage (as reported by the API) in the metrics."""
+        count_llm_call(self.name, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+
+    async def acomplete(self, messages):
+        return await asyncio.to_thread(self.complete, messages)
+
+    async def astream(self, messages):
+        """Yield the response text in pieces as it is generated (whole, for providers that cannot stream)."""
+        yield await self.acomplete(messages)
+
+
+class GroqProvider(LLMProvider):
+    """Groq chat completions in JSON mode (GROQ_BASE_URL can redirect it, e.g. to a fake server)."""
+    name = "groq"
+
+    def __init__(self, model: str = DEFAULT_MODEL, api_key: str = None, temperature: float = 0.7):
+        super().__init__(model)
+        from groq import Groq, AsyncGroq
+        api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.temperature = temperature
+        self.client = Groq(api_key=api_key)
+        self.async_client = AsyncGroq(api_key=api_key)
+
+    def complete(self, messages):
+        chat_completion = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=self.temperature,
+            response_format={"type": "json_object"}
+        )
+        self.record_usage(chat_completion.usage)
+        return chat_completion.choices[0].message.content
+
+    async def acomplete(self, messages):
+        chat_completion = await self.async_client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=self.temperature,
+            response_format={"type": "json_object"}
+        )
+        self.record_usage(chat_completion.usage)
+        return chat_completion.choices[0].message.content
+
+    async def astream(self, messages):
+        from groq import BadRequestError
+        try:
+            stream = await self.async_client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=self.temperature,
+                response_format={"type": "json_object"},
+                stream=True
+            )
+        except BadRequestError:
+            # Model/endpoint without streaming support in JSON mode: fall back to one piece
+            yield await self.acomplete(messages)
+            return
+        usage = None
+        async for chunk in stream:
+            # Groq reports the token usage on the final chunk
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        self.record_usage(usage)
+
+
+class StubProvider(LLMProvider):
+    """
+    Offline provider for benchmarking and profiling.
+    Returns a canned response (from a JSON file) or one derived from simple
+    keyword rules on the last user message, after a configurable latency.
+    """
+    name = "stub"
+
+    def __init__(self, model: str = "stub", latency: float = 0.0, canned_response: dict = None, categories=None):
+        super().__init__(model)
+        self.latency = latency
+        self.canned_response = canned_response
+        self._categories = categories
+
+    @property
+    def categories(self):
+        if self._categories is None:
+            from .filter_functions import get_unique_values
+            self._categories = get_unique_values()["categories"]
+        return self._categories
+
+    def estimate_usage(self, messages, content):
+        """No API usage to report: estimate tokens at ~4 characters each."""
+        prompt = sum(len(m.get("content") or "") for m in messages)
+        count_llm_call(self.name, prompt // 4 + 1, len(content) // 4 + 1)
+
+    def respond(self, messages):
+        """Build the response deterministically from the last user message."""
+        if self.canned_response is not None:
+            return json.dumps(self.canned_response)
+        text = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        lowered = text.lower()
+
+        category = self.categories[0] if self.categories else None
+        for candidate in self.categories:
+            words = [w.rstrip("s") for w in re.findall(r"[a-z]+", candidate.lower()) if len(w) > 3]
+            if any(w in lowered for w in words):
+                category = candidate
+                break
+
+        filters = {"category": category, "count": 3, "debug": False, "interest_score": 30}
+        price = re.search(r"(?:\$|under |below |budget (?:of )?)(\d+(?:\.\d+)?)", lowered)
+        if price:
+            filters["max_price"] = float(price.group(1))
+        if "spicy" in lowered:
+            filters["min_spice"] = 5
+        if "pack up" in lowered or "i will order" in lowered:
+            filters["interest_score"] = 100
+        return json.dumps({"reply": f"Here are some {category} picks for you!", "filters": filters})
+
+    def complete(self, messages):
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.respond(messages)
+        self.estimate_usage(messages, content)
+        return content
+
+    async def acomplete(self, messages):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = self.respond(messages)
+        self.estimate_usage(messages, content)
+        return content
+
+    async def astream(self, messages):
+        """Streams the response in STREAM_CHUNK-character pieces, spreading the latency across them."""
+        content = self.respond(messages)
+        self.estimate_usage(messages, content)
+        pieces = [content[i:i + STREAM_CHUNK] for i in range(0, len(content), STREAM_CHUNK)]
+        for piece in pieces:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(pieces))
+            yield piece
+
+
+# Build the provider selected by configuration (.env / environment)
+def get_provider():
+    """
+    LLM_PROVIDER: "groq" (default) or "stub"
+    LLM_MODEL: model name passed to the provider
+    LLM_STUB_LATENCY: stub latency in seconds
+    LLM_STUB_RESPONSE: path to a JSON file the stub returns verbatim
+    """
+    name = os.getenv("LLM_PROVIDER", "groq").lower()
+    if name == "stub":
+        canned = None
+        if os.getenv("LLM_STUB_RESPONSE"):
+            with open(os.getenv("LLM_STUB_RESPONSE")) as f:
+                canned = json.load(f)
+        return StubProvider(
+            model=os.getenv("LLM_MODEL", "stub"),
+            latency=float(os.getenv("LLM_STUB_LATENCY", "0")),
+            canned_response=canned
+        )
+    if name == "groq":
+        return GroqProvider(model=os.getenv("LLM_MODEL", DEFAULT_MODEL))
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
@@ -0,0 +1,290 @@
+# Local rule engine: the system prompt's interest-score rules and filter extraction without the LLM
+import re, math
+
+# Interest-score rules from the system prompt: (label, delta, pattern); each fires at most once per message
+SCORE_RULES = (
+    ("preference", 15, r"\b(crav(e|es|ing|ings)|delighted|favou?rites?|love|prefer|in the mood for|fan of)\b"),
+    ("mood", 20, r"\b(happy|sad|hungry|starving|excited|tired|bored|stressed|upset|glad)\b"),
+    ("question", 10, r"\?|^\s*(what|which|how|do|does|is|are|can|could|would|any|where|why)\b"),
+    ("enthusiasm", 25, r"\b(amazing|delicious|awesome|thrilled|yummy|wonderful|fantastic|tasty|wow)\b"),
+    ("price", 25, r"\$\s*\d|\b\d+(\.\d+)?\s*(dollars?|bucks|usd)\b|\b(price|prices|priced|budget|cheap|cheaper|cheapest|cost|costs|afford)\b|\b(under|below|less than)\s+\$?\d+(?!\d|\s*(k?cal|calories|%))"),
+    ("hesitation", -10, r"\b(maybe|perhaps|not sure|unsure|hmm+)\b"),
+    ("budget_concern", -15, r"\b(too (expensive|pricey|costly)|expensive|pricey|(can'?t|cannot|can not) afford|over (my |the )?budget)\b"),
+    ("dietary_conflict", -20, r"\b(allergic|allerg(y|ies)|intolerant|can'?t eat)\b"),
+    ("rejection", -25, r"^\s*no\s*[.!,]*\s*$|^\s*no[,.!]|\b(nope|nah|no thanks|no thank you|not interested|don'?t (want|like))\b"),
+    ("delay", -5, r"\b(later|another time|not now|some other time)\b"),
+)
+# Order intent sets the score to 100
+ORDER_PATTERN = r"\b(pack (it )?up|i will order|i'?ll order|i want to order|place (the|my|an)? ?order)\b"
+
+MAX_SCORE, MIN_SCORE = 100, -100
+# Result size when the message does not ask for one (same default the prompt gives the LLM)
+DEFAULT_COUNT = 3
+MAX_COUNT = 20
+# min_popularity used for "popular" / "best-selling" without a number (catalog scores are 0-100)
+POPULAR_THRESHOLD = 90
+# Spice bounds for "spicy", "extra spicy" and "mild"
+SPICY, EXTRA_SPICY, MILD = 5, 7, 3
+
+# Extra words that point at a category, beyond the words of its own name
+CATEGORY_SYNONYMS = {
+    "Beverages": ("drink", "soda", "shake", "milkshake", "coffee", "tea", "juice", "lemonade", "smoothie"),
+    "Desserts": ("cake", "cookie", "ice cream", "brownie", "sundae", "pie"),
+    "Fried Chicken": ("wings", "tenders", "nuggets", "chicken"),
+    "Sides & Appetizers": ("fries", "side", "appetizer", "onion rings", "nachos"),
+    "Tacos & Wraps": ("taco", "wrap", "burrito", "quesadilla"),
+    "Salads & Healthy Options": ("salad", "bowl"),
+    "Limited Time Special": ("limited time special",),
+}
+# Words too generic to identify a category on their own
+_GENERIC_WORDS = {"options", "special", "time", "limited", "healthy"}
+# Everyday phrasings of dietary tags
+DIETARY_SYNONYMS = {
+    "vegetarian": ("veg", "veggie", "vegetarian", "meatless"),
+    "vegan": ("vegan", "plant based", "plant-based"),
+    "gluten_free": ("gluten free", "gluten-free"),
+    "low_carb": ("low carb", "low-carb", "keto"),
+    "high_protein": ("high protein", "high-protein", "protein"),
+}
+_NEGATION = r"(no|without|not|zero|hold the|free of|allergic to)"
+
+
+def _phrase(term):
+    """Regex for a vocabulary term as whole words, `_` matching a space or hyphen, optional plural."""
+    words = [re.escape(w) for w in re.split(r"[_\s]+", term.lower().strip()) if w]
+    return r"(?<![\w'])" + r"[\s_-]+".join(words) + r"(e?s)?(?![\w'])"
+
+
+def _number(value, integer=False):
+    """Float (or int) from an LLM value; None for booleans, blanks, non-numbers and inf/NaN."""
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        number = float(str(value).strip().lstrip("$").rstrip("%"))
+    except ValueError:
+        return None
+    if not math.isfinite(number) or number < 0:
+        return None
+    return int(number) if integer else number
+
+
+def _flag(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "yes", "1"):
+        return True
+    if text in ("false", "no", "0"):
+        return False
+    return None
+
+
+def _terms(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [str(term).strip() for term in value if str(term).strip()]
+
+
+class RuleEngine:
+    """
+    Deterministic scorer/extractor for one catalog vocabulary
+    (the dict returned by filter_functions.get_unique_values()).
+    """
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+        self.categories = list(vocabulary.get("categories", []))
+        self._rules = [(label, delta, re.compile(pattern, re.I)) for label, delta, pattern in SCORE_RULES]
+        self._order = re.compile(ORDER_PATTERN, re.I)
+
+        self._category_patterns = []
+        for category in self.categories:
+            words = [w for w in re.findall(r"[a-z]+", category.lower()) if len(w) > 3 and w not in _GENERIC_WORDS]
+            words = [w[:-1] if w.endswith("s") else w for w in words]
+            terms = set(words) | set(CATEGORY_SYNONYMS.get(category, ()))
+            if terms:
+                self._category_patterns.append((category, re.compile("|".join(_phrase(t) for t in terms), re.I)))
+
+        dietary = set(vocabulary.get("dietary_tags", []))
+        self._dietary = [(tag, re.compile("|".join(_phrase(t) for t in (tag,) + DIETARY_SYNONYMS.get(tag, ())), re.I))
+                         for tag in sorted(dietary)]
+        # Tags present in both lists are treated as dietary; "spicy" is handled by the spice bounds
+        self._moods = [(tag, re.compile(_phrase(tag), re.I)) for tag in vocabulary.get("mood_tags", [])
+                       if tag not in dietary and tag != "spicy"]
+        self._allergens = [(tag, re.compile(
+            rf"\b{_NEGATION}\s+(any\s+)?{_phrase(tag)}|{_phrase(tag)}[\s-]+free\b|{_phrase(tag)}\s+allerg", re.I
+        )) for tag in vocabulary.get("allergens", [])]
+        # Longest ingredients first so "beef patty" wins over "beef"
+        self._ingredients = [(term, re.compile(_phrase(term), re.I)) for term in
+                             sorted(vocabulary.get("ingredients", []), key=len, reverse=True) if len(term) > 2]
+
+    # Interest score for a message given the session's last score
+    def score(self, text, last_score=0):
+        """Returns (score, labels of the rules that fired)."""
+        if self._order.search(text):
+            return MAX_SCORE, ["order"]
+        base = 0 if last_score is None or last_score >= MAX_SCORE else last_score
+        fired = [(label, delta) for label, delta, pattern in self._rules if pattern.search(text)]
+        labels = {label for label, _ in fired}
+        # "over my budget" is a budget concern, not an additional price mention
+        if "budget_concern" in labels:
+            fired = [(label, delta) for label, delta in fired if label != "price"]
+        score = base + sum(delta for _, delta in fired)
+        return max(MIN_SCORE, min(MAX_SCORE, score)), [label for label, _ in fired]
+
+    def category(self, text):
+        """Category whose words appear earliest in the message, or None."""
+        best = None
+        for category, pattern in self._category_patterns:
+            match = pattern.search(text)
+            if match and (best is None or match.start() < best[0]):
+                best = (match.start(), category)
+        return best[1] if best else None
+
+    # Filters in the shape the LLM is asked to return
+    def extract(self, text):
+        lowered = text.lower()
+        filters = {"category": self.category(text), "count": DEFAULT_COUNT, "debug": False}
+
+        price = (re.search(r"(?:under|below|less than|max(?:imum)?|up to|within|budget(?: of| is)?)\s*\$?\s*(\d+(?:\.\d+)?)(?!\d|\.\d|\s*(?:k?cal|calories|%))", lowered)
+                 or re.search(r"\$\s*(\d+(?:\.\d+)?)", lowered)
+                 or re.search(r"(\d+(?:\.\d+)?)\s*(?:dollars?|bucks|usd)\b", lowered))
+        if price:
+            filters["max_price"] = float(price.group(1))
+
+        calories = re.search(r"(\d+)\s*(?:k?cals?|calories)\b", lowered)
+        if calories:
+            filters["max_calories"] = int(calories.group(1))
+
+        popularity = re.search(r"popular\w*\s+(?:(?:higher|more|greater|over|above)\s+(?:than\s+)?)?(\d+)", lowered)
+        if popularity:
+            filters["min_popularity"] = int(popularity.group(1))
+        elif re.search(r"\b(popular|best[\s-]?sell(er|ers|ing)|most ordered|top rated)\b", lowered):
+            filters["min_popularity"] = POPULAR_THRESHOLD
+
+        level = re.search(r"spice(?: level)?\s*(?:of\s*)?(\d+)", lowered)
+        if level:
+            filters["min_spice"] = int(level.group(1))
+        elif re.search(r"\b(not spicy|no spice|not too spicy|mild)\b", lowered):
+            filters["max_spice"] = MILD
+        elif re.search(r"\b(extra|very|super|really)\s+(spicy|hot)\b", lowered):
+            filters["min_spice"] = EXTRA_SPICY
+        elif re.search(r"\bspicy\b", lowered):
+            filters["min_spice"] = SPICY
+
+        if re.search(r"\bchef'?s?\s+(special|recommend\w*|pick)", lowered):
+            filters["chef_special"] = True
+        if re.search(r"\blimited[\s-]+time\b|\bseasonal\b", lowered):
+            filters["limited_time"] = True
+
+        # Words that named the category (and negated words) do not become tag or ingredient filters
+        category_pattern = dict(self._category_patterns).get(filters["category"])
+        taken = [m.span() for m in category_pattern.finditer(text)] if category_pattern else []
+
+        def wanted(match):
+            start, end = match.span()
+            if any(s < end and start < e for s, e in taken):
+                return False
+            return not re.search(rf"\b{_NEGATION}\s+(any\s+)?$", lowered[:start])
+
+        def matching(patterns):
+            return [tag for tag, pattern in patterns if any(wanted(m) for m in pattern.finditer(text))]
+
+        allergens = [tag for tag, pattern in self._allergens if pattern.search(text)]
+        dietary = [tag for tag in matching(self._dietary) if tag != "spicy"]
+        moods = matching(self._moods)
+        if allergens:
+            filters["allergens_exclude"] = allergens
+        if dietary:
+            filters["dietary_tags"] = dietary
+        if moods:
+            filters["mood_tags"] = moods
+
+        ingredients = []
+        for term, pattern in self._ingredients:
+            match = next((m for m in pattern.finditer(text) if wanted(m)), None)
+            if match:
+                taken.append(match.span())
+                ingredients.append(term)
+        if ingredients:
+            filters["ingredients_include"] = ingredients
+
+        count = (re.search(r"\b(?:show|give|tell|list|suggest|recommend)\s+(?:me\s+)?(?:some\s+)?(\d+)\b", lowered)
+                 or re.search(r"\b(\d+)\s+(?:more\s+)?(?:options|items|dishes|picks|suggestions|choices)\b", lowered))
+        if count is None and filters["category"]:
+            count = re.search(r"\b(\d+)\s+\w+", lowered)
+            if count and int(count.group(1)) > MAX_COUNT:
+                count = None
+        if count:
+            filters["count"] = max(1, min(MAX_COUNT, int(count.group(1))))
+        if re.search(r"\b(debug|sql)\b", lowered):
+            filters["debug"] = True
+        return filters
+
+    def analyze(self, text, last_score=0):
+        """
+        Local equivalent of the LLM call: {"reply", "filters"} with the interest
+        score inside filters, plus whether the message is structured enough to
+        answer without the LLM (an order, or a plain request naming a category).
+        """
+        score, labels = self.score(text, last_score)
+        filters = self.extract(text)
+        filters["interest_score"] = score
+        ordered = labels == ["order"]
+        unsure = {"question", "hesitation", "rejection", "budget_concern"} & set(labels)
+        unresolved_allergy = "dietary_conflict" in labels and "allergens_exclude" not in filters
+        structured = ordered or (filters["category"] is not None and not unsure and not unresolved_allergy)
+        if ordered:
+            reply = "Awesome choice! Your order will arrive in 30 mins."
+        elif filters["category"]:
+            reply = f"Great pick! Here are some {filters['category']} favourites for you."
+        else:
+            reply = "Tell me what you're craving and I'll find something tasty!"
+        return {"reply": reply, "filters": filters}, structured
+
+    def validate(self, llm_filters, text, last_score=0):
+        """
+        Clamp an LLM filters dict to what the query and the scoring rules allow:
+        category must exist in the catalog (else the locally detected one),
+        numbers must be non-negative numbers, flags booleans, tag filters lists
+        of strings, count within 1..MAX_COUNT, and the interest score within
+        [-100, 100] (100 on order intent, the local score when missing).
+        """
+        filters = dict(llm_filters) if isinstance(llm_filters, dict) else {}
+        category = filters.get("category")
+        if category not in self.categories:
+            by_name = {c.lower(): c for c in self.categories}
+            category = by_name.get(str(category).strip().lower()) if category else None
+            filters["category"] = category or self.category(text)
+
+        for key in ("max_price", "max_calories", "min_popularity"):
+            if key in filters:
+                filters[key] = _number(filters[key])
+        for key in ("min_spice", "max_spice"):
+            if key in filters:
+                value = _number(filters[key], integer=True)
+                filters[key] = None if value is None else min(value, 10)
+        for key in ("chef_special", "limited_time", "debug"):
+            if key in filters:
+                filters[key] = _flag(filters[key])
+        for key in ("mood_tags", "dietary_tags", "allergens_exclude", "ingredients_include"):
+            if key in filters:
+                filters[key] = _terms(filters[key])
+        count = _number(filters.get("count", DEFAULT_COUNT), integer=True)
+        filters["count"] = DEFAULT_COUNT if not count else min(count, MAX_COUNT)
+
+        local_score, labels = self.score(text, last_score)
+        score = filters.get("interest_score")
+        try:
+            score = None if isinstance(score, bool) else int(float(score))
+        except (TypeError, ValueError, OverflowError):
+            # Includes NaN and +/-inf (json.loads accepts Infinity, NaN and 1e999)
+            score = None
+        if labels == ["order"] or score is None:
+            score = local_score
+        filters["interest_score"] = max(MIN_SCORE, min(MAX_SCORE, score))
+        return filters
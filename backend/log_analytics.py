@@ -0,0 +1,45 @@
+# Columnar decoding of the conversations log (products JSON blobs)
+import json, ast
+import pandas as pd
+
+
+def _parse_one(blob):
+    try:
+        products = json.loads(blob)
+    except Exception:
+        try:
+            products = ast.literal_eval(blob)
+        except Exception:
+            return []
+    return products if isinstance(products, list) else []
+
+
+def decode_products(blobs):
+    """
+    Decode a column of products blobs in one json.loads call over the joined
+    array; falls back to per-row parsing only if some blob is malformed.
+    Returns a list of product lists aligned with the input.
+    """
+    blobs = [b if b else "[]" for b in blobs]
+    try:
+        decoded = json.loads("[" + ",".join(blobs) + "]")
+        if len(decoded) != len(blobs):
+            raise ValueError("blob count mismatch")
+    except Exception:
+        return [_parse_one(b) for b in blobs]
+    return [d if isinstance(d, list) else [] for d in decoded]
+
+
+def explode_products(df, blob_column="products"):
+    """
+    One row per shown product: the input columns (minus the blob) plus
+    `rank`, `product_id` and `name`, in (row, rank) order.
+    """
+    products = decode_products(df[blob_column].tolist())
+    counts = [len(p) for p in products]
+    flat = [p for row in products for p in row]
+    base = df.drop(columns=[blob_column]).loc[df.index.repeat(counts)].reset_index()
+    base["rank"] = [rank for n in counts for rank in range(n)]
+    base["product_id"] = [p.get("product_id") if isinstance(p, dict) else None for p in flat]
+    base["name"] = [p.get("name") if isinstance(p, dict) else None for p in flat]
+    return base
@@ -0,0 +1,173 @@
+# Background write-behind writer for conversation logs
+import threading, queue, time, logging
+from .db import get_connection, close_thread_connections
+from .metrics import inc
+logger = logging.getLogger(__name__)
+
+class ConversationLogWriter:
+    """
+    Queues conversation records and writes them from a daemon thread in
+    batched transactions, flushing when `batch_size` records are pending or
+    `flush_interval` seconds have passed. The request path only enqueues.
+
+    setup(): run once when the writer starts (schema creation)
+    write_batch(conn, records): insert a list of records on the writer's connection
+
+    A failed transaction is retried up to `max_retries` times with exponential
+    backoff; records that still cannot be written are held (at most `max_held`)
+    and retried with the next batch, or after `flush_interval` when idle.
+    """
+
+    def __init__(self, path, write_batch, setup=None, batch_size=100, flush_interval=1.0,
+                 max_retries=5, retry_backoff=0.05, max_held=10000):
+        self.path = path
+        self.write_batch = write_batch
+        self.setup = setup
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_held = max_held
+        self._held = []
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending_scores = {}
+        self._seq = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            if self.setup:
+                self.setup()
+            self._thread = threading.Thread(target=self._run, name="conversation-log-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, record):
+        """Enqueue one record (a dict with at least session_id and interest_score)."""
+        with self._lock:
+            self._seq += 1
+            self._pending_scores[record["session_id"]] = (self._seq, record["interest_score"])
+            self._queue.put((self._seq, record))
+
+    def pending_interest_score(self, session_id):
+        """Latest interest score logged for a session but not yet flushed, else None."""
+        pending = self._pending_scores.get(session_id)
+        return pending[1] if pending else None
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far is written."""
+        done = threading.Event()
+        self._queue.put((None, done))
+        if not self.running:
+            self._drain()
+        return done.wait(timeout)
+
+    def stop(self, timeout=10.0):
+        """Flush what is queued and stop the writer thread."""
+        if not self.running:
+            self._drain()
+            self._give_up()
+            return
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def _write(self, conn, batch):
+        """Write held records plus `batch` in one transaction, retrying with backoff."""
+        batch, self._held = self._held + batch, []
+        records = [record for _, record in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                with conn:
+                    self.write_batch(conn, records)
+                break
+            except Exception:
+                inc("foodiebot_log_write_failures_total")
+                if attempt == self.max_retries:
+                    logger.exception("Failed to write %d conversation records; holding them for retry", len(batch))
+                    self._hold(batch)
+                    return
+                time.sleep(min(self.retry_backoff * 2 ** attempt, 2.0))
+        self._forget(batch)
+
+    def _hold(self, batch):
+        overflow = len(batch) - self.max_held
+        if overflow > 0:
+            logger.error("Dropping %d conversation records: more than %d are waiting for a retry", overflow, self.max_held)
+            self._drop(batch[:overflow])
+            batch = batch[overflow:]
+        self._held = batch
+
+    def _drop(self, batch):
+        inc("foodiebot_log_records_dropped_total", len(batch))
+        self._forget(batch)
+
+    def _forget(self, batch):
+        """Clear the pending scores of records that are written (or given up on)."""
+        with self._lock:
+            for seq, record in batch:
+                pending = self._pending_scores.get(record["session_id"])
+                if pending and pending[0] == seq:
+                    del self._pending_scores[record["session_id"]]
+
+    def _give_up(self):
+        """At shutdown: records that still could not be written are lost, say so."""
+        if self._held:
+            logger.error("Dropping %d conversation records that could not be written", len(self._held))
+            self._drop(self._held)
+            self._held = []
+
+    def _drain(self):
+        """Synchronously write whatever is queued (used when the thread is not running)."""
+        if self._queue.empty() and not self._held:
+            return
+        conn = get_connection(self.path)
+        batch = []
+        while True:
+            try:
+                seq, item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if seq is None:
+                if item is not None:
+                    self._write(conn, batch)
+                    batch = []
+                    item.set()
+                continue
+            batch.append((seq, item))
+        if batch or self._held:
+            self._write(conn, batch)
+
+    def _run(self):
+        conn = get_connection(self.path)
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                seq, item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                seq, item = None, False
+            if seq is not None:
+                batch.append((seq, item))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            # Size or timer reached, or a flush/stop marker arrived
+            if batch or self._held:
+                self._write(conn, batch)
+                batch = []
+            # Held records are retried on the timer even when nothing new arrives
+            deadline = time.monotonic() + self.flush_interval if self._held else None
+            if seq is None and item is None:
+                self._give_up()
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+        close_thread_connections()
@@ -1,11 +1,40 @@
 # main api for backend
-from fastapi import FastAPI, HTTPException
+import os, json, time, asyncio
+from datetime import datetime
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Query, Depends
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware 
-from .models import ChatMessage, BotResponse
-from .chat_engine import analyze_message
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from .models import ChatMessage, BotResponse, BatchChatRequest, BatchChatResponse
+from .chat_engine import analyze_message_async, stream_message_async, analyze_batch_async, get_llm_cache_stats
+from .chat_engine import BATCH_CONCURRENCY, BATCH_MAX_MESSAGES, DEBUG_TIMINGS
+from .filter_functions import get_query_cache_stats, get_unique_values, get_catalog_version
+from . import analytics
+from .analytics import start_log_writer, stop_log_writer, start_catch_up, get_log_writer
 from .session_id_generator import session_id
+from .dashboard import get_dashboard_service, CursorError, MAX_PAGE_SIZE
+from .metrics import observe, render, start_breakdown, finish_breakdown, start_flusher, stop_flusher
 
-app = FastAPI(title="FoodieBot API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Analytics schema setup runs once here; turns are logged by a background writer
+    start_log_writer()
+    start_catch_up()
+    dashboard.start()
+    start_flusher()
+    app.state.ready = True
+    yield
+    # Uvicorn has drained in-flight requests by now; flush the queued turns before exiting
+    app.state.ready = False
+    dashboard.stop()
+    stop_log_writer()
+    stop_flusher()
+
+app = FastAPI(title="FoodieBot API", lifespan=lifespan)
+# TTL-cached dashboard queries, kept warm by a background refresher (DASHBOARD_* settings)
+dashboard = get_dashboard_service()
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,19 +43,165 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+@app.middleware("http")
+async def request_timer(request: Request, call_next):
+    """Request latency per endpoint (up to the response headers for streamed responses)."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    endpoint = request.scope.get("endpoint")
+    observe("foodiebot_request_seconds", time.perf_counter() - start,
+            handler=endpoint.__name__ if endpoint else "unmatched", method=request.method)
+    return response
+
 @app.post("/chat", response_model=BotResponse)
 async def chat_with_bot(message: ChatMessage):
     """The main endpoint for the chat conversation."""
     try:
         # Generate a session ID if it's the first message
         current_session_id = message.session_id or session_id
+        breakdown = start_breakdown() if message.debug or DEBUG_TIMINGS else None
         # Get the response from the chat engine
-        response_data = analyze_message(message.message, current_session_id)
+        response_data = await analyze_message_async(message.message, current_session_id)
         response_data["session_id"] = current_session_id
+        if breakdown is not None:
+            response_data["timings"] = finish_breakdown(breakdown)
         return response_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(batch: BatchChatRequest):
+    """
+    Answer many (session_id, message) pairs in one call. Sessions run
+    concurrently, each session's messages in order; at most `concurrency`
+    turns are in flight. Per-message failures are reported in `error`.
+    """
+    if len(batch.messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_MESSAGES} messages per batch")
+    items = [(m.session_id or session_id, m.message) for m in batch.messages]
+    concurrency = min(batch.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    results = await analyze_batch_async(items, concurrency)
+    return {"results": [
+        {"session_id": sid, "message": user_message, **result}
+        for (sid, user_message), result in zip(items, results)
+    ]}
+
+# One Server-Sent Event frame
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """
+    Streaming chat over Server-Sent Events: `token` events ({"text": ...}) carry
+    the reply as it is generated, then one `result` event carries the full
+    BotResponse (suggested products included). Failures arrive as an `error` event.
+    """
+    current_session_id = message.session_id or session_id
+
+    async def events():
+        breakdown = start_breakdown() if message.debug or DEBUG_TIMINGS else None
+        try:
+            async for kind, data in stream_message_async(message.message, current_session_id):
+                if kind == "token":
+                    yield sse("token", {"text": data})
+                else:
+                    data["session_id"] = current_session_id
+                    if breakdown is not None:
+                        data["timings"] = finish_breakdown(breakdown)
+                    yield sse("result", jsonable_encoder(BotResponse(**data)))
+        except Exception as e:
+            yield sse("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit counters of the catalog query cache, the LLM response cache and the dashboard cache."""
+    return {"query_cache": get_query_cache_stats(), "llm_cache": get_llm_cache_stats(), "dashboard": dashboard.stats()}
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the worker process is up and serving."""
+    return {"status": "ok", "pid": os.getpid()}
+
+# Readiness checks, run in a worker thread (they touch SQLite)
+def readiness_checks():
+    return {
+        "started": bool(getattr(app.state, "ready", False)),
+        "log_writer": get_log_writer().running,
+        "catalog": get_catalog_version() is not None,
+        "analytics_db": analytics._connection().execute("SELECT 1").fetchone() == (1,),
+    }
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: startup finished, the log writer runs and both databases answer (503 otherwise)."""
+    try:
+        checks = await asyncio.to_thread(readiness_checks)
+    except Exception as e:
+        return JSONResponse({"status": "unavailable", "error": str(e)}, status_code=503)
+    ready = all(checks.values())
+    return JSONResponse({"status": "ready" if ready else "unavailable", "checks": checks, "pid": os.getpid()},
+                        status_code=200 if ready else 503)
+
+@app.get("/catalog/vocabulary")
+async def catalog_vocabulary():
+    """Categories and tag vocabulary of the current catalog."""
+    return await asyncio.to_thread(get_unique_values)
+
+# Time window and paging parameters shared by the /analytics endpoints
+def page_params(
+    start: Optional[datetime] = Query(None, alias="from", description="Window start (inclusive), ISO 8601"),
+    end: Optional[datetime] = Query(None, alias="to", description="Window end (exclusive), ISO 8601"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; top-k for rankings"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    return start, end, limit, cursor
+
+# Dashboard page from the cache; only a miss goes to SQLite (in the default executor)
+async def dashboard_items(name, *args):
+    # Unset trailing parameters are dropped, so a plain request maps onto the hot cache entry
+    while args and args[-1] is None:
+        args = args[:-1]
+    page = dashboard.peek(name, *args)
+    if page is None:
+        try:
+            page = await asyncio.to_thread(dashboard.get, name, *args)
+        except CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    # Items are plain JSON values already: skip FastAPI's per-field encoding of large lists
+    return JSONResponse(page)
+
+@app.get("/analytics/most-recommended")
+async def most_recommended(page: tuple = Depends(page_params)):
+    return await dashboard_items("most_recommended", *page)
+
+@app.get("/analytics/interest-progression/{session_id}")
+async def interest_progression(session_id: str, page: tuple = Depends(page_params)):
+    return await dashboard_items("interest_progression", session_id, *page)
+
+@app.get("/analytics/drop-off-points")
+async def drop_off_points(page: tuple = Depends(page_params)):
+    """Newest first; 5 items unless `limit` is given."""
+    return await dashboard_items("drop_off_points", *page)
+
+@app.get("/analytics/average-duration")
+async def average_duration(page: tuple = Depends(page_params)):
+    """Durations are kept per day: the window selects every day it overlaps."""
+    return await dashboard_items("average_duration", *page)
+
+@app.get("/analytics/highest-converting")
+async def highest_converting(page: tuple = Depends(page_params)):
+    return await dashboard_items("highest_converting", *page)
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latency histograms, DB query and LLM token counters in the Prometheus text format."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 async def root():
     return {"message": "FoodieBot API is running!"}
\ No newline at end of file
@@ -0,0 +1,246 @@
+# Process-wide latency histograms and counters, rendered in the Prometheus text format
+import os, json, glob, time, bisect, functools, threading, contextvars
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    "foodiebot_stage_seconds": ("histogram", "Time spent per pipeline stage"),
+    "foodiebot_request_seconds": ("histogram", "HTTP request latency by route (time to response headers)"),
+    "foodiebot_db_queries_total": ("counter", "SQL statements executed, by database file and operation"),
+    "foodiebot_llm_tokens_total": ("counter", "LLM tokens used, by provider and kind (prompt/completion)"),
+    "foodiebot_llm_calls_total": ("counter", "LLM completions requested, by provider"),
+    "foodiebot_dashboard_cache_total": ("counter", "Dashboard data lookups, by result (hit/miss)"),
+    "foodiebot_log_write_failures_total": ("counter", "Failed conversation-log write transactions (each retry counts)"),
+    "foodiebot_log_records_dropped_total": ("counter", "Conversation records given up on after retries"),
+}
+
+# Multi-worker mode: every process snapshots its metrics to METRICS_DIR/<pid>.json (at most
+# METRICS_FLUSH_INTERVAL seconds old) and render() sums all snapshots, so whichever worker
+# answers a scrape reports the totals of all of them. Unset: this process's metrics only.
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_dirty = False
+_flusher = None
+_flusher_stop = threading.Event()
+# Per-request breakdown, collected only while a debug request is in flight
+_breakdown = contextvars.ContextVar("metrics_breakdown", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    """Add one observation to a histogram."""
+    global _dirty
+    key = _key(name, labels)
+    with _lock:
+        _dirty = True
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        index = bisect.bisect_left(BUCKETS, value)
+        if index < len(BUCKETS):
+            histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+def inc(name, value=1, **labels):
+    global _dirty
+    key = _key(name, labels)
+    with _lock:
+        _dirty = True
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _add_to_breakdown(section, key, value):
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        with _lock:
+            breakdown[section][key] = breakdown[section].get(key, 0) + value
+
+
+def record_stage(stage, seconds):
+    observe("foodiebot_stage_seconds", seconds, stage=stage)
+    _add_to_breakdown("stages_ms", stage, seconds * 1000)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as pipeline stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def timed(name=None):
+    """Decorator form of stage(); the stage defaults to the function name."""
+    def decorate(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_stage(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def count_query(db, operation):
+    inc("foodiebot_db_queries_total", db=db, op=operation)
+    _add_to_breakdown("db_queries", db, 1)
+
+
+def count_llm_call(provider, prompt_tokens=None, completion_tokens=None):
+    inc("foodiebot_llm_calls_total", provider=provider)
+    for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        if tokens:
+            inc("foodiebot_llm_tokens_total", tokens, provider=provider, kind=kind)
+            _add_to_breakdown("llm_tokens", kind, tokens)
+
+
+def start_breakdown():
+    """Collect stages, queries and tokens of the current request (and threads it hands work to)."""
+    breakdown = {"stages_ms": {}, "db_queries": {}, "llm_tokens": {}, "_start": time.perf_counter()}
+    _breakdown.set(breakdown)
+    return breakdown
+
+
+def finish_breakdown(breakdown):
+    _breakdown.set(None)
+    result = {key: value for key, value in breakdown.items() if not key.startswith("_")}
+    result["stages_ms"] = {name: round(ms, 3) for name, ms in result["stages_ms"].items()}
+    result["total_ms"] = round((time.perf_counter() - breakdown["_start"]) * 1000, 3)
+    return result
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _snapshot():
+    with _lock:
+        histograms = {key: (list(h[0]), h[1], h[2]) for key, h in _histograms.items()}
+        counters = dict(_counters)
+    return histograms, counters
+
+
+def _snapshot_file(pid):
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def flush():
+    """Write this process's metrics to its METRICS_DIR snapshot (atomically; no-op if unchanged)."""
+    global _dirty
+    if METRICS_DIR is None:
+        return
+    with _lock:
+        if not _dirty:
+            return
+        _dirty = False
+    histograms, counters = _snapshot()
+    data = {
+        "histograms": [[name, labels, *values] for (name, labels), values in histograms.items()],
+        "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+    }
+    path = _snapshot_file(os.getpid())
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def _run_flusher():
+    while not _flusher_stop.wait(FLUSH_INTERVAL):
+        flush()
+
+
+def start_flusher():
+    """Start the periodic snapshot thread (no-op without METRICS_DIR)."""
+    global _flusher
+    if METRICS_DIR is None or (_flusher is not None and _flusher.is_alive()):
+        return
+    _flusher_stop.clear()
+    _flusher = threading.Thread(target=_run_flusher, name="metrics-flusher", daemon=True)
+    _flusher.start()
+
+
+def stop_flusher():
+    """Stop the snapshot thread and write the final totals (kept, so counters never go back)."""
+    _flusher_stop.set()
+    if _flusher is not None:
+        _flusher.join()
+    flush()
+
+
+def _collect():
+    """Live metrics of this process plus, in multi-worker mode, the snapshots of every other one."""
+    histograms, counters = _snapshot()
+    if METRICS_DIR is None:
+        return histograms, counters
+    own = _snapshot_file(os.getpid())
+    # Snapshots of exited workers stay in the sum: their counts already happened
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        if path == own:
+            continue
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, labels, buckets, total, count in data["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, ([0] * len(BUCKETS), 0.0, 0))
+            histograms[key] = ([a + b for a, b in zip(merged[0], buckets)], merged[1] + total, merged[2] + count)
+        for name, labels, value in data["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    histograms, counters = _collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, hits in zip(BUCKETS, buckets):
+                    cumulative += hits
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        else:
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    global _dirty
+    with _lock:
+        _dirty = True
+        _histograms.clear()
+        _counters.clear()
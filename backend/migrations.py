@@ -0,0 +1,42 @@
+# Versioned schema migrations for the SQLite databases
+import threading
+
+_lock = threading.Lock()
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn, migrations):
+    """
+    Apply every migration newer than the database's PRAGMA user_version.
+    `migrations` is an ordered list of (version, step) where step is a SQL
+    script string or a callable taking the connection. Each step runs in its
+    own transaction together with the user_version bump, so an interrupted
+    upgrade resumes from the last completed version.
+    Returns the resulting schema version.
+    """
+    with _lock:
+        current = schema_version(conn)
+        for version, step in migrations:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if schema_version(conn) >= version:
+                    conn.rollback()
+                    current = schema_version(conn)
+                    continue
+                if callable(step):
+                    step(conn)
+                else:
+                    for statement in step.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            current = version
+        return current
@@ -1,6 +1,6 @@
-# Pydantic models for Fastfood, ChatMessage and BotResponse
+# Pydantic models for Fastfood, ChatMessage, BotResponse and the batch chat API
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 class Fastfood(BaseModel):
     """Model for a Fastfood, matching the database schema."""
@@ -28,10 +28,28 @@ class ChatMessage(BaseModel):
     """Model for a message in the conversation."""
     message: str
     session_id: Optional[str] = None # To keep track of different conversations
+    debug: bool = False # Include a per-stage timing breakdown in the response
 
 class BotResponse(BaseModel):
     """Model for the bot's response."""
     reply: str
     suggested_fastfoods: List[Fastfood]=[] # List of fastfoods to recommend
     interest_score: int = 0
-    session_id: str = ""
\ No newline at end of file
+    session_id: str = ""
+    timings: Optional[Dict[str, Any]] = None # Per-stage breakdown, only for debug requests
+
+class BatchChatRequest(BaseModel):
+    """Many messages in one call; messages of the same session are answered in list order."""
+    messages: List[ChatMessage]
+    concurrency: Optional[int] = None # Turns in flight at once (capped by CHAT_BATCH_CONCURRENCY)
+
+class BatchChatResult(BaseModel):
+    """Outcome of one batch message: the response, or the error that turn raised."""
+    session_id: str
+    message: str
+    response: Optional[BotResponse] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    """Results in the same order as the request's messages."""
+    results: List[BatchChatResult] = []
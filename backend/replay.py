@@ -0,0 +1,134 @@
+# Replay logged conversations from Analytics.db through the chat pipeline (regression runs)
+# Usage: python -m backend.replay [--limit 1000] [--concurrency 8] [--url http://localhost:8000] [--out replay.jsonl]
+import os, json, time, asyncio, argparse, tempfile
+from datetime import datetime
+from . import analytics
+from .db import get_connection
+
+# Turns sent per /chat/batch call (and per in-process batch)
+BATCH_SIZE = 200
+
+
+def logged_turns(path, limit=None, since=None):
+    """Yield (rowid, session_id, user_message, interest_score, bot_reply) in logging order."""
+    query = "SELECT rowid, session_id, user_message, interest_score, bot_reply FROM conversations WHERE user_message IS NOT NULL AND user_message != ''"
+    params = []
+    if since is not None:
+        query += " AND ts >= ?"
+        params.append(analytics.to_ts(since))
+    query += " ORDER BY rowid"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    cursor = get_connection(path).execute(query, params)
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        yield from rows
+
+
+def _batches(turns, size):
+    batch = []
+    for turn in turns:
+        batch.append(turn)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _in_process(concurrency):
+    from .chat_engine import analyze_batch_async
+    async def run(items):
+        return await analyze_batch_async(items, concurrency)
+    return run
+
+
+def _over_http(client, concurrency):
+    async def run(items):
+        response = await client.post("/chat/batch", json={
+            "messages": [{"session_id": sid, "message": message} for sid, message in items],
+            "concurrency": concurrency,
+        })
+        response.raise_for_status()
+        return response.json()["results"]
+    return run
+
+
+async def replay(source, limit=None, since=None, concurrency=8, url=None, session_prefix="replay-",
+                 batch_size=BATCH_SIZE, out=None):
+    """
+    Push every logged turn through /chat/batch (url) or the in-process batch
+    engine. Session ids get `session_prefix` so replayed state never mixes
+    with live sessions. Returns a summary dict; per-turn rows go to `out` (JSONL).
+    """
+    client = None
+    if url:
+        import httpx
+        client = httpx.AsyncClient(base_url=url.rstrip("/"), timeout=None)
+    run = _over_http(client, concurrency) if client else _in_process(concurrency)
+    summary = {"turns": 0, "sessions": 0, "errors": 0, "score_matches": 0}
+    sessions = set()
+    sink = open(out, "w", encoding="utf-8") if out else None
+    start = time.perf_counter()
+    try:
+        for batch in _batches(logged_turns(source, limit, since), batch_size):
+            items = [(f"{session_prefix}{row[1]}", row[2]) for row in batch]
+            results = await run(items)
+            for row, (sid, message), result in zip(batch, items, results):
+                response = result.get("response") or {}
+                sessions.add(sid)
+                summary["turns"] += 1
+                summary["errors"] += result.get("error") is not None
+                summary["score_matches"] += response.get("interest_score") == row[3]
+                if sink:
+                    sink.write(json.dumps({
+                        "rowid": row[0], "session_id": sid, "message": message,
+                        "logged_score": row[3], "replayed_score": response.get("interest_score"),
+                        "logged_reply": row[4], "replayed_reply": response.get("reply"),
+                        "products": [p.get("product_id") for p in response.get("suggested_fastfoods") or []],
+                        "error": result.get("error"),
+                    }) + "\n")
+    finally:
+        if sink:
+            sink.close()
+        if client:
+            await client.aclose()
+    wall = time.perf_counter() - start
+    summary.update(
+        sessions=len(sessions),
+        wall_s=round(wall, 3),
+        turns_per_s=round(summary["turns"] / wall, 2) if wall else None,
+        score_agreement=round(summary["score_matches"] / summary["turns"], 3) if summary["turns"] else None,
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay Analytics.db conversations through the chat pipeline")
+    parser.add_argument("--db", default=analytics.db_path, help="Analytics.db to read turns from")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only turns at or after this ISO timestamp")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--url", help="backend base URL; replays through POST /chat/batch instead of in-process")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--session-prefix", default="replay-")
+    parser.add_argument("--log-db", help="in-process only: Analytics.db the replayed turns are logged to (default: a temp file)")
+    parser.add_argument("--out", help="write per-turn results as JSONL")
+    args = parser.parse_args()
+
+    source = os.path.abspath(args.db)
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.url:
+            # Never log the replay into the database being replayed
+            analytics.db_path = os.path.abspath(args.log_db or os.path.join(tmp, "Analytics.db"))
+            analytics.start_log_writer()
+        try:
+            result = asyncio.run(replay(source, args.limit, args.since, args.concurrency, args.url,
+                                        args.session_prefix, args.batch_size, args.out))
+        finally:
+            if not args.url:
+                analytics.stop_log_writer()
+    print(json.dumps(result, indent=2))
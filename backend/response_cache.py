@@ -0,0 +1,198 @@
+# LLM response caches: reuse the completion for an identical (model, prompt, window) turn
+import os, json, time, hashlib, threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .db import get_connection
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+db_path = os.path.join(PROJECT_ROOT, "data", "ResponseCache.db")
+db_path = os.path.abspath(db_path)
+
+# Build the cache key for one LLM call
+def response_key(model, prompt_version, catalog_version, window, interest_score):
+    """
+    sha256 over everything that shapes the completion: the model, the system
+    prompt template version, the catalog version its vocabulary came from,
+    the message window sent and the last interest score embedded in the prompt.
+    """
+    payload = json.dumps(
+        [model, prompt_version, catalog_version, window, interest_score],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    Interface for LLM response caches.
+    put records how long the real call took, so hits can report the latency saved.
+    """
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    @abstractmethod
+    def get(self, key):
+        """Cached completion for key, or None if missing/expired."""
+
+    @abstractmethod
+    def put(self, key, content, latency):
+        ...
+
+    @abstractmethod
+    def size(self):
+        ...
+
+    def _record(self, latency):
+        with self._stats_lock:
+            if latency is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.latency_saved += latency
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "llm_calls_saved": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_s": round(self.latency_saved, 3),
+                "size": self.size(),
+            }
+
+
+class InMemoryResponseCache(ResponseCache):
+    """Process-local LRU with TTL expiry, bounded by entry count."""
+
+    def __init__(self, ttl=3600.0, max_entries=5000):
+        super().__init__()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[2] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._record(entry[1] if entry else None)
+        return entry[0] if entry else None
+
+    def put(self, key, content, latency):
+        with self._lock:
+            self._entries[key] = (content, latency, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self):
+        return len(self._entries)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Cache shared by every worker process (and across restarts) through a
+    WAL-mode SQLite file. Expired entries and the least recently used ones
+    beyond `max_entries` are purged every `purge_every` writes. Per-entry hit
+    counts make the savings of all workers visible in stats()["total"].
+    """
+
+    def __init__(self, path=db_path, ttl=3600.0, max_entries=50000, purge_every=200):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._writes = 0
+        conn = get_connection(self.path)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            latency REAL NOT NULL,
+            created_at REAL NOT NULL,
+            used_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_used_at ON responses(used_at)")
+        conn.commit()
+
+    def get(self, key):
+        conn = get_connection(self.path)
+        row = conn.execute("SELECT content, latency, created_at FROM responses WHERE key=?", (key,)).fetchone()
+        if row is not None and self.ttl and time.time() - row[2] > self.ttl:
+            row = None
+        if row is not None:
+            with conn:
+                conn.execute("UPDATE responses SET used_at=?, hits=hits+1 WHERE key=?", (time.time(), key))
+        self._record(row[1] if row else None)
+        return row[0] if row else None
+
+    def put(self, key, content, latency):
+        conn = get_connection(self.path)
+        now = time.time()
+        with conn:
+            conn.execute("""
+                INSERT INTO responses (key, content, latency, created_at, used_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET content=excluded.content, latency=excluded.latency,
+                    created_at=excluded.created_at, used_at=excluded.used_at
+            """, (key, content, latency, now, now))
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge(conn)
+
+    def purge(self, conn=None):
+        """Delete expired entries and trim to the max_entries most recently used ones."""
+        conn = conn or get_connection(self.path)
+        with conn:
+            if self.ttl:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def size(self):
+        return get_connection(self.path).execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self):
+        stats = super().stats()
+        hits, saved = get_connection(self.path).execute(
+            "SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(hits * latency), 0) FROM responses"
+        ).fetchone()
+        stats["total"] = {"llm_calls_saved": hits, "latency_saved_s": round(saved, 3)}
+        return stats
+
+
+# Build the cache selected by configuration (.env / environment)
+def get_response_cache():
+    """
+    LLM_CACHE: "off" (default), "memory" or "sqlite" (shared across uvicorn workers)
+    LLM_CACHE_TTL: seconds a cached response stays valid
+    LLM_CACHE_MAX: maximum number of cached responses
+    LLM_CACHE_DB_PATH: database file for the sqlite cache
+    Returns None when caching is off.
+    """
+    kind = os.getenv("LLM_CACHE", "off").lower()
+    ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    if kind == "off":
+        return None
+    if kind == "sqlite":
+        return SQLiteResponseCache(
+            path=os.getenv("LLM_CACHE_DB_PATH", db_path),
+            ttl=ttl,
+            max_entries=int(os.getenv("LLM_CACHE_MAX", "50000"))
+        )
+    if kind == "memory":
+        return InMemoryResponseCache(ttl=ttl, max_entries=int(os.getenv("LLM_CACHE_MAX", "5000")))
+    raise ValueError(f"Unknown LLM_CACHE: {kind}")
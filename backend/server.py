@@ -0,0 +1,57 @@
+# Standalone entry point for the FoodieBot API (separate from the Streamlit process)
+# Usage: python -m backend.server [--workers 4] [--host 0.0.0.0] [--port 8000]
+import os, glob, argparse, logging, tempfile
+import uvicorn
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Serve backend.main:app with the configured process model
+def serve(host=None, port=None, workers=None, graceful_timeout=None, log_level=None):
+    """
+    BACKEND_HOST / BACKEND_PORT: bind address (default 0.0.0.0:8000)
+    BACKEND_WORKERS: worker processes (default 1); uvicorn supervises them and restarts dead ones
+    BACKEND_GRACEFUL_TIMEOUT: seconds in-flight requests get to finish on SIGTERM/SIGINT
+    BACKEND_LOG_LEVEL: uvicorn log level
+    METRICS_DIR: where workers share their /metrics snapshots (with more than one worker;
+    defaults to a per-port directory under the system temp dir, emptied at startup)
+    Each worker runs the app lifespan: it starts its own analytics log writer
+    on startup and flushes it on shutdown, after in-flight requests drained.
+    """
+    load_dotenv()
+    host = host or os.getenv("BACKEND_HOST", "0.0.0.0")
+    port = int(port or os.getenv("BACKEND_PORT", "8000"))
+    workers = int(workers or os.getenv("BACKEND_WORKERS", "1"))
+    graceful_timeout = float(graceful_timeout or os.getenv("BACKEND_GRACEFUL_TIMEOUT", "30"))
+    log_level = log_level or os.getenv("BACKEND_LOG_LEVEL", "info")
+
+    if workers > 1:
+        # A session's turns can land on any worker, so its window must live in shared storage
+        os.environ.setdefault("SESSION_STORE", "sqlite")
+        if os.environ["SESSION_STORE"].lower() == "memory":
+            logger.warning("SESSION_STORE=memory with %d workers: conversation windows are per worker", workers)
+        # Each scrape reaches one worker, so /metrics must report the sum over all of them
+        metrics_dir = os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"foodiebot-metrics-{port}"))
+        os.makedirs(metrics_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(metrics_dir, "*.json")):
+            os.remove(stale)
+
+    uvicorn.run(
+        "backend.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level=log_level,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the FoodieBot API server")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, help="worker processes (default BACKEND_WORKERS or 1)")
+    parser.add_argument("--graceful-timeout", type=float)
+    parser.add_argument("--log-level")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.graceful_timeout, args.log_level)
@@ -0,0 +1,232 @@
+# Session state stores: conversation window and last interest score per session
+import os, json, time, threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .db import get_connection
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+db_path = os.path.join(PROJECT_ROOT, "data", "Sessions.db")
+db_path = os.path.abspath(db_path)
+
+# Number of user messages kept per session and sent to the LLM
+WINDOW_SIZE = 3
+
+class SessionStore(ABC):
+    """
+    Interface for per-session chat state.
+    append_message returns the updated message window; interest scores are
+    cached here so the chat path does not query Analytics.db every turn.
+    """
+
+    @abstractmethod
+    def append_message(self, session_id, message, window=WINDOW_SIZE):
+        ...
+
+    @abstractmethod
+    def get_window(self, session_id):
+        ...
+
+    @abstractmethod
+    def get_interest_score(self, session_id):
+        """Cached last interest score, or None if the session is unknown/expired."""
+
+    @abstractmethod
+    def set_interest_score(self, session_id, score):
+        ...
+
+    @abstractmethod
+    def clear(self, session_id):
+        ...
+
+
+def _message_size(message):
+    return len(message.get("content") or "") + 64
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store with TTL expiry plus LRU eviction bounded by session
+    count and by the approximate size of the stored messages.
+    """
+
+    def __init__(self, ttl=3600.0, max_sessions=10000, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _entry(self, session_id, create=False):
+        entry = self._sessions.get(session_id)
+        now = time.monotonic()
+        if entry is not None and self.ttl and now - entry["touched"] > self.ttl:
+            self._drop(session_id)
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            entry = self._sessions[session_id] = {"messages": [], "score": None, "size": 0, "touched": now}
+        entry["touched"] = now
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def _drop(self, session_id):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+
+    def _evict(self):
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            oldest = next(iter(self._sessions))
+            self._drop(oldest)
+
+    def append_message(self, session_id, message, window=WINDOW_SIZE):
+        with self._lock:
+            entry = self._entry(session_id, create=True)
+            messages = (entry["messages"] + [message])[-window:]
+            size = sum(_message_size(m) for m in messages)
+            self._bytes += size - entry["size"]
+            entry["messages"], entry["size"] = messages, size
+            self._evict()
+            return list(messages)
+
+    def get_window(self, session_id):
+        with self._lock:
+            entry = self._entry(session_id)
+            return list(entry["messages"]) if entry else []
+
+    def get_interest_score(self, session_id):
+        with self._lock:
+            entry = self._entry(session_id)
+            return entry["score"] if entry else None
+
+    def set_interest_score(self, session_id, score):
+        with self._lock:
+            self._entry(session_id, create=True)["score"] = score
+            self._evict()
+
+    def clear(self, session_id):
+        with self._lock:
+            self._drop(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Store shared by every worker process through a WAL-mode SQLite file.
+    Expired sessions and the least recently used ones beyond `max_sessions`
+    are purged every `purge_every` writes.
+    """
+
+    def __init__(self, path=db_path, ttl=3600.0, max_sessions=100000, purge_every=200):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.purge_every = purge_every
+        self._writes = 0
+        conn = get_connection(self.path)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            messages TEXT NOT NULL DEFAULT '[]',
+            interest_score INTEGER,
+            updated_at REAL NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+        conn.commit()
+
+    def _row(self, conn, session_id):
+        row = conn.execute(
+            "SELECT messages, interest_score, updated_at FROM sessions WHERE session_id=?",
+            (session_id,)
+        ).fetchone()
+        if row is None or (self.ttl and time.time() - row[2] > self.ttl):
+            return None
+        return row
+
+    def _written(self, conn):
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge(conn)
+
+    def purge(self, conn=None):
+        """Delete expired sessions and trim to the max_sessions most recent ones."""
+        conn = conn or get_connection(self.path)
+        with conn:
+            if self.ttl:
+                conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+            conn.execute("""
+                DELETE FROM sessions WHERE session_id IN (
+                    SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_sessions,))
+
+    def append_message(self, session_id, message, window=WINDOW_SIZE):
+        conn = get_connection(self.path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._row(conn, session_id)
+            messages = (json.loads(row[0]) if row else []) + [message]
+            messages = messages[-window:]
+            score = row[1] if row else None
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, messages, interest_score, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(messages), score, time.time())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._written(conn)
+        return messages
+
+    def get_window(self, session_id):
+        row = self._row(get_connection(self.path), session_id)
+        return json.loads(row[0]) if row else []
+
+    def get_interest_score(self, session_id):
+        row = self._row(get_connection(self.path), session_id)
+        return row[1] if row else None
+
+    def set_interest_score(self, session_id, score):
+        conn = get_connection(self.path)
+        with conn:
+            conn.execute("""
+                INSERT INTO sessions (session_id, interest_score, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET interest_score=excluded.interest_score, updated_at=excluded.updated_at
+            """, (session_id, score, time.time()))
+        self._written(conn)
+
+    def clear(self, session_id):
+        conn = get_connection(self.path)
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE session_id=?", (session_id,))
+
+
+# Build the store selected by configuration (.env / environment)
+def get_session_store():
+    """
+    SESSION_STORE: "memory" (default) or "sqlite" (shared across uvicorn workers)
+    SESSION_TTL: idle seconds before a session expires
+    SESSION_MAX: maximum number of sessions kept
+    SESSION_MAX_BYTES: memory cap for the in-process store
+    SESSION_DB_PATH: database file for the sqlite store
+    """
+    kind = os.getenv("SESSION_STORE", "memory").lower()
+    ttl = float(os.getenv("SESSION_TTL", "3600"))
+    if kind == "sqlite":
+        return SQLiteSessionStore(
+            path=os.getenv("SESSION_DB_PATH", db_path),
+            ttl=ttl,
+            max_sessions=int(os.getenv("SESSION_MAX", "100000"))
+        )
+    if kind == "memory":
+        return InMemorySessionStore(
+            ttl=ttl,
+            max_sessions=int(os.getenv("SESSION_MAX", "10000")),
+            max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(32 * 1024 * 1024)))
+        )
+    raise ValueError(f"Unknown SESSION_STORE: {kind}")
@@ -0,0 +1,64 @@
+# Benchmark: per-session analytics lookups as the conversation log grows
+# Usage: python -m benchmarks.analytics_lookup_bench --max-rows 10000000 [--no-index]
+import os, sys, time, random, tempfile, argparse, json, statistics
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from datetime import datetime, timedelta
+from backend import analytics
+from backend.db import get_connection
+
+TURNS_PER_SESSION = 5
+
+def grow_log(conn, start, stop, base_time):
+    """Append synthetic turns [start, stop) in one transaction."""
+    def rows():
+        for i in range(start, stop):
+            dt = base_time + timedelta(seconds=i)
+            yield (f"s{i // TURNS_PER_SESSION}", "I'm hungry", "Try a burger!", i % 100, "{}", "[]", dt, analytics.to_ts(dt))
+    with conn:
+        conn.executemany("""
+            INSERT INTO conversations (session_id, user_message, bot_reply, interest_score, filters, products, timestamp, ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+
+def time_lookups(fn, session_ids):
+    samples = []
+    for sid in session_ids:
+        start = time.perf_counter()
+        fn(sid)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {"p50_us": round(statistics.median(samples), 1), "p99_us": round(samples[int(len(samples) * 0.99) - 1], 1)}
+
+def main(max_rows, lookups, no_index):
+    sizes = [n for n in (1_000, 10_000, 100_000, 1_000_000, 10_000_000) if n <= max_rows]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        analytics.db_path = os.path.join(tmp, "Analytics.db")
+        analytics.init_db()
+        conn = get_connection(analytics.db_path)
+        if no_index:
+            conn.execute("DROP INDEX idx_conversations_session_ts")
+            conn.execute("DROP INDEX idx_conversations_ts")
+        base_time = datetime(2025, 1, 1)
+        rows = 0
+        for size in sizes:
+            grow_log(conn, rows, size, base_time)
+            rows = size
+            sessions = [f"s{random.randrange(size // TURNS_PER_SESSION)}" for _ in range(lookups)]
+            results.append({
+                "rows": size,
+                "get_last_interest_score": time_lookups(analytics.get_last_interest_score, sessions),
+                "get_interest_progression": time_lookups(analytics.get_interest_progression, sessions[: max(10, lookups // 10)]),
+            })
+            print(json.dumps(results[-1]), flush=True)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analytics lookup latency vs. log size")
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--no-index", action="store_true", help="drop the indexes to show the unindexed baseline")
+    args = parser.parse_args()
+    main(args.max_rows, args.lookups, args.no_index)
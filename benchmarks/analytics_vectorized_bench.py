@@ -0,0 +1,122 @@
+# Benchmark: legacy iterrows analytics vs the SQL aggregates in backend/analytics.py on a synthetic log
+# Usage: python -m benchmarks.analytics_vectorized_bench --rows 1000000 [--skip-legacy]
+import os, sys, time, json, random, re, ast, tempfile, argparse
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from datetime import datetime, timedelta
+import pandas as pd
+from backend import analytics
+from backend.db import get_connection
+from backend.filter_functions import get_fastfood_by_filters
+
+def build_log(conn, rows, seed=7, batch_size=10000):
+    """
+    Synthetic log written through the app's batch write path (so product links
+    exist); products carry only id/name/price to keep the file a manageable size.
+    """
+    rnd = random.Random(seed)
+    catalog = [{"product_id": p["product_id"], "name": p["name"], "price": p["price"]} for p in get_fastfood_by_filters()]
+    base = datetime(2025, 1, 1)
+    for start in range(0, rows, batch_size):
+        records = []
+        for i in range(start, min(start + batch_size, rows)):
+            shown = rnd.sample(catalog, rnd.choice((0, 1, 2, 3)))
+            roll = rnd.random()
+            if roll < 0.05 and shown:
+                message = "pack up " + rnd.choice(shown)["name"].lower().split(" ", 1)[-1]
+            else:
+                message = rnd.choice(("I'm hungry", "show me burgers", "maybe later", "no thanks"))
+            dt = base + timedelta(seconds=i)
+            records.append({
+                "session_id": f"s{rnd.randrange(max(1, rows // 6))}", "user_message": message, "bot_reply": "reply",
+                "interest_score": rnd.choice((0, 10, 25, 50, 100)), "filters": "{}", "products": json.dumps(shown),
+                "product_links": analytics.product_links(shown), "timestamp": dt, "ts": analytics.to_ts(dt),
+            })
+        with conn:
+            analytics._write_conversation_batch(conn, records)
+
+# --- Legacy implementations (iterrows + ast.literal_eval per row), kept as the reference ---
+def legacy_drop_off_points(conn):
+    df = pd.read_sql("SELECT rowid, timestamp, interest_score, products FROM conversations ORDER BY ts DESC", conn)
+    drop_off_products = []
+    for _, row in df.iterrows():
+        products = []
+        if row["products"]:
+            try:
+                products = ast.literal_eval(row["products"])
+            except Exception:
+                try:
+                    products = json.loads(row["products"])
+                except Exception:
+                    products = []
+        if products and row["interest_score"] == 0:
+            for product in products:
+                drop_off_products.append((product["product_id"], product["name"]))
+    return drop_off_products[:5]
+
+def legacy_highest_converting_products(conn):
+    df = pd.read_sql("SELECT session_id, user_message, products, interest_score FROM conversations", conn)
+    product_scores = {}
+    session_products = {}
+    for _, row in df.iterrows():
+        session_id = row["session_id"]
+        query = row["user_message"].lower()
+        score = row["interest_score"]
+        products = []
+        if row["products"]:
+            try:
+                products = ast.literal_eval(row["products"])
+            except Exception:
+                try:
+                    products = json.loads(row["products"])
+                except Exception:
+                    products = []
+        if products:
+            session_products.setdefault(session_id, []).extend(products)
+        if "pack up" in query:
+            match = re.search(r"pack up (.+)", query)
+            if match:
+                ordered_name = match.group(1).strip().lower()
+                for product in session_products.get(session_id, []):
+                    if ordered_name in product["name"].lower():
+                        key = (product["product_id"], product["name"])
+                        product_scores[key] = product_scores.get(key, 0) + score
+                        break
+    sorted_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)
+    return [(pid, pname, min(score, 100)) for (pid, pname), score in sorted_products]
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, round(time.perf_counter() - start, 6)
+
+def main(rows, skip_legacy):
+    with tempfile.TemporaryDirectory() as tmp:
+        analytics.db_path = os.path.join(tmp, "Analytics.db")
+        analytics.init_db()
+        conn = get_connection(analytics.db_path)
+        build_log(conn, rows)
+        # Writes fold the aggregates as they go; this times whatever is left over
+        _, catch_up_s = timed(analytics.catch_up)
+        results = {"rows": rows, "catch_up_s": catch_up_s}
+        print(json.dumps({"catch_up_s": catch_up_s}), flush=True)
+        for name, current, legacy in (
+            ("drop_off_points", analytics.get_drop_off_points, legacy_drop_off_points),
+            ("highest_converting_products", analytics.get_highest_converting_products, legacy_highest_converting_products),
+        ):
+            new, new_s = timed(current)
+            entry = {"sql_s": new_s}
+            if not skip_legacy:
+                old, old_s = timed(legacy, conn)
+                entry.update(legacy_s=old_s, speedup=round(old_s / max(new_s, 1e-9), 1), identical=old == new)
+            results[name] = entry
+            print(json.dumps({name: entry}), flush=True)
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL aggregates vs iterrows analytics on a synthetic log")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the SQL aggregates")
+    args = parser.parse_args()
+    main(args.rows, args.skip_legacy)
@@ -0,0 +1,70 @@
+# Load test for /chat driven by the local fake LLM server or the in-process stub provider
+# Usage: python -m benchmarks.chat_load_test --sessions 50 --latency 0.5 [--provider stub]
+import asyncio, os, sys, time, tempfile, argparse, json, contextlib
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+import httpx
+from benchmarks.fake_llm_server import FakeLLMServer
+
+async def run_sessions(client, sessions: int, turns: int):
+    """Fire `sessions` concurrent conversations of `turns` messages each; returns wall time."""
+    async def conversation(i):
+        for turn in range(turns):
+            response = await client.post("/chat", json={"message": f"I'm hungry for a burger #{turn}", "session_id": f"load-{i}"})
+            response.raise_for_status()
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(sessions)))
+    return time.perf_counter() - start
+
+async def main(sessions: int, turns: int, latency: float, provider: str = "fake-server"):
+    server = FakeLLMServer(latency=latency) if provider == "fake-server" else contextlib.nullcontext()
+    with server as llm, tempfile.TemporaryDirectory() as tmp:
+        # Point the backend at the fake server (or the stub) and a throwaway analytics database
+        if llm is not None:
+            os.environ["LLM_PROVIDER"] = "groq"
+            os.environ["GROQ_BASE_URL"] = llm.base_url
+            os.environ.setdefault("GROQ_API_KEY", "fake-key")
+        else:
+            os.environ["LLM_PROVIDER"] = "stub"
+            os.environ["LLM_STUB_LATENCY"] = str(latency)
+        from backend import analytics, chat_engine
+        from backend.main import app
+        analytics.db_path = os.path.join(tmp, "Analytics.db")
+        analytics.start_log_writer()
+
+        # Old behaviour for comparison: the sync pipeline called inside the async handler
+        @app.post("/chat_blocking")
+        async def chat_blocking(payload: dict):
+            return chat_engine.analyze_message(payload["message"], payload["session_id"])
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            await client.post("/chat", json={"message": "warm up", "session_id": "warmup"})
+            results = {"provider": provider, "sessions": sessions, "turns": turns, "llm_latency_s": latency}
+            results["async_wall_s"] = round(await run_sessions(client, sessions, turns), 3)
+
+            async def blocking(i):
+                for turn in range(turns):
+                    await client.post("/chat_blocking", json={"message": f"I'm hungry #{turn}", "session_id": f"block-{i}"})
+            start = time.perf_counter()
+            await asyncio.gather(*(blocking(i) for i in range(sessions)))
+            results["blocking_wall_s"] = round(time.perf_counter() - start, 3)
+
+        analytics.stop_log_writer()
+        serialized = sessions * turns * latency
+        results["serialized_lower_bound_s"] = round(serialized, 3)
+        results["async_speedup_vs_blocking"] = round(results["blocking_wall_s"] / results["async_wall_s"], 1)
+        if llm is not None:
+            results["llm_calls"] = llm.app.state.calls
+        print(json.dumps(results, indent=2))
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent /chat load test against a fake LLM")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency in seconds")
+    parser.add_argument("--provider", choices=["fake-server", "stub"], default="fake-server")
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.turns, args.latency, args.provider))
@@ -0,0 +1,108 @@
+# Local fake LLM server speaking the Groq/OpenAI chat-completions protocol
+import asyncio, json, time, socket, threading, argparse
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+CANNED_RESPONSE = {
+    "reply": "Great choice! Here are some burgers you might love.",
+    "filters": {
+        "category": "Burgers",
+        "max_price": 15.0,
+        "mood_tags": [],
+        "dietary_tags": [],
+        "allergens_exclude": [],
+        "min_popularity": None,
+        "interest_score": 35,
+        "count": 3,
+        "debug": False
+    }
+}
+
+def create_app(latency: float = 0.5, content: dict = None):
+    """
+    FastAPI app answering /openai/v1/chat/completions after `latency` seconds.
+    With "stream": true the content is sent as SSE chunks spread over the latency.
+    """
+    app = FastAPI(title="Fake LLM")
+    app.state.calls = 0
+    body = json.dumps(content or CANNED_RESPONSE)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.calls += 1
+        if payload.get("stream"):
+            return StreamingResponse(stream_chunks(payload.get("model", "fake")), media_type="text/event-stream")
+        await asyncio.sleep(latency)
+        return {
+            "id": f"fake-{app.state.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": body},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    async def stream_chunks(model):
+        pieces = [body[i:i + 8] for i in range(0, len(body), 8)]
+        for index, piece in enumerate(pieces):
+            await asyncio.sleep(latency / len(pieces))
+            chunk = {
+                "id": f"fake-{app.state.calls}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                    "finish_reason": None
+                }]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        done = {"id": f"fake-{app.state.calls}", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return app
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class FakeLLMServer:
+    """Runs the fake LLM app with uvicorn in a background thread."""
+
+    def __init__(self, latency: float = 0.5, port: int = None):
+        self.port = port or free_port()
+        self.app = create_app(latency)
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Groq-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per completion")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency), host="127.0.0.1", port=args.port)
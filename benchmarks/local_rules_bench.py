@@ -0,0 +1,108 @@
+# Benchmark: local rule engine vs. the LLM on a labelled message corpus
+# Usage: python -m benchmarks.local_rules_bench [--provider stub|groq] [--latency 0.5]
+import os, sys, time, json, argparse, statistics
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from backend.filter_functions import get_unique_values
+from backend.local_rules import RuleEngine
+
+CORPUS = os.path.join(os.path.dirname(__file__), "rules_corpus.jsonl")
+
+def load_corpus(path=CORPUS):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _same(expected, actual):
+    if isinstance(expected, list):
+        return sorted(expected) == sorted(actual or [])
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        try:
+            return float(actual) == float(expected)
+        except (TypeError, ValueError):
+            return False
+    return expected == actual
+
+def score_outputs(corpus, outputs):
+    """Accuracy of (filters dict) outputs against the labels; category is checked where labelled."""
+    score_hits = category_hits = category_total = field_hits = field_total = 0
+    misses = []
+    for item, filters in zip(corpus, outputs):
+        ok = _same(item["interest_score"], filters.get("interest_score"))
+        score_hits += ok
+        if item["category"] is not None:
+            category_total += 1
+            category_hits += item["category"] == filters.get("category")
+            ok = ok and item["category"] == filters.get("category")
+        for key, expected in item["filters"].items():
+            field_total += 1
+            same = _same(expected, filters.get(key))
+            field_hits += same
+            ok = ok and same
+        if not ok:
+            misses.append(item["message"])
+    return {
+        "interest_score_accuracy": round(score_hits / len(corpus), 3),
+        "category_accuracy": round(category_hits / max(category_total, 1), 3),
+        "filter_field_accuracy": round(field_hits / max(field_total, 1), 3),
+        "misses": misses,
+    }
+
+def latency_summary(samples):
+    samples = sorted(samples)
+    return {"p50_ms": round(statistics.median(samples) * 1000, 3), "p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 3)}
+
+def run_local(engine, corpus, repeat):
+    outputs, samples, structured = [], [], 0
+    for item in corpus:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response, is_structured = engine.analyze(item["message"], item["last_score"])
+            samples.append(time.perf_counter() - start)
+        outputs.append(response["filters"])
+        structured += is_structured
+    result = score_outputs(corpus, outputs)
+    result.update(latency_summary(samples), llm_skippable=round(structured / len(corpus), 3))
+    return result
+
+def run_llm(engine, corpus, provider):
+    """Ask the provider with the production system prompt, then score raw and validated outputs."""
+    from backend.chat_engine import get_system_prompt_parts
+    head, tail = get_system_prompt_parts()
+    raw, validated, samples = [], [], []
+    for item in corpus:
+        messages = [{"role": "system", "content": head + str(item["last_score"]) + tail},
+                    {"role": "user", "content": item["message"]}]
+        start = time.perf_counter()
+        content = provider.complete(messages)
+        samples.append(time.perf_counter() - start)
+        try:
+            filters = json.loads(content).get("filters", {})
+        except (ValueError, AttributeError):
+            filters = {}
+        raw.append(filters)
+        validated.append(engine.validate(filters, item["message"], item["last_score"]))
+    result = {"raw": score_outputs(corpus, raw), "validated": score_outputs(corpus, validated)}
+    result.update(latency_summary(samples))
+    return result
+
+def main(provider_name, latency, repeat):
+    corpus = load_corpus()
+    engine = RuleEngine(get_unique_values())
+    results = {"messages": len(corpus), "local": run_local(engine, corpus, repeat)}
+    if provider_name:
+        # chat_engine (imported for the system prompt) builds its provider from the environment too
+        os.environ["LLM_PROVIDER"] = provider_name
+        from backend.llm_providers import StubProvider, GroqProvider, DEFAULT_MODEL
+        provider = StubProvider(latency=latency) if provider_name == "stub" else GroqProvider(model=os.getenv("LLM_MODEL", DEFAULT_MODEL))
+        results[provider_name] = run_llm(engine, corpus, provider)
+    print(json.dumps(results, indent=2))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local scoring/filter rules vs. the LLM on rules_corpus.jsonl")
+    parser.add_argument("--provider", choices=["stub", "groq"], help="also run an LLM provider on the corpus")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency in seconds")
+    parser.add_argument("--repeat", type=int, default=20, help="local timing repetitions per message")
+    args = parser.parse_args()
+    main(args.provider, args.latency, args.repeat)
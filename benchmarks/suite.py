@@ -0,0 +1,327 @@
+# Reproducible benchmark suite: catalog queries, analytics and the full /chat path on synthetic data
+# Usage: python -m benchmarks.suite [--catalog-sizes 100,1000,10000,100000] [--log-rows 100000,1000000]
+#                                   [--out results.json] [--compare baseline.json]
+import os, sys, json, time, random, asyncio, argparse, platform, subprocess, statistics, tempfile
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from datetime import datetime, timedelta
+
+SEED = 7
+CATALOG_JSON = os.path.join(PROJECT_ROOT, "data", "FoodData.json")
+CORPUS = os.path.join(os.path.dirname(__file__), "rules_corpus.jsonl")
+# Turns written per transaction while building a synthetic log
+LOG_BATCH = 5000
+# Synthetic turn i is logged at LOG_START + i seconds
+LOG_START = datetime(2025, 1, 1)
+# Benchmarks whose p50/p99 moved by more than this factor are flagged by --compare
+REGRESSION_RATIO = 1.2
+
+# --- Synthetic data ---
+
+def synthetic_catalog(size, seed=SEED):
+    """
+    `size` items in the FoodData.json schema. Items are variations of the
+    shipped catalog: each keeps its template's category and draws its tags and
+    ingredients from that category's vocabulary, with prices, calories,
+    popularity and spice jittered, so filters stay as selective as they are
+    on the real data while the catalog grows.
+    """
+    rnd = random.Random(seed)
+    with open(CATALOG_JSON) as f:
+        templates = json.load(f)
+    pools = {}
+    for item in templates:
+        pool = pools.setdefault(item["category"], {"ingredients": set(), "dietary_tags": set(), "mood_tags": set(), "allergens": set()})
+        for column, values in pool.items():
+            values.update(item[column])
+    pools = {category: {column: sorted(values) for column, values in pool.items()} for category, pool in pools.items()}
+
+    def sample(values, around):
+        return rnd.sample(values, min(len(values), max(1, around + rnd.randint(-1, 1))))
+
+    items = []
+    for i in range(size):
+        template = templates[i % len(templates)]
+        pool = pools[template["category"]]
+        variant = i // len(templates)
+        items.append({
+            "product_id": f"FF{i + 1:03d}",
+            "name": template["name"] if variant == 0 else f"{template['name']} #{variant}",
+            "category": template["category"],
+            "description": template["description"],
+            "ingredients": sample(pool["ingredients"], len(template["ingredients"])),
+            "price": round(max(0.99, template["price"] * rnd.uniform(0.7, 1.3)), 2),
+            "calories": max(0, int(template["calories"] * rnd.uniform(0.8, 1.2))),
+            "prep_time": template["prep_time"],
+            "dietary_tags": sample(pool["dietary_tags"], len(template["dietary_tags"])),
+            "mood_tags": sample(pool["mood_tags"], len(template["mood_tags"])),
+            "allergens": sample(pool["allergens"], len(template["allergens"])) if template["allergens"] else [],
+            "popularity_score": min(100, max(0, template["popularity_score"] + rnd.randint(-15, 15))),
+            "chef_special": rnd.random() < 0.1,
+            "limited_time": rnd.random() < 0.1,
+            "spice_level": min(10, max(0, template["spice_level"] + rnd.randint(-2, 2))),
+            "image_prompt": template["image_prompt"],
+        })
+    return items
+
+def write_catalog(items, path):
+    """FoodData.db for the synthetic items, written by the catalog loader."""
+    from backend.catalog_loader import load_catalog
+    load_catalog(items, path)
+
+def grow_log(rows_from, rows_to, items, seed=SEED):
+    """
+    Append turns [rows_from, rows_to) to analytics.db_path through the log
+    writer's batch function, so the link table and dashboard aggregates are
+    maintained exactly as they are in production.
+    """
+    from backend import analytics
+    from backend.db import get_connection
+    rnd = random.Random(seed + rows_from)
+    shown_fields = ("product_id", "name", "category", "price")
+    catalog = [{key: item[key] for key in shown_fields} for item in items]
+    conn = get_connection(analytics.db_path)
+    for start in range(rows_from, rows_to, LOG_BATCH):
+        records = []
+        for i in range(start, min(start + LOG_BATCH, rows_to)):
+            shown = rnd.sample(catalog, rnd.choice((0, 1, 2, 3)))
+            if shown and rnd.random() < 0.05:
+                message = "pack up " + rnd.choice(shown)["name"].lower().split(" ", 1)[-1]
+            else:
+                message = rnd.choice(("I'm hungry", "show me burgers", "maybe later", "no thanks", "anything spicy?"))
+            # ~6 turns per session, sessions interleaved the way concurrent users are
+            dt = LOG_START + timedelta(seconds=i)
+            records.append({
+                "session_id": f"s{i // 6 + rnd.randrange(3)}",
+                "user_message": message,
+                "bot_reply": "reply",
+                "interest_score": rnd.choice((0, 10, 25, 50, 100)),
+                "filters": "{}",
+                "products": json.dumps(shown),
+                "product_links": analytics.product_links(shown),
+                "timestamp": dt,
+                "ts": analytics.to_ts(dt),
+            })
+        with conn:
+            analytics._write_conversation_batch(conn, records)
+
+# --- Measurement ---
+
+def summarize(samples, wall):
+    """Latency percentiles (ms) and throughput (ops/s) of a list of per-call seconds."""
+    samples = sorted(samples)
+    return {
+        "calls": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 4),
+        "p99_ms": round(samples[max(0, int(len(samples) * 0.99) - 1)] * 1000, 4),
+        "max_ms": round(samples[-1] * 1000, 4),
+        "ops_per_s": round(len(samples) / wall, 1) if wall else None,
+    }
+
+def measure(fn, args_list, warmup=3):
+    """Call fn(*args) for every entry of args_list after a few warm-up calls."""
+    for args in args_list[:warmup]:
+        fn(*args)
+    samples = []
+    wall_start = time.perf_counter()
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - wall_start)
+
+def filter_mix(items, calls, seed=SEED):
+    """Seeded random filter combinations, shaped like what the LLM extracts from chat turns."""
+    rnd = random.Random(seed)
+    categories = sorted({item["category"] for item in items})
+    def tags(column):
+        return sorted({tag for item in items[:500] for tag in item[column]})
+    moods, dietary, allergens, ingredients = tags("mood_tags"), tags("dietary_tags"), tags("allergens"), tags("ingredients")
+    mix = []
+    for _ in range(calls):
+        filters = {"category": rnd.choice(categories), "count": 3}
+        if rnd.random() < 0.4:
+            filters["max_price"] = rnd.choice((8, 10, 12, 15))
+        if rnd.random() < 0.3:
+            filters["mood_tags"] = [rnd.choice(moods)]
+        if rnd.random() < 0.2:
+            filters["dietary_tags"] = [rnd.choice(dietary)]
+        if rnd.random() < 0.2:
+            filters["allergens_exclude"] = [rnd.choice(allergens)]
+        if rnd.random() < 0.1:
+            filters["ingredients_include"] = [rnd.choice(ingredients)]
+        if rnd.random() < 0.1:
+            filters["min_spice"] = rnd.randint(3, 7)
+        mix.append(filters)
+    return mix
+
+def bench_catalog(items, calls):
+    from backend.catalog import Catalog
+    from backend.filter_functions import get_fastfood_by_filters, get_unique_values, db_path
+    mix = filter_mix(items, calls)
+    uncached = Catalog(db_path, cache_size=0)
+    return {
+        "get_fastfood_by_filters": measure(lambda f: get_fastfood_by_filters(**f), [(f,) for f in mix]),
+        "catalog_query_uncached": measure(lambda f: uncached.query(**f), [(f,) for f in mix]),
+        "get_unique_values": measure(get_unique_values, [()] * calls),
+    }
+
+def bench_analytics(rows, calls, seed=SEED):
+    from backend import analytics
+    rnd = random.Random(seed)
+    sessions = [(f"s{rnd.randrange(max(1, rows // 6))}",) for _ in range(calls)]
+    # Dashboard-wide queries are heavier and run less often than per-session lookups
+    dashboard_calls = [()] * max(5, calls // 20)
+    # Top-20 over the last hour of the log: the time window is pushed down into SQL
+    end = LOG_START + timedelta(seconds=rows)
+    window_calls = [(end - timedelta(hours=1), end, 20)] * max(5, calls // 20)
+    return {
+        "get_last_interest_score": measure(analytics.get_last_interest_score, sessions),
+        "get_interest_progression": measure(analytics.get_interest_progression, sessions[: max(10, calls // 10)]),
+        "get_average_duration": measure(analytics.get_average_duration, dashboard_calls),
+        "get_most_recommended_products": measure(analytics.get_most_recommended_products, dashboard_calls),
+        "get_drop_off_points": measure(analytics.get_drop_off_points, dashboard_calls),
+        "get_highest_converting_products": measure(analytics.get_highest_converting_products, dashboard_calls),
+        "most_recommended_page_1h": measure(analytics.most_recommended_page, window_calls),
+        "drop_off_points_page_1h": measure(analytics.drop_off_points_page, window_calls),
+        "highest_converting_page_1h": measure(analytics.highest_converting_page, window_calls),
+    }
+
+def load_messages():
+    with open(CORPUS) as f:
+        return [json.loads(line)["message"] for line in f if line.strip()]
+
+async def bench_chat(turns, concurrency, turns_per_session=4):
+    """POST /chat through the ASGI app (stub LLM): sequential latency, then concurrent throughput."""
+    import httpx
+    from backend.main import app
+    messages = load_messages()
+    payloads = [{"message": messages[i % len(messages)], "session_id": f"bench-{i // turns_per_session}"} for i in range(turns)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def post(payload):
+            start = time.perf_counter()
+            response = await client.post("/chat", json=payload)
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        for payload in payloads[:3]:
+            await post({**payload, "session_id": "bench-warmup"})
+        wall_start = time.perf_counter()
+        sequential = [await post(payload) for payload in payloads]
+        result = {"sequential": summarize(sequential, time.perf_counter() - wall_start)}
+
+        # Same turns again on fresh sessions, each session's turns in order, `concurrency` in flight
+        semaphore = asyncio.Semaphore(concurrency)
+        async def session(chunk):
+            samples = []
+            for payload in chunk:
+                async with semaphore:
+                    samples.append(await post({**payload, "session_id": "c" + payload["session_id"]}))
+            return samples
+        chunks = [payloads[i:i + turns_per_session] for i in range(0, len(payloads), turns_per_session)]
+        wall_start = time.perf_counter()
+        concurrent = [s for samples in await asyncio.gather(*(session(c) for c in chunks)) for s in samples]
+        result[f"concurrency_{concurrency}"] = summarize(concurrent, time.perf_counter() - wall_start)
+    return result
+
+# --- Reporting ---
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def flatten(results, prefix=""):
+    """{"catalog.100.get_unique_values": {...summary...}, ...} for every leaf summary."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and "p50_ms" in value:
+            flat[name] = value
+        elif isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+    return flat
+
+def compare(current, baseline):
+    """Per benchmark p50/p99 ratios against a previous run; > REGRESSION_RATIO is flagged."""
+    now, before = flatten(current["results"]), flatten(baseline["results"])
+    report = {}
+    for name in sorted(now.keys() & before.keys()):
+        ratios = {key: round(now[name][key] / before[name][key], 2) if before[name][key] else None for key in ("p50_ms", "p99_ms")}
+        ratios["regression"] = any(r is not None and r > REGRESSION_RATIO for r in ratios.values())
+        report[name] = ratios
+    return {"baseline_commit": baseline["environment"].get("commit"), "benchmarks": report}
+
+def main(catalog_sizes, log_rows, calls, chat_turns, chat_concurrency, out=None, baseline=None):
+    results = {"catalog": {}, "analytics": {}, "chat": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        # The /chat path runs offline against the stub; set before backend.chat_engine is imported
+        os.environ["LLM_PROVIDER"] = "stub"
+        os.environ.setdefault("LLM_STUB_LATENCY", "0")
+        from backend import analytics, filter_functions
+
+        for size in catalog_sizes:
+            items = synthetic_catalog(size)
+            filter_functions.db_path = os.path.join(tmp, f"FoodData-{size}.db")
+            write_catalog(items, filter_functions.db_path)
+            results["catalog"][str(size)] = bench_catalog(items, calls)
+            print(json.dumps({"catalog": size}), flush=True)
+
+        # Analytics (and the chat turns below) run on the largest catalog and a growing log
+        analytics.db_path = os.path.join(tmp, "Analytics.db")
+        analytics.init_db()
+        built = 0
+        for rows in log_rows:
+            grow_log(built, rows, items)
+            built = rows
+            results["analytics"][str(rows)] = bench_analytics(rows, calls)
+            print(json.dumps({"analytics": rows}), flush=True)
+
+        analytics.start_log_writer()
+        try:
+            results["chat"] = asyncio.run(bench_chat(chat_turns, chat_concurrency))
+        finally:
+            analytics.stop_log_writer()
+
+    report = {
+        "environment": environment(),
+        "config": {"seed": SEED, "catalog_sizes": catalog_sizes, "log_rows": log_rows, "calls": calls,
+                   "chat_turns": chat_turns, "chat_concurrency": chat_concurrency,
+                   "llm_stub_latency_s": float(os.environ["LLM_STUB_LATENCY"]),
+                   "query_cache_size": os.getenv("QUERY_CACHE_SIZE"), "local_rules": os.getenv("LOCAL_RULES")},
+        "results": results,
+    }
+    if baseline:
+        with open(baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+def _sizes(text):
+    return sorted(int(value) for value in text.split(",") if value.strip())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catalog, analytics and /chat latency/throughput on synthetic data")
+    parser.add_argument("--catalog-sizes", type=_sizes, default=[100, 1000, 10000, 100000], help="comma-separated item counts")
+    parser.add_argument("--log-rows", type=_sizes, default=[10000, 100000], help="comma-separated log sizes, built incrementally")
+    parser.add_argument("--calls", type=int, default=1000, help="calls per catalog/per-session benchmark")
+    parser.add_argument("--chat-turns", type=int, default=200)
+    parser.add_argument("--chat-concurrency", type=int, default=16)
+    parser.add_argument("--out", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare p50/p99 against")
+    args = parser.parse_args()
+    main(args.catalog_sizes, args.log_rows, args.calls, args.chat_turns, args.chat_concurrency, args.out, args.compare)
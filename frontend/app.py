@@ -1,17 +1,12 @@
 # Primary Frontend Streamlit App for Foodie-Guru
-from PIL import Image
-from io import BytesIO
 from typing import Any, List, Dict
-import threading, uvicorn, requests, json, os, sys, pandas as pd, streamlit as st
+import requests, json, html, os, sys, uuid, pandas as pd, streamlit as st
+from requests.adapters import HTTPAdapter
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
-from backend import analytics
-from backend.main import app, session_id
-from backend.filter_functions import get_unique_values
-def run_api():
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
-threading.Thread(target=run_api, daemon=True).start()
+from frontend.image_service import get_image_service
+# The backend runs as its own service (python -m backend.server); this app only talks to it over HTTP
 # ----------------------
 # Page / Theme Setup
 # ----------------------
@@ -71,6 +66,14 @@ body, .stApp {
   border: 1px solid rgba(255,255,255,0.03);
 }
 
+/* Product names under collapsed (older) messages */
+.history-products {
+  margin: 2px 0 10px 0;
+  padding-left: 22px;
+  font-size: 0.9em;
+  color: #d1d5db;
+}
+
 /* ---------------- Sidebar Beautification ---------------- */
 section[data-testid="stSidebar"] {
   background: rgba(0,0,0,0.65) !important;
@@ -138,13 +141,15 @@ with col2:
 
 # Default backend URL (matches backend main.py)
 DEFAULT_API_URL = os.environ.get("FOODIEBOT_API_URL", "http://localhost:8000/chat")
+# Most recent messages rendered with full product cards; older ones collapse into a compact history
+FULL_HISTORY_MESSAGES = int(os.environ.get("FOODIEBOT_FULL_HISTORY", "4"))
 
 # Initialize session state
 if "messages" not in st.session_state:
     messages: List[Dict[str, Any]] = []
     st.session_state.messages = messages
 if "session_id" not in st.session_state:
-    st.session_state.session_id = session_id
+    st.session_state.session_id = uuid.uuid4().hex[:16]
 if "api_url" not in st.session_state:
     st.session_state.api_url = DEFAULT_API_URL
 
@@ -153,6 +158,32 @@ if "api_url" not in st.session_state:
 # Helper functions
 # ----------------------
 
+@st.cache_resource
+def http_session() -> requests.Session:
+    """Pooled keep-alive connections to the backend, shared by every session and rerun."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def api_base() -> str:
+    """Backend root URL (the sidebar setting points at the /chat endpoint)."""
+    url = st.session_state.api_url.rstrip("/")
+    return url[:-len("/chat")] if url.endswith("/chat") else url
+
+def api_get(path: str) -> Any:
+    response = http_session().get(api_base() + path, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def catalog_vocabulary(base_url: str) -> Dict[str, Any]:
+    """Catalog categories/tags; they only change when the menu is reloaded."""
+    response = http_session().get(base_url + "/catalog/vocabulary", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
 def safe_json_loads(value: Any) -> Any:
     """Try to parse a JSON string into Python object; otherwise return original or split comma string."""
     if value is None:
@@ -208,10 +239,133 @@ def normalize_product(product: Dict[str, Any]) -> Dict[str, Any]:
     p["image_prompt"] = p.get("image_prompt")
     return p
 
-def generate_image_from_prompt(product: dict) -> str:
-    id = int(product.get("product_id")[2:])
-    url = f"https://raw.githubusercontent.com/Kratugautam99/FoodieBotAgent-Project/main/Images/database_images/{id}.jpg"
-    return url
+def iter_sse(response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+def assistant_bubble(text: str) -> str:
+    return f"""<div class='assistant-bubble'>
+                                    <h3>Foodie-Guru</h3>
+                                    <p>{text}</p>
+                                    </div>"""
+
+@st.cache_resource
+def image_service():
+    """One image service (thumbnail caches + HTTP pool) shared by every session and rerun."""
+    return get_image_service()
+
+def prefetch_images(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Thumbnails of all products of a message, loaded in parallel."""
+    return image_service().prefetch(p.get("product_id") for p in products)
+
+def show_product_image(product: Dict[str, Any], images: Dict[str, Any]):
+    image = images.get(product.get("product_id"))
+    if isinstance(image, bytes):
+        st.image(image, caption=f"Image: {product.get('image_prompt')}")
+    elif image is not None:
+        st.text(f"Error: {image}")
+
+def prepare_card(raw_product: Dict[str, Any]) -> Dict[str, Any]:
+    """Display-ready strings of one product card (parsed and formatted once per message)."""
+    product = normalize_product(raw_product)
+    spice, popularity = product.get("spice_level"), product.get("popularity_score")
+    allergens = product.get("allergens")
+    return {
+        "product_id": product.get("product_id"),
+        "image_prompt": product.get("image_prompt"),
+        "title": f"🍔 {product.get('name')} - ${product.get('price')}",
+        "description": f"**Description:** {product.get('description')}",
+        "category": f"**Category:** {product.get('category')}",
+        "calories": product.get("calories"),
+        "spice": f"{spice}/10" if isinstance(spice, int) else spice,
+        "popularity": f"{popularity}%" if isinstance(popularity, int) else popularity,
+        "prep_time": f"**Prep Time:** {product.get('prep_time')}",
+        "mood": display_tags(product.get("mood_tags"), "mood") if product.get("mood_tags") else "",
+        "dietary": display_tags(product.get("dietary_tags"), "dietary") if product.get("dietary_tags") else "",
+        "allergens": (f"**Contains:** {', '.join(allergens) if isinstance(allergens, list) else allergens}" if allergens else ""),
+        "chef_special": product.get("chef_special"),
+        "limited_time": product.get("limited_time"),
+    }
+
+def message_view(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Render data of a finished message, memoized on the message itself: its
+    product cards and a compact HTML version used once it scrolls into history.
+    """
+    view = message.get("view")
+    if view is None:
+        cards = [prepare_card(p) for p in message.get("fastfoods") or message.get("products") or []]
+        compact = message.get("content", "")
+        if cards:
+            compact += "<ul class='history-products'>" + "".join(f"<li>{html.escape(card['title'])}</li>" for card in cards) + "</ul>"
+        view = message["view"] = {"cards": cards, "compact_html": compact}
+    return view
+
+def split_history(messages: List[Dict[str, Any]]):
+    """(older, recent): only the last FULL_HISTORY_MESSAGES messages get full product cards."""
+    cut = max(0, len(messages) - FULL_HISTORY_MESSAGES)
+    return messages[:cut], messages[cut:]
+
+def history_html(older: List[Dict[str, Any]]) -> str:
+    """Compact HTML of the older messages, extended incrementally as messages age out of `recent`."""
+    count, parts = st.session_state.get("history_cache", (0, []))
+    if count > len(older):
+        # The conversation was cleared or shortened
+        count, parts = 0, []
+    parts = parts + [message_view(m)["compact_html"] for m in older[count:]]
+    st.session_state.history_cache = (len(older), parts)
+    return "".join(parts)
+
+def render_cards(cards: List[Dict[str, Any]]):
+    if not cards:
+        return
+    images = prefetch_images(cards)
+    cols = st.columns(2)
+    for idx, card in enumerate(cards):
+        with cols[idx % 2]:
+            with st.expander(card["title"], expanded=True):
+                st.markdown(f"<div class='product-card'>", unsafe_allow_html=True)
+                show_product_image(card, images)
+
+                st.write(card["description"])
+                st.write(card["category"])
+
+                # Nutritional info
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Calories", card["calories"])
+                with col2:
+                    st.metric("Spice Level", card["spice"])
+                with col3:
+                    st.metric("Popularity", card["popularity"])
+
+                st.write(card["prep_time"])
+
+                if card["mood"]:
+                    st.write(card["mood"])
+                if card["dietary"]:
+                    st.write(card["dietary"])
+                if card["allergens"]:
+                    st.warning(card["allergens"])
+
+                badge_col = st.columns(2)
+                with badge_col[0]:
+                    if card["chef_special"]:
+                        st.success("👨‍🍳 Chef's Special")
+                with badge_col[1]:
+                    if card["limited_time"]:
+                        st.error("⏰ Limited Time")
+                st.markdown(f"</div>", unsafe_allow_html=True)
 
 # ----------------------
 # Sidebar controls
@@ -226,102 +380,58 @@ with st.sidebar:
     st.write("")
     if st.button("Clear Conversation"):
         st.session_state.messages = []
+        st.session_state.pop("history_cache", None)
     st.markdown("---")
     st.title("📊 Conversation Analytics Dashboard")
-    # Buttons for different analytics
-    if st.button("🥇 Most Recommended Products"):
-        counts = analytics.get_most_recommended_products()
-        st.bar_chart(counts)
-
-    if st.button("📈 Show Interest Progression"):
-        sid = ''
-        if st.session_state.session_id and st.session_state.messages:
-            sid = st.session_state.session_id
-        else:
-            sid = 'default_session'
-        df = analytics.get_interest_progression(sid)
-        st.line_chart(df.set_index("timestamp")["interest_score"])
-        st.write(f"For Current Session ID => {sid}")
-
-    if st.button("❌ Show Drop-off Points"):
-        drop_offs = analytics.get_drop_off_points()
-        df = pd.DataFrame(drop_offs, columns=["Product ID", "Product Name"])
-        st.dataframe(df)
-
-    if st.button("⏳ Show Average Session Duration"):
-        avg = analytics.get_average_duration()
-        st.write(f"Average session duration: ")
-        for day, duration in avg.items():
-            st.write(f"- {day}: {duration}")
-
-    if st.button("💰 Highest Converting Products"):
-        products = analytics.get_highest_converting_products()
-        df = pd.DataFrame(products, columns=["Product ID", "Product Name","Total Interest Score"])
-        st.dataframe(df)
+    # Buttons for different analytics (served by the backend's /analytics endpoints)
+    try:
+        if st.button("🥇 Most Recommended Products"):
+            items = api_get("/analytics/most-recommended")["items"]
+            counts = pd.Series({item["name"]: item["count"] for item in items}, name="count")
+            st.bar_chart(counts)
+
+        if st.button("📈 Show Interest Progression"):
+            sid = ''
+            if st.session_state.session_id and st.session_state.messages:
+                sid = st.session_state.session_id
+            else:
+                sid = 'default_session'
+            df = pd.DataFrame(api_get(f"/analytics/interest-progression/{sid}")["items"], columns=["timestamp", "interest_score"])
+            st.line_chart(df.set_index("timestamp")["interest_score"])
+            st.write(f"For Current Session ID => {sid}")
+
+        if st.button("❌ Show Drop-off Points"):
+            drop_offs = [(item["product_id"], item["name"]) for item in api_get("/analytics/drop-off-points")["items"]]
+            df = pd.DataFrame(drop_offs, columns=["Product ID", "Product Name"])
+            st.dataframe(df)
+
+        if st.button("⏳ Show Average Session Duration"):
+            avg = api_get("/analytics/average-duration")["items"]
+            st.write(f"Average session duration: ")
+            for item in avg:
+                st.write(f"- {item['day']}: {item['duration']}")
+
+        if st.button("💰 Highest Converting Products"):
+            products = [(item["product_id"], item["name"], item["score"]) for item in api_get("/analytics/highest-converting")["items"]]
+            df = pd.DataFrame(products, columns=["Product ID", "Product Name","Total Interest Score"])
+            st.dataframe(df)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Analytics are unavailable: is the backend running? (Error: {e})")
     st.markdown("---")
 
 
 # ----------------------
 # Render chat history
 # ----------------------
-for message in st.session_state.messages:
-    role = message.get("role", "assistant")
-    content = message.get("content", "")
-    st.markdown(content, unsafe_allow_html=True)
-
-    fastfoods = message.get("fastfoods") or message.get("products") or []
-    if fastfoods:
-        cols = st.columns(2)
-        for idx, raw_product in enumerate(fastfoods):
-            product = normalize_product(raw_product)
-            with cols[idx % 2]:
-                with st.expander(f"🍔 {product.get('name')} - ${product.get('price')}", expanded=True):
-                    st.markdown(f"<div class='product-card'>", unsafe_allow_html=True)
-                    image_url = generate_image_from_prompt(product) 
-                    if image_url:
-                        try:
-                            response = requests.get(image_url)
-                            img = Image.open(BytesIO(response.content))
-                            img = img.resize((500, 300))
-                            # Streamlit will accept both remote URLs and local file paths
-                            st.image(img, caption=f"Image: {product.get('image_prompt')}")
-                        except Exception as e:
-                            st.text(f"Error: {e}")
-
-                    st.write(f"**Description:** {product.get('description')}")
-                    st.write(f"**Category:** {product.get('category')}")
-
-                    # Nutritional info
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Calories", product.get('calories'))
-                    with col2:
-                        st.metric("Spice Level", f"{product.get('spice_level')}/10" if isinstance(product.get('spice_level'), int) else product.get('spice_level'))
-                    with col3:
-                        st.metric("Popularity", f"{product.get('popularity_score')}%" if isinstance(product.get('popularity_score'), int) else product.get('popularity_score'))
-
-                    st.write(f"**Prep Time:** {product.get('prep_time')}")
-
-                    if product.get('mood_tags'):
-                        st.write(display_tags(product.get('mood_tags'), "mood"))
-                    if product.get('dietary_tags'):
-                        st.write(display_tags(product.get('dietary_tags'), "dietary"))
-
-                    if product.get('allergens'):
-                        allergens = product.get('allergens')
-                        if isinstance(allergens, list):
-                            st.warning(f"**Contains:** {', '.join(allergens)}")
-                        else:
-                            st.warning(f"**Contains:** {allergens}")
-
-                    badge_col = st.columns(2)
-                    with badge_col[0]:
-                        if product.get('chef_special'):
-                            st.success("👨‍🍳 Chef's Special")
-                    with badge_col[1]:
-                        if product.get('limited_time'):
-                            st.error("⏰ Limited Time")
-                    st.markdown(f"</div>", unsafe_allow_html=True)
+messages = st.session_state.messages
+older, recent = split_history(messages)
+if older:
+    # Older turns are not rendered at all unless asked for, and then as one memoized HTML block
+    if st.toggle(f"Show {len(older)} earlier messages", key="show_history"):
+        st.markdown(history_html(older), unsafe_allow_html=True)
+for message in recent:
+    st.markdown(message.get("content", ""), unsafe_allow_html=True)
+    render_cards(message_view(message)["cards"])
 
 
 
@@ -339,89 +449,55 @@ if prompt := st.chat_input("What are you craving today?"):
         "session_id": st.session_state.session_id,
     }
 
-    # Send to backend
+    # Send to backend: the reply streams in over /chat/stream, products arrive with the final event
     with st.chat_message("assistant"):
-        with st.spinner("Foodiebot is Thinking ..."):
+        with st.container():
             try:
-                response = requests.post(st.session_state.api_url, json=payload, timeout=12)
-                response.raise_for_status()
-                response_data = response.json()
+                placeholder = st.empty()
+                placeholder.markdown(assistant_bubble("Foodiebot is Thinking ..."), unsafe_allow_html=True)
+                stream_url = api_base() + "/chat/stream"
+                response_data, streamed = None, ""
+                # 12s to connect / between events, instead of 12s for the whole answer
+                with http_session().post(stream_url, json=payload, stream=True, timeout=12) as response:
+                    response.raise_for_status()
+                    response.encoding = "utf-8"
+                    for event, data in iter_sse(response):
+                        if event == "token":
+                            streamed += data.get("text", "")
+                            placeholder.markdown(assistant_bubble(streamed + " ▌"), unsafe_allow_html=True)
+                        elif event == "result":
+                            response_data = data
+                        elif event == "error":
+                            raise RuntimeError(data.get("detail"))
+                if response_data is None:
+                    raise RuntimeError("the stream ended before the final result")
 
                 bot_reply = response_data.get("reply", "")
                 interest_score = response_data.get("interest_score", 0)
                 suggested_fastfoods = response_data.get("suggested_fastfoods") or []
                 session_id = response_data.get("session_id") 
-                assistant_html = f"""<div class='assistant-bubble'>
-                                    <h3>Foodie-Guru</h3>
-                                    <p>{bot_reply}</p>
-                                    </div>"""
+                assistant_html = assistant_bubble(bot_reply)
 
-                st.markdown(assistant_html, unsafe_allow_html=True)
+                placeholder.markdown(assistant_html, unsafe_allow_html=True)
                 st.metric(label="Interest Score", value=f"{interest_score}%", delta_color="off")
+                assistant_message = {
+                    "role": "assistant",
+                    "content": assistant_html,
+                    "fastfoods": suggested_fastfoods,
+                }
                 if suggested_fastfoods:
                     st.subheader("🍽️ Suggestions for you:")
-                    cols = st.columns(2)
-                    for idx, raw_product in enumerate(suggested_fastfoods):
-                        product = normalize_product(raw_product)
-                        with cols[idx % 2]:
-                            with st.expander(f"🍔 {product.get('name')} - ${product.get('price')}", expanded=True):
-                                st.markdown(f"<div class='product-card'>", unsafe_allow_html=True)
-
-                                image_url = generate_image_from_prompt(product) 
-                                if image_url:
-                                    try:
-                                        response = requests.get(image_url)
-                                        img = Image.open(BytesIO(response.content))
-                                        img = img.resize((500, 300))
-                                        st.image(img, caption=f"Image: {product.get('image_prompt')}")
-                                    except Exception as e:
-                                        st.text(f"Error: {e}")
-
-                                st.write(f"**Description:** {product.get('description')}")
-                                st.write(f"**Category:** {product.get('category')}")
-
-                                col1, col2, col3 = st.columns(3)
-                                with col1:
-                                    st.metric("Calories", product.get('calories'))
-                                with col2:
-                                    st.metric("Spice Level", f"{product.get('spice_level')}/10" if isinstance(product.get('spice_level'), int) else product.get('spice_level'))
-                                with col3:
-                                    st.metric("Popularity", f"{product.get('popularity_score')}%" if isinstance(product.get('popularity_score'), int) else product.get('popularity_score'))
-
-                                st.write(f"**Prep Time:** {product.get('prep_time')}")
-
-                                if product.get('mood_tags'):
-                                    st.write(display_tags(product.get('mood_tags'), "mood"))
-                                if product.get('dietary_tags'):
-                                    st.write(display_tags(product.get('dietary_tags'), "dietary"))
-
-                                if product.get('allergens'):
-                                    allergens = product.get('allergens')
-                                    if isinstance(allergens, list):
-                                        st.warning(f"**Contains:** {', '.join(allergens)}")
-                                    else:
-                                        st.warning(f"**Contains:** {allergens}")
-
-                                badge_col = st.columns(2)
-                                with badge_col[0]:
-                                    if product.get('chef_special'):
-                                        st.success("👨‍🍳 Chef's Special")
-                                with badge_col[1]:
-                                    if product.get('limited_time'):
-                                        st.error("⏰ Limited Time")
-                                st.markdown(f"</div>", unsafe_allow_html=True)
+                    render_cards(message_view(assistant_message)["cards"])
 
                 # Save assistant message + fastfoods to session history (store HTML so it keeps styling)
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": assistant_html,
-                    "fastfoods": suggested_fastfoods,
-                })
+                st.session_state.messages.append(assistant_message)
 
             except requests.exceptions.RequestException as e:
                 st.error(f"Sorry, I'm having trouble connecting to the kitchen! (Error: {e})")
             except json.JSONDecodeError as e:
                 st.error(f"Error parsing response from server: {e}")
+            except RuntimeError as e:
+                st.error(f"Sorry, the kitchen ran into a problem! (Error: {e})")
 
 
 # Footer / About Section
@@ -434,7 +510,10 @@ with st.sidebar:
         Helping you discover the perfect meal**
         """
     )
-    results = get_unique_values()
+    try:
+        results = catalog_vocabulary(api_base())
+    except requests.exceptions.RequestException:
+        results = {}
     st.markdown("### 🍽️ Available Food Categories")
     categories = results.get("categories", [])
     if categories:
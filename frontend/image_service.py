@@ -0,0 +1,183 @@
+# Product image service for the Streamlit frontend: local/remote source, resized thumbnails,
+# bounded memory + disk caches and parallel prefetch
+# Warm the thumbnail cache: python -m frontend.image_service
+import os, io, json, time, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple, Union
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PIL import Image
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+local_dir = os.path.join(PROJECT_ROOT, "Images", "database_images")
+cache_dir = os.path.join(PROJECT_ROOT, "data", "ImageCache")
+
+REMOTE_BASE_URL = "https://raw.githubusercontent.com/Kratugautam99/FoodieBotAgent-Project/main/Images/database_images/"
+# Thumbnail size the product cards display (width, height)
+THUMBNAIL_SIZE = (500, 300)
+JPEG_QUALITY = 85
+# (connect, read) seconds per image download
+HTTP_TIMEOUT = (3.05, 10)
+
+# Source image file name for a product id ("FF012" -> "12.jpg")
+def image_name(product_id: str) -> str:
+    return f"{int(product_id[2:])}.jpg"
+
+
+class ImageService:
+    """
+    Thumbnails keyed by product_id. Lookups go memory LRU -> disk cache ->
+    source, where the source is the local Images/database_images folder or,
+    for images it does not have, the GitHub copy over a pooled HTTP session.
+    Resized JPEG bytes are what gets cached, so st.image never decodes or
+    resizes a full-size picture again. The disk cache is trimmed (oldest
+    first) to `disk_bytes`.
+    """
+
+    def __init__(self, source: str = "auto", local_path: str = local_dir, cache_path: str = cache_dir,
+                 remote_base_url: str = REMOTE_BASE_URL, size: Tuple[int, int] = THUMBNAIL_SIZE,
+                 memory_items: int = 256, disk_bytes: int = 200 * 2 ** 20, workers: int = 8):
+        if source not in ("auto", "local", "remote"):
+            raise ValueError(f"Unknown IMAGE_SOURCE: {source}")
+        self.source = source
+        self.local_path = local_path
+        self.cache_path = cache_path
+        self.remote_base_url = remote_base_url
+        self.size = tuple(size)
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.workers = workers
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._session = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prefetch")
+        os.makedirs(self.cache_path, exist_ok=True)
+        self._disk_used = sum(entry.stat().st_size for entry in os.scandir(self.cache_path) if entry.is_file())
+
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session with a connection pool sized for the prefetch workers (created on first download)."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504))
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers, max_retries=retries)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def _disk_file(self, product_id: str) -> str:
+        return os.path.join(self.cache_path, f"{product_id}_{self.size[0]}x{self.size[1]}.jpg")
+
+    def _remember(self, product_id: str, data: bytes):
+        with self._lock:
+            self._memory[product_id] = data
+            self._memory.move_to_end(product_id)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _read_source(self, product_id: str) -> bytes:
+        local_file = os.path.join(self.local_path, image_name(product_id))
+        if self.source != "remote" and os.path.exists(local_file):
+            with open(local_file, "rb") as f:
+                return f.read()
+        if self.source == "local":
+            raise FileNotFoundError(f"No local image for {product_id}: {local_file}")
+        response = self.session.get(self.remote_base_url + image_name(product_id), timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    def _resize(self, data: bytes) -> bytes:
+        with Image.open(io.BytesIO(data)) as img:
+            # Let the JPEG decoder downscale while decoding (no-op for other formats)
+            img.draft("RGB", self.size)
+            thumbnail = img.convert("RGB").resize(self.size)
+        out = io.BytesIO()
+        thumbnail.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        return out.getvalue()
+
+    def _store(self, path: str, data: bytes):
+        """Write atomically, then trim the disk cache back under its budget."""
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._disk_used += len(data)
+            if self._disk_used <= self.disk_bytes:
+                return
+            entries = sorted((e for e in os.scandir(self.cache_path) if e.is_file()), key=lambda e: e.stat().st_mtime)
+            used = sum(e.stat().st_size for e in entries)
+            # Trim to 90% so the next few writes do not each trigger a scan
+            for entry in entries:
+                if used <= self.disk_bytes * 0.9:
+                    break
+                try:
+                    used -= entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+            self._disk_used = used
+
+    def thumbnail(self, product_id: str) -> bytes:
+        """Resized JPEG bytes for the product; raises if the image cannot be loaded."""
+        with self._lock:
+            data = self._memory.get(product_id)
+            if data is not None:
+                self._memory.move_to_end(product_id)
+                return data
+        path = self._disk_file(product_id)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Mark as recently used for the disk trim
+            os.utime(path)
+        except FileNotFoundError:
+            data = self._resize(self._read_source(product_id))
+            self._store(path, data)
+        self._remember(product_id, data)
+        return data
+
+    def prefetch(self, product_ids: Iterable[str]) -> Dict[str, Union[bytes, Exception]]:
+        """Load many thumbnails in parallel; failed ones map to their exception instead of bytes."""
+        def load(product_id):
+            try:
+                return self.thumbnail(product_id)
+            except Exception as e:
+                return e
+        product_ids = list(dict.fromkeys(pid for pid in product_ids if pid))
+        return dict(zip(product_ids, self._executor.map(load, product_ids)))
+
+
+# Build the image service selected by configuration (.env / environment)
+def get_image_service() -> ImageService:
+    """
+    IMAGE_SOURCE: "auto" (default: local file if present, else download), "local" (never download) or "remote"
+    IMAGE_CACHE_DIR: directory for cached thumbnails
+    IMAGE_CACHE_MB: disk budget of the thumbnail cache
+    IMAGE_MEMORY_ITEMS: thumbnails kept in memory
+    IMAGE_SIZE: thumbnail size as WIDTHxHEIGHT
+    """
+    width, height = (int(v) for v in os.getenv("IMAGE_SIZE", "x".join(map(str, THUMBNAIL_SIZE))).lower().split("x"))
+    return ImageService(
+        source=os.getenv("IMAGE_SOURCE", "auto").lower(),
+        cache_path=os.getenv("IMAGE_CACHE_DIR", cache_dir),
+        size=(width, height),
+        memory_items=int(os.getenv("IMAGE_MEMORY_ITEMS", "256")),
+        disk_bytes=int(float(os.getenv("IMAGE_CACHE_MB", "200")) * 2 ** 20),
+    )
+
+
+if __name__ == "__main__":
+    # Pre-resize every local product image into the disk cache
+    service = get_image_service()
+    product_ids = [f"FF{int(name.split('.')[0]):03d}" for name in os.listdir(service.local_path)
+                   if name.split(".")[0].isdigit()]
+    start = time.perf_counter()
+    results = service.prefetch(product_ids)
+    failed = {pid: str(result) for pid, result in results.items() if isinstance(result, Exception)}
+    print(json.dumps({"thumbnails": len(results) - len(failed), "failed": failed,
+                      "seconds": round(time.perf_counter() - start, 3)}, indent=2))
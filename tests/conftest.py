@@ -0,0 +1,18 @@
+import os
+import shutil
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+# Offline defaults for modules that build their services at import (backend.chat_engine)
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("SESSION_STORE", "memory")
+os.environ.setdefault("LLM_CACHE", "off")
+
+
+@pytest.fixture
+def food_db(tmp_path):
+    """Private copy of the shipped FoodData.db."""
+    path = tmp_path / "FoodData.db"
+    shutil.copy(os.path.join(DATA_DIR, "FoodData.db"), path)
+    return str(path)
@@ -0,0 +1,93 @@
+import base64
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from backend import analytics, main
+from backend.dashboard import DashboardService, encode_cursor, decode_cursor, CursorError
+from backend.db import get_connection
+from conftest import DATA_DIR
+
+ENDPOINTS = [
+    "/analytics/most-recommended",
+    "/analytics/highest-converting",
+    "/analytics/drop-off-points",
+    "/analytics/average-duration",
+]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API over a private copy of the shipped Analytics.db, with a cold dashboard cache and no lifespan tasks."""
+    path = str(tmp_path / "Analytics.db")
+    shutil.copy(f"{DATA_DIR}/Analytics.db", path)
+    monkeypatch.setattr(analytics, "db_path", path)
+    monkeypatch.setattr(main, "dashboard", DashboardService(refresh_interval=0))
+    return TestClient(main.app)
+
+
+def busiest_session():
+    return analytics._connection().execute(
+        "SELECT session_id FROM conversations GROUP BY session_id ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()[0]
+
+
+def walk(client, url, limit):
+    """Every item of url, following next_cursor page by page."""
+    items, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["items"]) <= limit
+        items += page["items"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+@pytest.mark.parametrize("url", ENDPOINTS + ["interest-progression"])
+def test_keyset_pages_add_up_to_one_page(client, url):
+    if url == "interest-progression":
+        url = f"/analytics/interest-progression/{busiest_session()}"
+    everything = client.get(url, params={"limit": 1000}).json()
+    assert everything["next_cursor"] is None and len(everything["items"]) > 1
+    items, pages = walk(client, url, limit=1)
+    assert items == everything["items"]
+    assert pages == len(items)
+
+
+def test_cursor_round_trip():
+    for key in [(1782740800.213002, 147, 1), ("2025-09-17",), (12, "Classic Margherita Pizza")]:
+        cursor = encode_cursor("drop_off_points", key)
+        assert "=" not in cursor
+        assert decode_cursor("drop_off_points", cursor) == key
+    assert encode_cursor("drop_off_points", None) is None
+    with pytest.raises(CursorError):
+        decode_cursor("most_recommended", encode_cursor("drop_off_points", (1.0, 2, 0)))
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"[1, 2, 3]").decode(),
+    base64.urlsafe_b64encode(b'["drop_off_points", [{"a": 1}]]').decode(),
+    encode_cursor("most_recommended", (5, "Classic Margherita Pizza")),
+    encode_cursor("drop_off_points", ("too", "short")),
+])
+def test_bad_cursor_is_400(client, cursor):
+    response = client.get("/analytics/drop-off-points", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_null_interest_score(client):
+    session_id = busiest_session()
+    conn = get_connection(analytics.db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO conversations (session_id, user_message, interest_score, products, timestamp, ts)"
+            " VALUES (?, 'hi', NULL, '[]', '2030-01-01 00:00:00', 1893456000.0)", (session_id,)
+        )
+    response = client.get(f"/analytics/interest-progression/{session_id}")
+    assert response.status_code == 200
+    assert response.json()["items"][-1]["interest_score"] is None
@@ -0,0 +1,145 @@
+import ast
+import json
+import os
+import re
+import sqlite3
+import pandas as pd
+import pytest
+from backend import analytics
+from conftest import DATA_DIR
+
+V1_COLUMNS = "serial, session_id, user_message, bot_reply, interest_score, filters, products, timestamp"
+
+
+# The analytics queries as they were before the schema migrations, reading the v1 table
+def baseline_interest_progression(conn, session_id):
+    return pd.read_sql_query(
+        "SELECT timestamp, interest_score FROM conversations WHERE session_id=? ORDER BY timestamp",
+        conn, params=(session_id,)
+    )
+
+def baseline_average_duration(conn):
+    df = pd.read_sql_query("""
+        SELECT session_id, DATE(timestamp) as day, MIN(timestamp) as start, MAX(timestamp) as end
+        FROM conversations
+        GROUP BY session_id, day
+    """, conn)
+    df["duration"] = pd.to_datetime(df["end"]) - pd.to_datetime(df["start"])
+    avg_per_day = df.groupby("day")["duration"].mean()
+    return {
+        day: f"{int(val.total_seconds()//3600)}h {int((val.total_seconds()%3600)//60)}m"
+        for day, val in avg_per_day.items()
+    }
+
+def baseline_most_recommended(conn):
+    df = pd.read_sql_query("SELECT products FROM conversations", conn)
+    all_products = []
+    for row in df["products"]:
+        try:
+            all_products.extend([p["name"] for p in json.loads(row)])
+        except Exception:
+            pass
+    return pd.Series(all_products).value_counts()
+
+def _products(blob):
+    if not blob:
+        return []
+    try:
+        return ast.literal_eval(blob)
+    except Exception:
+        try:
+            return json.loads(blob)
+        except Exception:
+            return []
+
+def baseline_drop_off_points(conn):
+    df = pd.read_sql("SELECT rowid, timestamp, interest_score, products FROM conversations ORDER BY timestamp DESC", conn)
+    drop_off_products = []
+    for _, row in df.iterrows():
+        products = _products(row["products"])
+        if products and row["interest_score"] == 0:
+            for product in products:
+                drop_off_products.append((product["product_id"], product["name"]))
+    return drop_off_products[:5]
+
+def baseline_highest_converting(conn):
+    df = pd.read_sql("SELECT session_id, user_message, products, interest_score FROM conversations", conn)
+    product_scores, session_products = {}, {}
+    for _, row in df.iterrows():
+        session_id, query, score = row["session_id"], row["user_message"].lower(), row["interest_score"]
+        products = _products(row["products"])
+        if products:
+            session_products.setdefault(session_id, []).extend(products)
+        match = re.search(r"pack up (.+)", query) if "pack up" in query else None
+        if match:
+            ordered_name = match.group(1).strip().lower()
+            for product in session_products.get(session_id, []):
+                if ordered_name in product["name"].lower():
+                    key = (product["product_id"], product["name"])
+                    product_scores[key] = product_scores.get(key, 0) + score
+                    break
+    sorted_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)
+    return [(pid, pname, min(score, 100)) for (pid, pname), score in sorted_products]
+
+def baseline_last_interest_score(conn, session_id):
+    row = conn.execute(
+        "SELECT interest_score FROM conversations WHERE session_id=? ORDER BY timestamp DESC LIMIT 1", (session_id,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+@pytest.fixture
+def v1_db(tmp_path, monkeypatch):
+    """Analytics.db as it was before the migrations: the shipped turns in the original table."""
+    path = str(tmp_path / "Analytics.db")
+    source = sqlite3.connect(f"file:{os.path.join(DATA_DIR, 'Analytics.db')}?mode=ro", uri=True)
+    rows = source.execute(f"SELECT {V1_COLUMNS} FROM conversations ORDER BY rowid").fetchall()
+    source.close()
+    conn = sqlite3.connect(path)
+    # The table the shipped database started from (the original data was imported, hence `serial`)
+    conn.execute("""
+    CREATE TABLE conversations (
+        serial,
+        session_id TEXT,
+        user_message TEXT,
+        bot_reply TEXT,
+        interest_score INT,
+        filters TEXT,
+        products TEXT,
+        timestamp NUM
+    )
+    """)
+    conn.executemany(f"INSERT INTO conversations ({V1_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(analytics, "db_path", path)
+    return path
+
+
+def test_migrated_results_match_baseline(v1_db):
+    conn = sqlite3.connect(v1_db)
+    sessions = [row[0] for row in conn.execute("SELECT DISTINCT session_id FROM conversations")]
+    expected = {
+        "progression": {s: baseline_interest_progression(conn, s) for s in sessions},
+        "duration": baseline_average_duration(conn),
+        "recommended": baseline_most_recommended(conn),
+        "drop_off": baseline_drop_off_points(conn),
+        "converting": baseline_highest_converting(conn),
+        "last_score": {s: baseline_last_interest_score(conn, s) for s in sessions},
+    }
+    conn.close()
+    assert len(sessions) > 1 and expected["drop_off"] and expected["converting"]
+
+    analytics.init_db()
+    analytics.catch_up()
+
+    for s in sessions:
+        pd.testing.assert_frame_equal(analytics.get_interest_progression(s), expected["progression"][s],
+                                      check_dtype=False)
+        assert analytics.get_last_interest_score(s) == expected["last_score"][s]
+    assert analytics.get_average_duration() == expected["duration"]
+    recommended = analytics.get_most_recommended_products()
+    assert recommended.to_dict() == expected["recommended"].to_dict()
+    assert list(recommended.values) == list(expected["recommended"].values)
+    assert analytics.get_drop_off_points() == expected["drop_off"]
+    assert analytics.get_highest_converting_products() == expected["converting"]
@@ -0,0 +1,40 @@
+import time
+from datetime import datetime, timezone
+import pytest
+from backend import analytics
+from backend.db import get_connection
+from backend.migrations import apply_migrations
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    """Run with a local timezone that observes DST."""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_to_ts_is_utc_epoch(new_york):
+    assert analytics.to_ts(datetime(2024, 3, 10, 1, 50)) == utc(2024, 3, 10, 6, 50)
+    assert analytics.to_ts(datetime(2024, 3, 10, 3, 10)) == utc(2024, 3, 10, 7, 10)
+    assert analytics.to_ts(datetime(2024, 7, 1, 12, 0, tzinfo=timezone.utc)) == utc(2024, 7, 1, 12, 0)
+
+
+def test_migration_rewrites_wall_clock_ts_as_utc(tmp_path, new_york):
+    conn = get_connection(str(tmp_path / "Analytics.db"))
+    apply_migrations(conn, analytics.MIGRATIONS[:1])
+    # 20 minutes apart in real time, but 80 minutes apart on the wall clock (DST starts at 02:00)
+    conn.executemany(
+        "INSERT INTO conversations (session_id, interest_score, products, timestamp) VALUES ('s', 10, '[]', ?)",
+        [("2024-03-10 01:50:00",), ("2024-03-10 03:10:00",)]
+    )
+    conn.commit()
+    apply_migrations(conn, analytics.MIGRATIONS)
+    ts = [row[0] for row in conn.execute("SELECT ts FROM conversations ORDER BY rowid")]
+    assert ts == pytest.approx([utc(2024, 3, 10, 6, 50), utc(2024, 3, 10, 7, 10)], abs=1e-3)
@@ -0,0 +1,141 @@
+import json
+import random
+import sqlite3
+import pytest
+from backend.catalog import Catalog
+from backend.catalog_loader import LIST_COLUMNS, load_catalog
+
+
+def baseline_query(path, category=None, max_price=None, mood_tags=None, dietary_tags=None,
+                   allergens_exclude=None, chef_special=None, popularity=None, ingredients_include=None,
+                   calories=None, limited_time=None, min_spice=None, max_spice=None, count=None):
+    """The SQL get_fastfood_by_filters ran before the in-memory catalog."""
+    query, params = "SELECT product_id FROM fastfood WHERE 1=1", []
+    if category:
+        query += " AND category = ?"
+        params.append(category)
+    if max_price is not None:
+        query += " AND price <= ?"
+        params.append(max_price)
+    for column, terms in (("mood_tags", mood_tags), ("dietary_tags", dietary_tags), ("ingredients", ingredients_include)):
+        for term in terms or ():
+            query += f" AND {column} LIKE ?"
+            params.append(f"%{term}%")
+    for allergen in allergens_exclude or ():
+        query += " AND allergens NOT LIKE ?"
+        params.append(f"%{allergen}%")
+    if chef_special is not None:
+        query += " AND chef_special = ?"
+        params.append(1 if chef_special else 0)
+    if limited_time is not None:
+        query += " AND limited_time = ?"
+        params.append(1 if limited_time else 0)
+    if min_spice is not None:
+        query += " AND spice_level >= ?"
+        params.append(min_spice)
+    if max_spice is not None:
+        query += " AND spice_level <= ?"
+        params.append(max_spice)
+    if calories is not None:
+        query += " AND calories <= ?"
+        params.append(calories)
+    if popularity is not None:
+        query += " AND popularity_score >= ?"
+        params.append(popularity)
+        query += " ORDER BY popularity_score DESC"
+    if count is not None:
+        query += " LIMIT ?"
+        params.append(count)
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute(query, params)]
+    finally:
+        conn.close()
+
+
+def random_filters(rnd, vocabulary):
+    def terms(pool):
+        # Vocabulary tokens, fragments, different case and LIKE wildcards
+        picked = []
+        for _ in range(rnd.choice((0, 0, 1, 2))):
+            term = rnd.choice(pool)
+            kind = rnd.random()
+            if kind < 0.2:
+                term = term[: max(1, len(term) // 2)]
+            elif kind < 0.3:
+                term = term.upper()
+            elif kind < 0.35:
+                term = term[:2] + rnd.choice("%_") + term[3:]
+            picked.append(term)
+        return picked or rnd.choice((None, []))
+
+    def maybe(value):
+        return value if rnd.random() < 0.4 else None
+
+    return dict(
+        category=maybe(rnd.choice(vocabulary["categories"] + ["Nope"])),
+        max_price=maybe(round(rnd.uniform(2, 25), 2)),
+        mood_tags=terms(vocabulary["mood_tags"]),
+        dietary_tags=terms(vocabulary["dietary_tags"]),
+        allergens_exclude=terms(vocabulary["allergens"]),
+        ingredients_include=terms(vocabulary["ingredients"]),
+        chef_special=maybe(rnd.choice((True, False))),
+        limited_time=maybe(rnd.choice((True, False))),
+        min_spice=maybe(rnd.randint(0, 10)),
+        max_spice=maybe(rnd.randint(0, 10)),
+        calories=maybe(rnd.randint(100, 1500)),
+        popularity=maybe(rnd.randint(0, 100)),
+        count=maybe(rnd.randint(0, 20)),
+    )
+
+
+def test_query_matches_baseline_sql(food_db):
+    catalog = Catalog(food_db)
+    vocabulary = catalog.snapshot().vocabulary()
+    rnd = random.Random(1)
+    for _ in range(2000):
+        filters = random_filters(rnd, vocabulary)
+        expected = baseline_query(food_db, **filters)
+        got = [row["product_id"] for row in catalog.query(**filters)]
+        assert got == expected, filters
+
+
+def test_cached_results_match_uncached(food_db):
+    cached, uncached = Catalog(food_db), Catalog(food_db, cache_size=0)
+    vocabulary = cached.snapshot().vocabulary()
+    rnd = random.Random(2)
+    combos = [random_filters(rnd, vocabulary) for _ in range(50)]
+    for filters in combos * 3:
+        assert cached.query(**filters) == uncached.query(**filters)
+    assert cached.cache.stats()["hits"] > 0
+
+
+def menu_item(path, **changes):
+    """A stored product as catalog_loader input, with `changes` applied."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    row = dict(conn.execute("SELECT * FROM fastfood WHERE category != 'Burgers' ORDER BY product_id LIMIT 1").fetchone())
+    conn.close()
+    for column in LIST_COLUMNS:
+        row[column] = json.loads(row[column])
+    return {**row, **changes}
+
+
+def test_reload_after_catalog_load(food_db):
+    catalog = Catalog(food_db)
+    before = len(catalog.query(category="Burgers"))
+    summary = load_catalog([menu_item(food_db, category="Burgers")], path=food_db)
+    assert summary["updated"] == 1
+    assert catalog.version == summary["revision"]
+    assert len(catalog.query(category="Burgers")) == before + 1
+
+
+def test_unchanged_catalog_keeps_snapshot(food_db):
+    catalog = Catalog(food_db)
+    snapshot = catalog.snapshot()
+    # Neither a no-op load nor a WAL checkpoint is a new catalog revision
+    assert load_catalog([menu_item(food_db)], path=food_db)["unchanged"] == 1
+    conn = sqlite3.connect(food_db)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    assert catalog.snapshot() is snapshot
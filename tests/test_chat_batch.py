@@ -0,0 +1,75 @@
+import asyncio
+import json
+import random
+import pytest
+from backend import analytics, chat_engine, filter_functions
+from backend.llm_providers import StubProvider
+from backend.session_store import InMemorySessionStore
+
+
+class RecordingProvider(StubProvider):
+    """Stub that echoes the user message as the reply, after a random delay, recording call order."""
+
+    def __init__(self, seed=5):
+        super().__init__(categories=["Burgers"])
+        self.rnd = random.Random(seed)
+        self.seen = []
+        self.in_flight = self.max_in_flight = 0
+
+    async def acomplete(self, messages):
+        text = messages[-1]["content"]
+        self.seen.append(text)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.rnd.random() / 200)
+        finally:
+            self.in_flight -= 1
+        if text.endswith("boom"):
+            raise RuntimeError("provider failed")
+        return json.dumps({"reply": text, "filters": {"category": "Burgers", "count": 1, "interest_score": 40}})
+
+
+@pytest.fixture
+def engine(tmp_path, food_db, monkeypatch):
+    monkeypatch.setattr(analytics, "db_path", str(tmp_path / "Analytics.db"))
+    monkeypatch.setattr(filter_functions, "db_path", food_db)
+    monkeypatch.setattr(chat_engine, "session_store", InMemorySessionStore())
+    monkeypatch.setattr(chat_engine, "provider", RecordingProvider())
+    monkeypatch.setattr(chat_engine, "response_cache", None)
+    monkeypatch.setattr(chat_engine, "LOCAL_RULES", "off")
+    yield chat_engine
+    analytics.stop_log_writer()
+
+
+def test_batch_keeps_input_order_and_session_order(engine):
+    rnd = random.Random(11)
+    turns = {f"s{n}": [f"s{n} turn {i}" for i in range(5)] for n in range(6)}
+    # Interleave the sessions randomly, each session's turns staying in order
+    items, queues = [], {sid: list(messages) for sid, messages in turns.items()}
+    while queues:
+        sid = rnd.choice(sorted(queues))
+        items.append((sid, queues[sid].pop(0)))
+        if not queues[sid]:
+            del queues[sid]
+
+    results = asyncio.run(engine.analyze_batch_async(items, concurrency=3))
+
+    assert len(results) == len(items)
+    for (sid, message), result in zip(items, results):
+        response = result["response"]
+        assert response["session_id"] == sid
+        assert response["reply"].startswith(message)
+    seen = engine.provider.seen
+    for sid, messages in turns.items():
+        assert [m for m in seen if m.startswith(sid + " ")] == messages
+        assert [m["content"] for m in engine.session_store.get_window(sid)] == messages[-3:]
+    assert engine.provider.max_in_flight <= 3
+
+
+def test_failed_turn_does_not_stop_its_session(engine):
+    items = [("a", "a first"), ("a", "a boom"), ("b", "b only"), ("a", "a last")]
+    results = asyncio.run(engine.analyze_batch_async(items))
+    assert results[1] == {"error": "provider failed"}
+    assert [r["response"]["reply"].split(" How about")[0] for r in results if "response" in r] == \
+        ["a first", "b only", "a last"]
@@ -0,0 +1,34 @@
+import json
+import math
+import pytest
+from backend.local_rules import RuleEngine, DEFAULT_COUNT, _number
+
+VOCABULARY = {"categories": ["Burgers", "Pizza"]}
+
+
+@pytest.mark.parametrize("value", [float("inf"), float("-inf"), float("nan"), "inf", "Infinity", "NaN", "1e999"])
+def test_number_rejects_non_finite(value):
+    assert _number(value) is None
+    assert _number(value, integer=True) is None
+
+
+def test_validate_clamps_non_finite_llm_numbers():
+    # json.loads turns these into float('inf') / float('nan')
+    llm_filters = json.loads(
+        '{"category": "Burgers", "interest_score": 1e999, "count": Infinity,'
+        ' "min_spice": Infinity, "max_spice": NaN, "max_price": -Infinity, "max_calories": NaN}'
+    )
+    filters = RuleEngine(VOCABULARY).validate(llm_filters, "show me burgers")
+    assert filters["count"] == DEFAULT_COUNT
+    assert filters["min_spice"] is None and filters["max_spice"] is None
+    assert filters["max_price"] is None and filters["max_calories"] is None
+    assert -100 <= filters["interest_score"] <= 100
+
+
+@pytest.mark.parametrize("score", [float("inf"), float("-inf"), float("nan")])
+def test_validate_non_finite_score_falls_back_to_local_score(score):
+    engine = RuleEngine(VOCABULARY)
+    local_score, _ = engine.score("show me burgers", 0)
+    filters = engine.validate({"interest_score": score}, "show me burgers")
+    assert filters["interest_score"] == local_score
+    assert math.isfinite(filters["interest_score"])
@@ -0,0 +1,70 @@
+import sqlite3
+import time
+from backend.db import get_connection
+from backend.log_writer import ConversationLogWriter
+
+
+def make_writer(path, failures, **kwargs):
+    """Writer whose first `failures` transactions raise sqlite3.OperationalError."""
+    calls = {"n": 0}
+
+    def setup():
+        get_connection(path).execute("CREATE TABLE IF NOT EXISTS log (session_id TEXT, interest_score INTEGER)")
+
+    def write_batch(conn, records):
+        calls["n"] += 1
+        conn.executemany("INSERT INTO log VALUES (:session_id, :interest_score)", records)
+        if calls["n"] <= failures:
+            raise sqlite3.OperationalError("database is locked")
+
+    return ConversationLogWriter(path, write_batch, setup=setup, batch_size=10, flush_interval=0.05,
+                                 retry_backoff=0, **kwargs)
+
+
+def logged(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT session_id, interest_score FROM log ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+
+
+def test_transient_errors_are_retried(tmp_path):
+    path = str(tmp_path / "log.db")
+    writer = make_writer(path, failures=3)
+    writer.start()
+    for i in range(25):
+        writer.submit({"session_id": f"s{i}", "interest_score": i})
+    writer.stop()
+    assert logged(path) == [(f"s{i}", i) for i in range(25)]
+
+
+def test_failed_batches_are_held_not_lost(tmp_path):
+    path = str(tmp_path / "log.db")
+    # Every attempt of the first batch fails (3 attempts each), the records wait for the next write
+    writer = make_writer(path, failures=7, max_retries=2)
+    writer.start()
+    for i in range(10):
+        writer.submit({"session_id": "s", "interest_score": i})
+    writer.flush(timeout=5)
+    assert writer.pending_interest_score("s") == 9
+    for i in range(10, 15):
+        writer.submit({"session_id": "s", "interest_score": i})
+    writer.stop()
+    assert logged(path) == [("s", i) for i in range(15)]
+    assert writer.pending_interest_score("s") is None
+
+
+def test_held_records_are_retried_without_new_traffic(tmp_path):
+    path = str(tmp_path / "log.db")
+    writer = make_writer(path, failures=3, max_retries=1)
+    writer.start()
+    writer.submit({"session_id": "s", "interest_score": 1})
+    writer.flush(timeout=5)
+    # Held after 2 failed attempts; the idle timer retries until it succeeds
+    for _ in range(100):
+        if logged(path):
+            break
+        time.sleep(0.05)
+    assert logged(path) == [("s", 1)]
+    writer.stop()
@@ -0,0 +1,59 @@
+import json
+import random
+import pytest
+from backend.chat_engine import ReplyStream
+
+RESPONSES = [
+    {"reply": "Try the Classic Burger!", "filters": {"category": "Burgers"}},
+    {"reply": 'Say "cheese" \\ then\nbite\ttwice', "filters": {}},
+    {"reply": "Crème brûlée 🍔🌮 — enjoy", "filters": {"reply": "not this one"}},
+    {"filters": {"count": 2}, "reply": "Filters came first"},
+]
+
+
+def decode(pieces):
+    stream = ReplyStream()
+    return "".join(stream.feed(piece) for piece in pieces)
+
+
+def chunks(text, rnd):
+    i = 0
+    while i < len(text):
+        size = rnd.randint(1, 6)
+        yield text[i:i + size]
+        i += size
+
+
+@pytest.mark.parametrize("response", RESPONSES)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_any_chunking_decodes_the_reply(response, ensure_ascii):
+    raw = json.dumps(response, ensure_ascii=ensure_ascii)
+    assert decode([raw]) == response["reply"]
+    assert decode(list(raw)) == response["reply"]
+    rnd = random.Random(3)
+    for _ in range(50):
+        assert decode(chunks(raw, rnd)) == response["reply"]
+
+
+def test_key_split_across_chunks():
+    stream = ReplyStream()
+    assert stream.feed('{"re') == ""
+    assert stream.feed('ply"') == ""
+    assert stream.feed(' : "Hel') == "Hel"
+    assert stream.feed('lo", "filters": {}}') == "lo"
+    assert stream.done
+
+
+def test_escapes_wait_for_all_their_characters():
+    stream = ReplyStream()
+    assert stream.feed('{"reply": "a\\') == "a"
+    assert stream.feed('u00') == ""
+    assert stream.feed('e9\\ud83c') == "é"
+    assert stream.feed('\\udf54"') == "🍔"
+
+
+def test_malformed_escape_stops_the_stream():
+    stream = ReplyStream()
+    assert stream.feed('{"reply": "ok \\uZZZZ more"}') == "ok "
+    assert stream.done
+    assert stream.feed('more') == ""
@@ -0,0 +1,114 @@
+import pytest
+from backend import session_store
+from backend.session_store import SessionStore, InMemorySessionStore, SQLiteSessionStore
+
+
+class Clock:
+    """Stands in for the time module inside session_store."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+    class Partial(SessionStore):
+        def append_message(self, session_id, message, window=3):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_memory_window_and_score():
+    store = InMemorySessionStore()
+    for i in range(5):
+        window = store.append_message("a", user(str(i)))
+    assert [m["content"] for m in window] == ["2", "3", "4"]
+    assert store.get_window("a") == window
+    assert store.get_interest_score("a") is None
+    store.set_interest_score("a", 40)
+    assert store.get_interest_score("a") == 40
+    store.clear("a")
+    assert store.get_window("a") == [] and store.get_interest_score("a") is None
+
+
+def test_memory_ttl_expiry(clock):
+    store = InMemorySessionStore(ttl=10)
+    store.append_message("a", user("hi"))
+    store.set_interest_score("a", 20)
+    clock.now += 9
+    assert store.get_interest_score("a") == 20
+    # Reading refreshed the session, so it lives another 10 seconds
+    clock.now += 9
+    assert store.get_window("a") == [user("hi")]
+    clock.now += 11
+    assert store.get_window("a") == [] and store.get_interest_score("a") is None
+    assert len(store) == 0
+
+
+def test_memory_lru_eviction_by_count():
+    store = InMemorySessionStore(max_sessions=2)
+    store.append_message("a", user("1"))
+    store.append_message("b", user("2"))
+    store.get_window("a")
+    store.append_message("c", user("3"))
+    assert store.get_window("b") == []
+    assert store.get_window("a") == [user("1")] and store.get_window("c") == [user("3")]
+
+
+def test_memory_lru_eviction_by_size():
+    store = InMemorySessionStore(max_bytes=3 * (100 + 64))
+    for session in "abcd":
+        store.append_message(session, user("x" * 100))
+    assert len(store) == 3
+    assert store.get_window("a") == []
+
+
+def test_sqlite_round_trip(tmp_path):
+    path = str(tmp_path / "Sessions.db")
+    store = SQLiteSessionStore(path)
+    for i in range(4):
+        window = store.append_message("a", user(str(i)))
+    store.set_interest_score("a", 55)
+    # A second store on the same file (another worker) sees the same state
+    other = SQLiteSessionStore(path)
+    assert other.get_window("a") == window == [user("1"), user("2"), user("3")]
+    assert other.get_interest_score("a") == 55
+    other.append_message("a", user("4"))
+    assert store.get_window("a")[-1] == user("4")
+    assert store.get_interest_score("a") == 55
+    store.clear("a")
+    assert other.get_window("a") == [] and other.get_interest_score("a") is None
+
+
+def test_sqlite_ttl_and_purge(tmp_path, clock):
+    store = SQLiteSessionStore(str(tmp_path / "Sessions.db"), ttl=10, max_sessions=2)
+    store.append_message("old", user("1"))
+    clock.now += 11
+    assert store.get_window("old") == []
+    for session in "abc":
+        clock.now += 1
+        store.append_message(session, user(session))
+    store.purge()
+    conn = session_store.get_connection(store.path)
+    assert sorted(row[0] for row in conn.execute("SELECT session_id FROM sessions")) == ["b", "c"]